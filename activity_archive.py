@@ -0,0 +1,332 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import hashlib
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+from convert_fit_to_gpx import ReadFitFile, GetTrackPointsFromMessages, CreateGpxTrackFromTrackPoints
+from gpx_statistic import TimespanToHoursMinutesSeconds, CalculateTrackStatistic
+from publish_config import DEFAULT_STOPPED_SPEED_THRESHOLD
+
+####################################################################################
+### This module stores the statistic summary of many GARMIN activities in a
+### SQLite database. Directories of FIT files are ingested in parallel, files
+### already stored in the archive are recognized by their content hash.
+####################################################################################
+
+__SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    name TEXT NOT NULL,
+    sport TEXT,
+    start_time TEXT,
+    moving_distance REAL,
+    moving_time REAL,
+    stopped_time REAL,
+    max_speed REAL,
+    min_elevation REAL,
+    max_elevation REAL,
+    uphill REAL,
+    downhill REAL,
+    point_count INTEGER NOT NULL,
+    min_latitude REAL,
+    max_latitude REAL,
+    min_longitude REAL,
+    max_longitude REAL
+);
+CREATE INDEX IF NOT EXISTS activities_start_time ON activities (start_time);
+"""
+
+# meteorological seasons, december counts to the winter of the following year
+__SEASON_KEY = """
+    CASE
+        WHEN CAST(strftime('%m', start_time) AS INTEGER) IN (12, 1, 2) THEN
+            (CAST(strftime('%Y', start_time) AS INTEGER) + (CAST(strftime('%m', start_time) AS INTEGER) = 12)) || ' winter'
+        WHEN CAST(strftime('%m', start_time) AS INTEGER) IN (3, 4, 5) THEN strftime('%Y', start_time) || ' spring'
+        WHEN CAST(strftime('%m', start_time) AS INTEGER) IN (6, 7, 8) THEN strftime('%Y', start_time) || ' summer'
+        ELSE strftime('%Y', start_time) || ' autumn'
+    END
+"""
+
+__GROUP_KEYS = {
+    "year" : "strftime('%Y', start_time)",
+    "month" : "strftime('%Y-%m', start_time)",
+    "season" : __SEASON_KEY
+}
+
+def OpenArchive(dbFilename : str) -> sqlite3.Connection:
+    """ Opens the archive database and creates the tables if needed.
+
+    Args:
+        dbFilename (str): The name of the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: The database connection.
+    """
+    db = sqlite3.connect(dbFilename)
+    db.executescript(__SCHEMA)
+    return db
+
+def HashFile(filename : str) -> str:
+    """ Calculates the content hash of a file.
+
+    Args:
+        filename (str): The name of the file.
+
+    Returns:
+        str: The SHA-256 hash as hex string.
+    """
+    sha = hashlib.sha256()
+
+    with open(filename, "rb") as file:
+        while True:
+            block = file.read(1 << 20)
+            if not block:
+                break
+            sha.update(block)
+
+    return sha.hexdigest()
+
+def AnalyzeFitFile(fitFilename : str, stoppedSpeedThreshold : float = DEFAULT_STOPPED_SPEED_THRESHOLD) -> dict[str, Any]:
+    """ Reads a FIT activity file and calculates the values stored in the archive.
+
+    Args:
+        fitFilename (str): The name of the FIT file.
+        stoppedSpeedThreshold (float, optional): Threshold speed to differ between move and pause. Defaults to 0.15.
+
+    Returns:
+        dict[str, Any]: The activity values with the column names of the archive as keys.
+    """
+    messages = ReadFitFile(fitFilename)
+    pointList = GetTrackPointsFromMessages(messages)
+
+    activity : dict[str, Any] = {
+        "filename" : str(Path(fitFilename).resolve()),
+        "name" : Path(fitFilename).stem,
+        "sport" : None,
+        "start_time" : None,
+        "point_count" : len(pointList)
+    }
+
+    if messages.get("sport_mesgs"):
+        activity["sport"] = str(messages["sport_mesgs"][0].get("sport"))
+
+    if messages.get("session_mesgs") and messages["session_mesgs"][0].get("start_time"):
+        activity["start_time"] = messages["session_mesgs"][0]["start_time"].strftime("%Y-%m-%d %H:%M:%S")
+    elif pointList:
+        activity["start_time"] = pointList[0].Time.strftime("%Y-%m-%d %H:%M:%S")
+
+    if not pointList:
+        return activity
+
+    gpx = CreateGpxTrackFromTrackPoints(pointList)
+
+    if gpx.has_elevations():
+        statistic = CalculateTrackStatistic(gpx, stoppedSpeedThreshold)
+
+        activity["moving_distance"] = statistic.MovingDistance
+        activity["moving_time"] = statistic.MovingTime
+        activity["stopped_time"] = statistic.StoppedTime
+        activity["max_speed"] = statistic.MaxSpeed
+        activity["min_elevation"] = statistic.MinElevation
+        activity["max_elevation"] = statistic.MaxElevation
+        activity["uphill"] = statistic.Uphill
+        activity["downhill"] = statistic.Downhill
+    else:
+        # without elevation data only the moving data is stored, the elevation columns stay empty
+        movingTime, stoppedTime, movingDistance, _, maxSpeed = gpx.get_moving_data(stopped_speed_threshold=stoppedSpeedThreshold)
+
+        activity["moving_distance"] = movingDistance
+        activity["moving_time"] = movingTime
+        activity["stopped_time"] = stoppedTime
+        activity["max_speed"] = maxSpeed
+
+    activity["min_latitude"] = min(p.Latitude for p in pointList)
+    activity["max_latitude"] = max(p.Latitude for p in pointList)
+    activity["min_longitude"] = min(p.Longitude for p in pointList)
+    activity["max_longitude"] = max(p.Longitude for p in pointList)
+
+    return activity
+
+def __StoreActivity(db : sqlite3.Connection, contentHash : str, activity : dict[str, Any]) -> int:
+    """ Stores the activity values in the archive.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        contentHash (str): The content hash of the FIT file.
+        activity (dict[str, Any]): The activity values.
+
+    Returns:
+        int: The ID of the activity.
+    """
+    columns = [ "content_hash" ] + list(activity.keys())
+    values = [ contentHash ] + list(activity.values())
+
+    cursor = db.execute(f"INSERT INTO activities ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", values)
+    return cursor.lastrowid # type: ignore
+
+def IngestFitFiles(db : sqlite3.Connection, fitFilenames : list[str], maxWorkers : int | None = None,
+                   stoppedSpeedThreshold : float = DEFAULT_STOPPED_SPEED_THRESHOLD) -> list[int]:
+    """ Reads FIT activity files in parallel and stores them in the archive.
+    Files already stored in the archive are skipped.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        fitFilenames (list[str]): The names of the FIT files.
+        maxWorkers (int | None, optional): The number of worker processes. Defaults to the number of CPUs.
+        stoppedSpeedThreshold (float, optional): Threshold speed to differ between move and pause. Defaults to 0.15.
+
+    Returns:
+        list[int]: The IDs of the new activities.
+    """
+    knownHashes = { row[0] for row in db.execute("SELECT content_hash FROM activities") }
+
+    newFiles : dict[str, str] = {}
+    for filename in fitFilenames:
+        contentHash = HashFile(filename)
+        if contentHash not in knownHashes and contentHash not in newFiles:
+            newFiles[contentHash] = filename
+
+    print(f"{len(fitFilenames)} FIT files, {len(newFiles)} new")
+
+    activityIds : list[int] = []
+    if not newFiles:
+        return activityIds
+
+    with ProcessPoolExecutor(maxWorkers) as pool:
+        futures = { pool.submit(AnalyzeFitFile, filename, stoppedSpeedThreshold) : contentHash for contentHash, filename in newFiles.items() }
+
+        for future in as_completed(futures):
+            contentHash = futures[future]
+            try:
+                activity = future.result()
+            except Exception as e:
+                print(f"ERROR: {newFiles[contentHash]}: {e}")
+                continue
+
+            activityIds.append(__StoreActivity(db, contentHash, activity))
+
+            if len(activityIds) % 100 == 0:
+                db.commit()
+
+    db.commit()
+    return activityIds
+
+def IngestDirectory(db : sqlite3.Connection, directory : str, maxWorkers : int | None = None,
+                    stoppedSpeedThreshold : float = DEFAULT_STOPPED_SPEED_THRESHOLD) -> list[int]:
+    """ Stores all FIT activity files of a directory and its subdirectories in the archive.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        directory (str): The directory.
+        maxWorkers (int | None, optional): The number of worker processes. Defaults to the number of CPUs.
+        stoppedSpeedThreshold (float, optional): Threshold speed to differ between move and pause. Defaults to 0.15.
+
+    Returns:
+        list[int]: The IDs of the new activities.
+    """
+    fitFilenames = sorted(str(p) for p in Path(directory).rglob("*") if p.is_file() and p.suffix.lower() == ".fit")
+    return IngestFitFiles(db, fitFilenames, maxWorkers, stoppedSpeedThreshold)
+
+def QuerySummary(db : sqlite3.Connection, groupBy : str, sport : str | None = None) -> list[tuple[Any, ...]]:
+    """ Sums up the activities per year, season or month.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        groupBy (str): The period: year, season, month.
+        sport (str | None, optional): Only activities of this sport, e.g. hiking. Defaults to all activities.
+
+    Returns:
+        list[tuple[Any, ...]]: Per period: period, number of activities, distance in m, moving time in s, uphill in m, downhill in m, maximum altitude in m.
+    """
+    if groupBy not in __GROUP_KEYS:
+        raise Exception(f"Invalid period: {groupBy} (must be one of {', '.join(__GROUP_KEYS)})")
+
+    key = __GROUP_KEYS[groupBy]
+    where = "WHERE start_time IS NOT NULL"
+    parameters : list[Any] = []
+    if sport is not None:
+        where += " AND sport = ?"
+        parameters.append(sport)
+
+    query = f"""
+        SELECT {key} AS period, COUNT(*), TOTAL(moving_distance), TOTAL(moving_time), TOTAL(uphill), TOTAL(downhill), MAX(max_elevation)
+        FROM activities {where}
+        GROUP BY period ORDER BY MIN(start_time)
+    """
+
+    return db.execute(query, parameters).fetchall()
+
+def PrintSummary(db : sqlite3.Connection, groupBy : str, sport : str | None = None) -> None:
+    """ Prints the activities summed up per year, season or month.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        groupBy (str): The period: year, season, month.
+        sport (str | None, optional): Only activities of this sport, e.g. hiking. Defaults to all activities.
+    """
+    print(f"{'Period':<14} {'Activities':>10} {'Length':>10} {'Moving time':>12} {'Uphill':>9} {'Downhill':>9} {'Max. alt.':>9}")
+
+    for period, count, distance, movingTime, uphill, downhill, maxElevation in QuerySummary(db, groupBy, sport):
+        hours, minutes, _ = TimespanToHoursMinutesSeconds(movingTime)
+        maxElevationStr = f"{maxElevation:.0f} m" if maxElevation is not None else "-"
+        print(f"{period:<14} {count:>10} {distance / 1000:>7.1f} km {hours:>6} h {minutes:02d} min {uphill:>7.0f} m {downhill:>7.0f} m {maxElevationStr:>9}")
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("activity_archive", description="Stores the statistic of many GARMIN activity FIT files in a SQLite archive and sums them up.")
+    argParser.add_argument("archive", help='archive filename "abc.sqlite"')
+    argParser.add_argument("-i", "--ingest", help="directory with FIT files to store in the archive", nargs="*", default=[])
+    argParser.add_argument("-s", "--summary", help="sum up the activities per period", choices=["year", "season", "month"], required=False)
+    argParser.add_argument("-sp", "--sport", help="sum up only activities of this sport, e.g. hiking", required=False)
+    argParser.add_argument("-w", "--workers", help="number of worker processes", required=False)
+    argParser.add_argument("-sst", "--stopped_speed_threshold", help="threshold speed to differ between move and pause", required=False)
+    args = argParser.parse_args()
+
+    maxWorkers = int(args.workers) if args.workers is not None else None
+    stoppedSpeedThreshold = float(args.stopped_speed_threshold) if args.stopped_speed_threshold is not None else DEFAULT_STOPPED_SPEED_THRESHOLD
+
+    archive = OpenArchive(args.archive)
+
+    for directory in args.ingest:
+        print(f"Ingest directory {directory} ...")
+        newIds = IngestDirectory(archive, directory, maxWorkers, stoppedSpeedThreshold)
+        print(f"{len(newIds)} activities added")
+
+    if args.summary is not None:
+        PrintSummary(archive, args.summary, args.sport)
+
+    archive.close()
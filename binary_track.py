@@ -0,0 +1,426 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import struct
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator
+import gpxpy
+import numpy as np
+from convert_fit_to_gpx import TrackPoint, ReadFitFile, IterTrackChunksFromMessages, IterTrackChunksFromGpx, WriteGpxFileSegments, DEFAULT_MAX_GAP_SECONDS
+
+####################################################################################
+### This module reads and writes tracks in a compact binary format which can be
+### memory mapped.
+###
+### The file starts with a header, followed by the column descriptors, the segment
+### index and the data columns:
+###
+###   header:      magic "HKTRACK\0", version, flags (reserved), number of segments,
+###                number of points, track type (32 bytes UTF-8)
+###   descriptors: for latitude, longitude, altitude and time each the integer
+###                width in bytes (0 = column missing), the first value and the
+###                file offset of the column
+###   index:       int64 index of the first point of each segment, followed by
+###                the number of points
+###   columns:     the differences to the previous point, each column stored with
+###                the smallest integer width holding all differences, aligned to
+###                8 bytes
+###
+### The position is stored in semicircles like in the FIT file, the altitude in
+### decimeters and the time in milliseconds since 1970-01-01 UTC. Typical tracks
+### need 1 or 2 bytes per column and point.
+####################################################################################
+
+TRACK_FILE_SUFFIX = ".bintrack"
+
+__MAGIC = b"HKTRACK\0"
+__VERSION = 1
+
+__HEADER = struct.Struct("<8sHHIQ32s")
+__COLUMN = struct.Struct("<B7xqQ")
+__COLUMN_COUNT = 4
+
+__INTEGER_TYPES = [ np.dtype("<i1"), np.dtype("<i2"), np.dtype("<i4"), np.dtype("<i8") ]
+
+class BinaryTrack:
+    """ A track read from a binary track file. """
+
+    Latitude : np.ndarray
+    """ Geographic latitudes in degrees. """
+
+    Longitude : np.ndarray
+    """ Geographic longitudes in degrees. """
+
+    Altitude : np.ndarray | None
+    """ Altitudes above sea level in meters, None if the track has no altitude. """
+
+    Time : np.ndarray | None
+    """ Timestamps in milliseconds since 1970-01-01 UTC, None if the track has no time. """
+
+    SegmentStarts : np.ndarray
+    """ The index of the first point of each segment, followed by the number of points. """
+
+    TrackType : str
+    """ The type of the track activity, e.g. hiking. """
+
+    def PointCount(self) -> int:
+        """ Returns the number of track points.
+
+        Returns:
+            int: The number of track points.
+        """
+        return len(self.Latitude)
+
+    def SegmentCount(self) -> int:
+        """ Returns the number of track segments.
+
+        Returns:
+            int: The number of track segments.
+        """
+        return len(self.SegmentStarts) - 1
+
+    def IterSegments(self) -> Iterator[list[TrackPoint]]:
+        """ Returns the track points of each segment.
+
+        Yields:
+            list[TrackPoint]: The track points of a segment.
+        """
+        for segmentIdx in range(self.SegmentCount()):
+            start = int(self.SegmentStarts[segmentIdx])
+            end = int(self.SegmentStarts[segmentIdx + 1])
+
+            pointList : list[TrackPoint] = []
+            for idx in range(start, end):
+                point = TrackPoint()
+                point.Latitude = float(self.Latitude[idx])
+                point.Longitude = float(self.Longitude[idx])
+                point.Altitude = float(self.Altitude[idx]) if self.Altitude is not None else None # type: ignore
+                point.Time = datetime.fromtimestamp(int(self.Time[idx]) / 1000, timezone.utc) if self.Time is not None else None # type: ignore
+                pointList.append(point)
+
+            yield pointList
+
+def __SmallestIntegerType(values : np.ndarray) -> np.dtype:
+    """ Returns the smallest integer type which holds all values.
+
+    Args:
+        values (np.ndarray): The values.
+
+    Returns:
+        np.dtype: The integer type.
+    """
+    if len(values) == 0:
+        return __INTEGER_TYPES[0]
+
+    minValue = int(values.min())
+    maxValue = int(values.max())
+
+    for dtype in __INTEGER_TYPES:
+        info = np.iinfo(dtype)
+        if minValue >= info.min and maxValue <= info.max:
+            return dtype
+
+    raise Exception("value out of range")
+
+def __DeltaEncode(values : np.ndarray) -> tuple[int, np.ndarray]:
+    """ Encodes the values as first value and differences to the previous value.
+
+    Args:
+        values (np.ndarray): The int64 values.
+
+    Returns:
+        tuple[int, np.ndarray]: The first value and the differences in the smallest possible integer type.
+    """
+    if len(values) == 0:
+        return 0, values.astype(__INTEGER_TYPES[0])
+
+    deltas = np.diff(values, prepend=values[0])
+    return int(values[0]), deltas.astype(__SmallestIntegerType(deltas))
+
+def __Align(offset : int) -> int:
+    """ Rounds the file offset up to a multiple of 8 bytes. """
+    return (offset + 7) & ~7
+
+def WriteBinaryTrackColumns(filename : str, latitude : np.ndarray, longitude : np.ndarray,
+                            altitude : np.ndarray | None, time : np.ndarray | None,
+                            segmentStarts : np.ndarray, trackType : str = "") -> None:
+    """ Writes a binary track file.
+
+    Args:
+        filename (str): The name of the binary track file.
+        latitude (np.ndarray): The latitudes in semicircles.
+        longitude (np.ndarray): The longitudes in semicircles.
+        altitude (np.ndarray | None): The altitudes in decimeters, None if the track has no altitude.
+        time (np.ndarray | None): The timestamps in milliseconds since 1970-01-01 UTC, None if the track has no time.
+        segmentStarts (np.ndarray): The index of the first point of each segment, followed by the number of points.
+        trackType (str, optional): The type of the track activity, e.g. hiking. Defaults to "".
+    """
+    pointCount = len(latitude)
+    segmentStarts = np.asarray(segmentStarts, dtype="<i8")
+
+    columns : list[tuple[int, np.ndarray | None]] = []
+    for values in (latitude, longitude, altitude, time):
+        if values is None:
+            columns.append((0, None))
+        else:
+            columns.append(__DeltaEncode(np.asarray(values, dtype=np.int64)))
+
+    # file layout
+    offset = __HEADER.size + __COLUMN_COUNT * __COLUMN.size + segmentStarts.nbytes
+    offsets : list[int] = []
+    for _, deltas in columns:
+        offset = __Align(offset)
+        offsets.append(offset if deltas is not None else 0)
+        if deltas is not None:
+            offset += deltas.nbytes
+
+    with open(filename, "wb") as file:
+        file.write(__HEADER.pack(__MAGIC, __VERSION, 0, len(segmentStarts) - 1, pointCount, trackType.encode("utf-8")[:32]))
+
+        for (base, deltas), columnOffset in zip(columns, offsets):
+            width = deltas.dtype.itemsize if deltas is not None else 0
+            file.write(__COLUMN.pack(width, base, columnOffset))
+
+        file.write(segmentStarts.tobytes())
+
+        for (_, deltas), columnOffset in zip(columns, offsets):
+            if deltas is None:
+                continue
+            file.write(b"\0" * (columnOffset - file.tell()))
+            file.write(deltas.tobytes())
+
+def WriteBinaryTrack(filename : str, segments : Iterable[list[TrackPoint]], trackType : str = "") -> None:
+    """ Writes track points to a binary track file.
+    Missing altitudes are filled with the previous altitude, the time is only stored if all points have a time.
+
+    Args:
+        filename (str): The name of the binary track file.
+        segments (Iterable[list[TrackPoint]]): The track segments, each a list of track points.
+        trackType (str, optional): The type of the track activity, e.g. hiking. Defaults to "".
+    """
+    latitude : list[float] = []
+    longitude : list[float] = []
+    altitude : list[float] = []
+    time : list[float] = []
+    segmentStarts = [ 0 ]
+
+    for pointList in segments:
+        for p in pointList:
+            latitude.append(p.Latitude)
+            longitude.append(p.Longitude)
+            altitude.append(p.Altitude if p.Altitude is not None else np.nan)
+
+            if p.Time is None:
+                time.append(np.nan)
+            elif p.Time.tzinfo is None:
+                # GPX times without time zone are UTC
+                time.append(p.Time.replace(tzinfo=timezone.utc).timestamp())
+            else:
+                time.append(p.Time.timestamp())
+
+        if len(latitude) > segmentStarts[-1]:
+            segmentStarts.append(len(latitude))
+
+    if len(segmentStarts) == 1:
+        raise Exception("the track has no points")
+
+    # degrees to semicircles, rounded so FIT positions are stored without loss
+    semicircles = (2 ** 31) / 180.0
+    latitudeColumn = np.rint(np.array(latitude) * semicircles).astype(np.int64)
+    longitudeColumn = np.rint(np.array(longitude) * semicircles).astype(np.int64)
+
+    altitudeColumn = None
+    altitudeArray = np.array(altitude)
+    valid = ~np.isnan(altitudeArray)
+    if valid.any():
+        # fill missing altitudes with the previous (or the first) altitude
+        fillIdx = np.maximum.accumulate(np.where(valid, np.arange(len(altitudeArray)), 0))
+        fillIdx[:np.argmax(valid)] = np.argmax(valid)
+        altitudeColumn = np.rint(altitudeArray[fillIdx] * 10).astype(np.int64)
+
+    timeColumn = None
+    timeArray = np.array(time)
+    if not np.isnan(timeArray).any():
+        timeColumn = np.rint(timeArray * 1000).astype(np.int64)
+
+    WriteBinaryTrackColumns(filename, latitudeColumn, longitudeColumn, altitudeColumn, timeColumn, np.array(segmentStarts), trackType)
+
+def ReadBinaryTrack(filename : str) -> BinaryTrack:
+    """ Reads a binary track file. The columns are memory mapped and decoded with vectorized operations.
+
+    Args:
+        filename (str): The name of the binary track file.
+
+    Returns:
+        BinaryTrack: The track.
+    """
+    with open(filename, "rb") as file:
+        header = file.read(__HEADER.size + __COLUMN_COUNT * __COLUMN.size)
+
+    if len(header) < __HEADER.size or header[:8] != __MAGIC:
+        raise Exception(f"{filename} is not a binary track file")
+
+    _, version, _, segmentCount, pointCount, trackType = __HEADER.unpack_from(header)
+    if version != __VERSION:
+        raise Exception(f"unsupported binary track file version {version}")
+
+    indexOffset = __HEADER.size + __COLUMN_COUNT * __COLUMN.size
+    segmentStarts = np.array(np.memmap(filename, dtype="<i8", mode="r", offset=indexOffset, shape=(segmentCount + 1,)))
+
+    values : list[np.ndarray | None] = []
+    for columnIdx in range(__COLUMN_COUNT):
+        width, base, offset = __COLUMN.unpack_from(header, __HEADER.size + columnIdx * __COLUMN.size)
+        if width == 0:
+            values.append(None)
+            continue
+
+        dtype = np.dtype(f"<i{width}")
+        deltas = np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=(pointCount,)) if pointCount > 0 else np.zeros(0, dtype)
+        column = np.cumsum(deltas, dtype=np.int64)
+        column += base
+        values.append(column)
+        del deltas
+
+    latitude, longitude, altitude, time = values
+    if latitude is None or longitude is None:
+        raise Exception(f"{filename} has no track positions")
+
+    track = BinaryTrack()
+    track.Latitude = latitude * (180.0 / (2 ** 31))
+    track.Longitude = longitude * (180.0 / (2 ** 31))
+    track.Altitude = altitude / 10.0 if altitude is not None else None
+    track.Time = time
+    track.SegmentStarts = segmentStarts
+    track.TrackType = trackType.rstrip(b"\0").decode("utf-8")
+
+    return track
+
+def ConvertFitFileToBinaryTrack(fitFilename : str, filename : str, splitSegments : bool = False,
+                                maxGapSeconds : float = DEFAULT_MAX_GAP_SECONDS) -> None:
+    """ Converts a Garmin FIT file to a binary track file.
+
+    Args:
+        fitFilename (str): The name of the FIT file.
+        filename (str): The name of the binary track file.
+        splitSegments (bool, optional): Split the track into segments at sessions and long time gaps. Defaults to False.
+        maxGapSeconds (float, optional): A time gap longer than this starts a new segment. Defaults to 3600.
+    """
+    messages = ReadFitFile(fitFilename)
+    trackType = messages["sport_mesgs"][0]["sport"] if messages.get("sport_mesgs") else ""
+
+    if splitSegments:
+        chunks = IterTrackChunksFromMessages(messages, maxGapSeconds)
+    else:
+        chunks = IterTrackChunksFromMessages(messages, float("inf"))
+
+    WriteBinaryTrack(filename, chunks, str(trackType))
+
+def ConvertGpxFileToBinaryTrack(gpxFilename : str, filename : str) -> None:
+    """ Converts a GPX file to a binary track file. Each track segment of the GPX file is stored as segment.
+
+    Args:
+        gpxFilename (str): The name of the GPX file.
+        filename (str): The name of the binary track file.
+    """
+    with open(gpxFilename, "r") as file:
+        gpx = gpxpy.parse(file)
+
+    trackType = gpx.tracks[0].type if gpx.tracks and gpx.tracks[0].type else ""
+    WriteBinaryTrack(filename, IterTrackChunksFromGpx(gpx), trackType)
+
+def ConvertBinaryTrackToGpxFile(filename : str, gpxFilename : str) -> None:
+    """ Converts a binary track file to a GPX file.
+
+    Args:
+        filename (str): The name of the binary track file.
+        gpxFilename (str): The name of the GPX file.
+    """
+    track = ReadBinaryTrack(filename)
+    if track.Altitude is None or track.Time is None:
+        raise Exception("GPX export needs altitude and time of the track points")
+
+    WriteGpxFileSegments(gpxFilename, Path(filename).stem, track.TrackType, track.IterSegments())
+
+def PrintBinaryTrackInfo(filename : str) -> None:
+    """ Prints a summary of a binary track file.
+
+    Args:
+        filename (str): The name of the binary track file.
+    """
+    track = ReadBinaryTrack(filename)
+
+    print(f"Track type: {track.TrackType}")
+    print(f"Number of points: {track.PointCount()}")
+    print(f"Number of segments: {track.SegmentCount()}")
+    print(f"File size: {Path(filename).stat().st_size} bytes")
+
+    if track.Time is not None and track.PointCount() > 0:
+        start = datetime.fromtimestamp(int(track.Time[0]) / 1000, timezone.utc)
+        end = datetime.fromtimestamp(int(track.Time[-1]) / 1000, timezone.utc)
+        print(f"Start: {start}  End: {end}")
+
+    if track.Altitude is not None and track.PointCount() > 0:
+        print(f"Minimum altitude: {track.Altitude.min():.1f} m Maximum altitude: {track.Altitude.max():.1f} m")
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("binary_track", description="Converts FIT and GPX tracks to the compact binary track format and back.")
+    argParser.add_argument("filename", help='input filename "abc.FIT", "abc.GPX" or "abc.bintrack"')
+    argParser.add_argument("-o", "--output", help="output filename, a binary track is converted to GPX", required=False)
+    argParser.add_argument("-s", "--split", help="split a FIT track into segments at sessions and long time gaps", action="store_true")
+    argParser.add_argument("-mg", "--max_gap", help="time gap in seconds starting a new segment (default 3600)", type=float, default=DEFAULT_MAX_GAP_SECONDS)
+    argParser.add_argument("-i", "--info", help="print a summary of a binary track file", action="store_true")
+    args = argParser.parse_args()
+
+    inputFilename : str = args.filename
+    suffix = Path(inputFilename).suffix.lower()
+
+    if suffix == TRACK_FILE_SUFFIX:
+        if args.info:
+            PrintBinaryTrackInfo(inputFilename)
+        else:
+            outputFilename = args.output if args.output is not None else str(Path(inputFilename).with_suffix(".gpx"))
+            ConvertBinaryTrackToGpxFile(inputFilename, outputFilename)
+    else:
+        outputFilename = args.output if args.output is not None else str(Path(inputFilename).with_suffix(TRACK_FILE_SUFFIX))
+
+        if suffix == ".fit":
+            ConvertFitFileToBinaryTrack(inputFilename, outputFilename, args.split, args.max_gap)
+        elif suffix == ".gpx":
+            ConvertGpxFileToBinaryTrack(inputFilename, outputFilename)
+        else:
+            raise Exception(f"unknown file type {suffix}")
+
+        PrintBinaryTrackInfo(outputFilename)
+
+    print("done")
@@ -0,0 +1,97 @@
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+import pytest
+import garmin_fit_sdk # type: ignore
+from garmin_fit_sdk import Profile # type: ignore
+
+####################################################################################
+### Shared test data: FIT activity files encoded with the Garmin SDK, like the
+### files written by a device.
+####################################################################################
+
+def __DegreesToSemicircles(degrees : float) -> int:
+    """ Converts degrees to the FIT semicircles. """
+    return int(degrees * 2 ** 31 / 180)
+
+def WriteFitFile(filename : Path, numPoints : int, sessionStarts : tuple[int, ...] = (),
+                 startTime : datetime = datetime(2025, 5, 9, 8, 0, tzinfo=timezone.utc), seed : int = 0) -> None:
+    """ Writes a hiking activity with a noisy track, a pause every 50 points and a night between the sessions.
+
+    Args:
+        filename (Path): The name of the FIT file.
+        numPoints (int): The number of track points.
+        sessionStarts (tuple[int, ...], optional): The indices of the points starting a new session. Defaults to one session.
+        startTime (datetime, optional): The time of the first point.
+        seed (int, optional): The seed of the random GPS noise. Defaults to 0.
+    """
+    mesgNum = Profile["mesg_num"]
+    rand = random.Random(seed)
+
+    encoder = garmin_fit_sdk.Encoder()
+    encoder.on_mesg(mesgNum["FILE_ID"], { "type" : "activity", "manufacturer" : "garmin", "time_created" : startTime })
+    encoder.on_mesg(mesgNum["SPORT"], { "sport" : "hiking" })
+
+    time = sessionStart = startTime
+    latitude, longitude = 50.92, 13.97
+
+    for idx in range(numPoints):
+        if idx in sessionStarts:
+            encoder.on_mesg(mesgNum["SESSION"], { "timestamp" : time, "start_time" : sessionStart,
+                                                  "total_elapsed_time" : (time - sessionStart).total_seconds(), "sport" : "hiking" })
+            time += timedelta(hours=14)
+            sessionStart = time
+
+        latitude += 0.00001 * math.cos(idx / 200 + seed) + rand.gauss(0.0, 0.000003)
+        longitude += 0.000012 * math.sin(idx / 300 + seed) + rand.gauss(0.0, 0.000003)
+        altitude = 300 + 100 * math.sin(idx / 500) + rand.gauss(0.0, 1.0)
+
+        encoder.on_mesg(mesgNum["RECORD"], { "timestamp" : time, "position_lat" : __DegreesToSemicircles(latitude),
+                                             "position_long" : __DegreesToSemicircles(longitude),
+                                             "enhanced_altitude" : altitude, "altitude" : altitude })
+        time += timedelta(seconds=1 if idx % 50 else 30)
+
+    encoder.on_mesg(mesgNum["SESSION"], { "timestamp" : time, "start_time" : sessionStart,
+                                          "total_elapsed_time" : (time - sessionStart).total_seconds(), "sport" : "hiking" })
+
+    filename.write_bytes(encoder.close())
+
+@pytest.fixture
+def fit_file(tmp_path : Path) -> Path:
+    """ A FIT activity with one session. """
+    filename = tmp_path / "activity.fit"
+    WriteFitFile(filename, 2000)
+    return filename
+
+@pytest.fixture
+def multi_session_fit_file(tmp_path : Path) -> Path:
+    """ A FIT activity of two days with a session per day. """
+    filename = tmp_path / "two_days.fit"
+    WriteFitFile(filename, 3000, (1200,), seed=1)
+    return filename
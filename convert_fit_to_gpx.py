@@ -29,9 +29,15 @@ import gpxpy.gpx
 import garmin_fit_sdk as garmin # type: ignore
 import xml.dom.minidom as xmd
 import argparse
-from datetime import datetime
-from typing import Any
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator
 from pathlib import Path
+from publish_profiler import Stage, Count
+from track_resample import ResampleColumns, RESAMPLE_MODES
 
 class TrackPoint:
     """ Represents a single GPS track point with position and time information. """
@@ -70,8 +76,29 @@ def DegreesToSemicircles(degrees : float) -> int:
     """
     return int(degrees * (2 ** 31) / 180.0)
 
+# decoded FIT files: (filename, modification time, size) -> messages
+__fitFileCache : OrderedDict[tuple[str, int, int], dict[str, list[Any]]] = OrderedDict()
+__fitFileCacheSize = 1
+__fitFileCacheLock = threading.Lock()
+
+def SetFitFileCacheSize(size : int) -> None:
+    """ Sets the number of decoded FIT files kept in memory.
+    A file is decoded again when it was changed.
+
+    Args:
+        size (int): The number of FIT files, 0 switches the cache off.
+    """
+    global __fitFileCacheSize
+
+    with __fitFileCacheLock:
+        __fitFileCacheSize = size
+        while len(__fitFileCache) > __fitFileCacheSize:
+            __fitFileCache.popitem(last=False)
+
 def ReadFitFile(fitFilename : str) -> dict[str, list[Any]]:
     """ Reads the Garmin FIT file.
+    The last decoded files are kept in memory, see SetFitFileCacheSize().
+    The returned messages are shared and must not be changed.
 
     Args:
         fitFilename (str): The name of the FIT file.
@@ -79,16 +106,37 @@ def ReadFitFile(fitFilename : str) -> dict[str, list[Any]]:
     Returns:
         dict[str, list[Any]]: The messages stored in the FIT file.
     """
-    stream = garmin.Stream.from_file(fitFilename) # type: ignore
+    stat = os.stat(fitFilename)
+    cacheKey = (str(Path(fitFilename).resolve()), stat.st_mtime_ns, stat.st_size)
 
-    decoder = garmin.Decoder(stream)
-    if not decoder.is_fit():
-        raise Exception("not a FIT file")
-    if not decoder.check_integrity():
-        raise Exception("FIT file is corrupt")
+    with __fitFileCacheLock:
+        cachedMessages = __fitFileCache.get(cacheKey)
+        if cachedMessages is not None:
+            __fitFileCache.move_to_end(cacheKey)
 
-    stream.reset()
-    messages, _ = decoder.read() # type: ignore
+    if cachedMessages is not None:
+        Count("FIT file cache hits")
+        return cachedMessages
+
+    with Stage("decode FIT file"):
+        stream = garmin.Stream.from_file(fitFilename) # type: ignore
+
+        decoder = garmin.Decoder(stream)
+        if not decoder.is_fit():
+            raise Exception("not a FIT file")
+        if not decoder.check_integrity():
+            raise Exception("FIT file is corrupt")
+
+        stream.reset()
+        messages, _ = decoder.read() # type: ignore
+
+    Count("FIT files decoded")
+
+    with __fitFileCacheLock:
+        if __fitFileCacheSize > 0:
+            __fitFileCache[cacheKey] = messages # type: ignore
+            while len(__fitFileCache) > __fitFileCacheSize:
+                __fitFileCache.popitem(last=False)
 
     # print start time of the activity
     if "session_mesgs" in messages and messages["session_mesgs"]:
@@ -98,6 +146,28 @@ def ReadFitFile(fitFilename : str) -> dict[str, list[Any]]:
 
     return messages # type: ignore
 
+# a time gap longer than this splits the track into segments, e.g. the nights of a multi-day hike
+DEFAULT_MAX_GAP_SECONDS = 3600.0
+
+def __CreateTrackPoint(msg : dict[str, Any]) -> TrackPoint:
+    """ Creates a track point from a FIT record message.
+
+    Args:
+        msg (dict[str, Any]): The record message.
+
+    Returns:
+        TrackPoint: The track point.
+    """
+    point = TrackPoint()
+
+    point.Latitude = SemicircleToDegress(msg["position_lat"])
+    point.Longitude = SemicircleToDegress(msg["position_long"])
+    # devices without barometer or indoor activities record no altitude
+    point.Altitude = msg.get("enhanced_altitude", msg.get("altitude"))
+    point.Time = msg["timestamp"]
+
+    return point
+
 def GetTrackPointsFromMessages(messages : dict[str, list[Any]]) -> list[TrackPoint]:
     """ Returns the list of track points.
 
@@ -113,16 +183,99 @@ def GetTrackPointsFromMessages(messages : dict[str, list[Any]]) -> list[TrackPoi
         if "position_lat" not in msg or "position_long" not in msg:
             continue
         
-        point = TrackPoint()
+        pointList.append(__CreateTrackPoint(msg))
 
-        point.Latitude = SemicircleToDegress(msg["position_lat"])
-        point.Longitude = SemicircleToDegress(msg["position_long"])
-        point.Altitude = msg["enhanced_altitude"]
-        point.Time = msg["timestamp"]
+    return pointList
 
-        pointList.append(point)
+def IterTrackChunksFromMessages(messages : dict[str, list[Any]],
+                                maxGapSeconds : float = DEFAULT_MAX_GAP_SECONDS, splitOnLaps : bool = False,
+                                removePointsBegin : int = 0, removePointsEnd : int = 0) -> Iterator[list[TrackPoint]]:
+    """ Returns the track points split into chunks at the start of each session, at long time gaps
+    and optionally at the start of each lap. Only the track points of one chunk are created at a time,
+    so a caller processing chunk by chunk keeps the memory bounded.
 
-    return pointList
+    Args:
+        messages (dict[str, list[Any]]): The FIT file messages.
+        maxGapSeconds (float, optional): A time gap longer than this starts a new chunk. Defaults to 3600.
+        splitOnLaps (bool, optional): Start a new chunk at the start of each lap. Defaults to False.
+        removePointsBegin (int, optional): Number of points to remove from the beginning of the track. Defaults to 0.
+        removePointsEnd (int, optional): Number of points to remove from the end of the track. Defaults to 0.
+
+    Yields:
+        list[TrackPoint]: The track points of a chunk.
+    """
+    records = messages["record_mesgs"]
+    pointCount = sum(1 for msg in records if "position_lat" in msg and "position_long" in msg)
+    endIdx = pointCount - removePointsEnd
+
+    boundaries = [ msg["start_time"] for msg in messages.get("session_mesgs", [])[1:] if msg.get("start_time") ]
+    if splitOnLaps:
+        boundaries += [ msg["start_time"] for msg in messages.get("lap_mesgs", [])[1:] if msg.get("start_time") ]
+    boundaries.sort()
+
+    chunk : list[TrackPoint] = []
+    boundaryIdx = 0
+    pointIdx = -1
+    previousTime = None
+
+    for msg in records:
+        if "position_lat" not in msg or "position_long" not in msg:
+            continue
+
+        pointIdx += 1
+        if pointIdx < removePointsBegin or pointIdx >= endIdx:
+            continue
+
+        time = msg["timestamp"]
+
+        startChunk = previousTime is not None and (time - previousTime).total_seconds() > maxGapSeconds
+        while boundaryIdx < len(boundaries) and time >= boundaries[boundaryIdx]:
+            boundaryIdx += 1
+            startChunk = True
+
+        if startChunk and chunk:
+            yield chunk
+            chunk = []
+
+        chunk.append(__CreateTrackPoint(msg))
+        previousTime = time
+
+    if chunk:
+        yield chunk
+
+def ResampleTrackPoints(pointList : list[TrackPoint], mode : str, step : float | None = None) -> list[TrackPoint]:
+    """ Resamples track points onto a uniform time or distance grid, see track_resample.
+
+    Args:
+        pointList (list[TrackPoint]): The track points of one segment.
+        mode (str): The grid: time or distance.
+        step (float | None, optional): The grid step in seconds or meters. Defaults to 5 s or 10 m.
+
+    Returns:
+        list[TrackPoint]: The resampled track points.
+    """
+    if len(pointList) < 2:
+        return list(pointList)
+
+    time = np.array([ p.Time.timestamp() for p in pointList ])
+    latitude = np.array([ p.Latitude for p in pointList ])
+    longitude = np.array([ p.Longitude for p in pointList ])
+    altitude = np.array([ p.Altitude for p in pointList ], dtype=np.float64)
+
+    time, latitude, longitude, altitude = ResampleColumns(time, latitude, longitude, altitude, mode, step)
+    Count("resampled track points", len(time))
+
+    resampled : list[TrackPoint] = []
+    for t, lat, lon, alt in zip(time.tolist(), latitude.tolist(), longitude.tolist(), altitude.tolist()):
+        point = TrackPoint()
+        point.Latitude = lat
+        point.Longitude = lon
+        point.Altitude = alt
+        # the distance grid interpolates fractional times, FIT and GPX times are whole seconds
+        point.Time = datetime.fromtimestamp(round(t), timezone.utc)
+        resampled.append(point)
+
+    return resampled
 
 def __CreateNodeTrkSeq(doc : xmd.Document, pointList : list[TrackPoint]) -> xmd.Element:
     """ Creates the GPX track sequence.
@@ -148,20 +301,21 @@ def __CreateNodeTrkSeq(doc : xmd.Document, pointList : list[TrackPoint]) -> xmd.
         nodeTrkPt.appendChild(nodeTime)
         nodeTime.appendChild(doc.createTextNode(point.Time.strftime("%Y-%m-%dT%H:%M:%SZ")))
 
-        nodeEle = doc.createElement("ele")
-        nodeTrkPt.appendChild(nodeEle)
-        nodeEle.appendChild(doc.createTextNode(f"{point.Altitude:.3f}"))
+        if point.Altitude is not None:
+            nodeEle = doc.createElement("ele")
+            nodeTrkPt.appendChild(nodeEle)
+            nodeEle.appendChild(doc.createTextNode(f"{point.Altitude:.3f}"))
 
     return nodeTrkSeq
 
-def __CreateNodeTrk(doc : xmd.Document, name : str, trackType : str, pointList : list[TrackPoint]) -> xmd.Element:
+def __CreateNodeTrk(doc : xmd.Document, name : str, trackType : str, segments : Iterable[list[TrackPoint]]) -> xmd.Element:
     """ Creates the GPX track node.
 
     Args:
         doc (xmd.Document): The XML document.
         name (str): The name of the track.
         trackType (str): The type of the track activity, e.g. hiking.
-        pointList (list[TrackPoint]): List of track points.
+        segments (Iterable[list[TrackPoint]]): The track segments, each a list of track points.
 
     Returns:
         xmd.Element: The GPX track node.
@@ -177,8 +331,9 @@ def __CreateNodeTrk(doc : xmd.Document, name : str, trackType : str, pointList :
     nodeType.appendChild(doc.createTextNode(trackType))
     nodeTrk.appendChild(nodeType)
 
-    nodeTrkSeq = __CreateNodeTrkSeq(doc, pointList)
-    nodeTrk.appendChild(nodeTrkSeq)
+    for pointList in segments:
+        nodeTrkSeq = __CreateNodeTrkSeq(doc, pointList)
+        nodeTrk.appendChild(nodeTrkSeq)
 
     return nodeTrk
 
@@ -191,6 +346,17 @@ def WriteGpxFile(gpxFilename : str, name : str, trackType : str, pointList : lis
         trackType (str): The type of the track activity, e.g. hiking.
         pointList (list[TrackPoint]): List of track points.
     """
+    WriteGpxFileSegments(gpxFilename, name, trackType, [ pointList ])
+
+def WriteGpxFileSegments(gpxFilename : str, name : str, trackType : str, segments : Iterable[list[TrackPoint]]) -> None:
+    """ Writes the GPX file with a track consisting of several segments.
+
+    Args:
+        gpxFilename (str): The name of the file.
+        name (str): The name of the track.
+        trackType (str): The type of the track activity, e.g. hiking.
+        segments (Iterable[list[TrackPoint]]): The track segments, each a list of track points.
+    """
     doc = xmd.getDOMImplementation().createDocument(None, "gpx", None)
     
     nodeGpx = doc.documentElement
@@ -203,13 +369,15 @@ def WriteGpxFile(gpxFilename : str, name : str, trackType : str, pointList : lis
     nodeGpx.setAttribute("xmlns:xsi", "http://www.w3.org/2001/XMLSchema-instance")
     nodeGpx.setAttribute("xsi:schemaLocation", "http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/11.xsd")
 
-    nodeTrk = __CreateNodeTrk(doc, name, trackType, pointList)
+    nodeTrk = __CreateNodeTrk(doc, name, trackType, segments)
     nodeGpx.appendChild(nodeTrk)
 
     with open(gpxFilename, "w") as file:
         doc.writexml(file, encoding="UTF-8", addindent="  ", newl="\n")
 
-def ConvertFitFileToGpxFile(fitFilename : str, gpxFilename : str, removePointsBegin : int = 0, removePointsEnd : int = 0) -> None:
+def ConvertFitFileToGpxFile(fitFilename : str, gpxFilename : str, removePointsBegin : int = 0, removePointsEnd : int = 0,
+                            splitSegments : bool = False, maxGapSeconds : float = DEFAULT_MAX_GAP_SECONDS, splitOnLaps : bool = False,
+                            resampleMode : str | None = None, resampleStep : float | None = None) -> None:
     """ Converts a Garmin FIT file to a GPX track.
 
     Args:
@@ -217,33 +385,66 @@ def ConvertFitFileToGpxFile(fitFilename : str, gpxFilename : str, removePointsBe
         gpxFilename (str): The name of the GPX file.
         removePointsBegin (int, optional): Number of points to remove from the beginning of the track. Defaults to 0.
         removePointsEnd (int, optional): Number of points to remove from the end of the track. Defaults to 0.
+        splitSegments (bool, optional): Split the track into segments at sessions and long time gaps. Defaults to False.
+        maxGapSeconds (float, optional): A time gap longer than this starts a new segment. Defaults to 3600.
+        splitOnLaps (bool, optional): Also start a new segment at each lap. Defaults to False.
+        resampleMode (str | None, optional): Resample the track onto a uniform time or distance grid. Defaults to no resampling.
+        resampleStep (float | None, optional): The grid step in seconds or meters. Defaults to 5 s or 10 m.
     """
     messages = ReadFitFile(fitFilename)
 
     trackType = messages["sport_mesgs"][0]["sport"]
-    pointList = GetTrackPointsFromMessages(messages)
 
-    if removePointsBegin > 0:
-        pointList = pointList[removePointsBegin : ]
+    if splitSegments:
+        segments = list(IterTrackChunksFromMessages(messages, maxGapSeconds, splitOnLaps, removePointsBegin, removePointsEnd))
+    else:
+        pointList = GetTrackPointsFromMessages(messages)
 
-    if removePointsEnd > 0:
-        pointList = pointList[ : -removePointsEnd]
+        if removePointsBegin > 0:
+            pointList = pointList[removePointsBegin : ]
 
-    print(f"Number of points: {len(pointList)}")
+        if removePointsEnd > 0:
+            pointList = pointList[ : -removePointsEnd]
+
+        segments = [ pointList ]
+
+    if resampleMode is not None:
+        segments = [ ResampleTrackPoints(segment, resampleMode, resampleStep) for segment in segments ]
+
+    print(f"Number of points: {sum(len(segment) for segment in segments)}")
+    if splitSegments:
+        print(f"Number of segments: {len(segments)}")
     
     name = Path(fitFilename).stem
-    WriteGpxFile(gpxFilename, name, trackType, pointList)
+    WriteGpxFileSegments(gpxFilename, name, trackType, segments)
 
-def CreateGpxTrackFromFitActivity(fitFilename : str, removePointsBegin : int = 0, removePointsEnd : int = 0) -> gpxpy.gpx.GPX:
+def CreateGpxTrackFromFitActivity(fitFilename : str, removePointsBegin : int = 0, removePointsEnd : int = 0,
+                                  splitSegments : bool = False, maxGapSeconds : float = DEFAULT_MAX_GAP_SECONDS,
+                                  splitOnLaps : bool = False, resampleMode : str | None = None,
+                                  resampleStep : float | None = None) -> gpxpy.gpx.GPX:
     """ Converts FIT activity track to GPX track.
 
     Args:
         fitFilename (str): The FIT activity filename.
+        removePointsBegin (int, optional): Number of points to remove from the beginning of the track. Defaults to 0.
+        removePointsEnd (int, optional): Number of points to remove from the end of the track. Defaults to 0.
+        splitSegments (bool, optional): Split the track into segments at sessions and long time gaps. Defaults to False.
+        maxGapSeconds (float, optional): A time gap longer than this starts a new segment. Defaults to 3600.
+        splitOnLaps (bool, optional): Also start a new segment at each lap. Defaults to False.
+        resampleMode (str | None, optional): Resample the track onto a uniform time or distance grid. Defaults to no resampling.
+        resampleStep (float | None, optional): The grid step in seconds or meters. Defaults to 5 s or 10 m.
 
     Returns:
         gpxpy.gpx.GPX: The GPX track.
     """
     messages = ReadFitFile(fitFilename)
+
+    if splitSegments:
+        chunks = IterTrackChunksFromMessages(messages, maxGapSeconds, splitOnLaps, removePointsBegin, removePointsEnd)
+        if resampleMode is not None:
+            chunks = (ResampleTrackPoints(chunk, resampleMode, resampleStep) for chunk in chunks)
+        return CreateGpxTrackFromTrackChunks(chunks)
+
     pointList = GetTrackPointsFromMessages(messages)
 
     if removePointsBegin > 0:
@@ -252,20 +453,67 @@ def CreateGpxTrackFromFitActivity(fitFilename : str, removePointsBegin : int = 0
     if removePointsEnd > 0:
         pointList = pointList[ : -removePointsEnd]
 
+    if resampleMode is not None:
+        pointList = ResampleTrackPoints(pointList, resampleMode, resampleStep)
+
+    return CreateGpxTrackFromTrackPoints(pointList)
+
+def CreateGpxTrackFromTrackPoints(pointList : list[TrackPoint]) -> gpxpy.gpx.GPX:
+    """ Converts track points to a GPX track.
+
+    Args:
+        pointList (list[TrackPoint]): List of track points.
+
+    Returns:
+        gpxpy.gpx.GPX: The GPX track.
+    """
+    return CreateGpxTrackFromTrackChunks([ pointList ])
+
+def IterTrackChunksFromGpx(gpx : gpxpy.gpx.GPX) -> Iterator[list[TrackPoint]]:
+    """ Returns the track points of each segment of a GPX track.
+
+    Args:
+        gpx (gpxpy.gpx.GPX): The GPX track.
+
+    Yields:
+        list[TrackPoint]: The track points of a segment.
+    """
+    for track in gpx.tracks:
+        for segment in track.segments:
+            pointList : list[TrackPoint] = []
+            for p in segment.points:
+                point = TrackPoint()
+                point.Latitude = p.latitude
+                point.Longitude = p.longitude
+                point.Altitude = p.elevation # type: ignore
+                point.Time = p.time # type: ignore
+                pointList.append(point)
+            yield pointList
+
+def CreateGpxTrackFromTrackChunks(chunks : Iterable[list[TrackPoint]]) -> gpxpy.gpx.GPX:
+    """ Converts chunks of track points to a GPX track with one segment per chunk.
+
+    Args:
+        chunks (Iterable[list[TrackPoint]]): The chunks, each a list of track points.
+
+    Returns:
+        gpxpy.gpx.GPX: The GPX track.
+    """
     gpx = gpxpy.gpx.GPX()
 
     # create a track
     gpx_track = gpxpy.gpx.GPXTrack()
     gpx.tracks.append(gpx_track)
 
-    # create a segment
-    gpx_segment = gpxpy.gpx.GPXTrackSegment()
-    gpx_track.segments.append(gpx_segment)
+    for pointList in chunks:
+        # create a segment
+        gpx_segment = gpxpy.gpx.GPXTrackSegment()
+        gpx_track.segments.append(gpx_segment)
 
-    # add points
-    for p in pointList:
-        point = gpxpy.gpx.GPXTrackPoint(p.Latitude, p.Longitude, elevation=p.Altitude, time=p.Time)
-        gpx_segment.points.append(point)
+        # add points
+        for p in pointList:
+            point = gpxpy.gpx.GPXTrackPoint(p.Latitude, p.Longitude, elevation=p.Altitude, time=p.Time)
+            gpx_segment.points.append(point)
 
     return gpx
 
@@ -279,6 +527,11 @@ if __name__ == "__main__":
     argParser.add_argument("filename", help='input filename "abc.FIT"')
     argParser.add_argument("-rb", "--remove_begin", help="remove number of points from the begin of the track", required=False)
     argParser.add_argument("-re", "--remove_end", help="remove number of points from the end of the track", required=False)
+    argParser.add_argument("-s", "--split", help="split the track into segments at sessions and long time gaps", action="store_true")
+    argParser.add_argument("-mg", "--max_gap", help="time gap in seconds starting a new segment (default 3600)", required=False)
+    argParser.add_argument("-sl", "--split_laps", help="also start a new segment at each lap", action="store_true")
+    argParser.add_argument("-r", "--resample", help="resample the track onto a uniform time or distance grid", choices=RESAMPLE_MODES, required=False)
+    argParser.add_argument("-rs", "--resample_step", help="step of the resample grid in seconds or meters (default 5 s or 10 m)", type=float, required=False)
     args = argParser.parse_args()
 
     inputFilename = args.filename
@@ -293,7 +546,10 @@ if __name__ == "__main__":
     if removePointsEnd > 0:
         print(f"removing {removePointsEnd} points from the end of the track")
 
-    ConvertFitFileToGpxFile(inputFilename, outputFilename, removePointsBegin, removePointsEnd)
+    maxGapSeconds = float(args.max_gap) if args.max_gap is not None else DEFAULT_MAX_GAP_SECONDS
+
+    ConvertFitFileToGpxFile(inputFilename, outputFilename, removePointsBegin, removePointsEnd,
+                            args.split or args.split_laps, maxGapSeconds, args.split_laps, args.resample, args.resample_step)
 
     print("done")
 
@@ -24,8 +24,11 @@ IN THE SOFTWARE.
 """
 
 import json
+import threading
+from typing import Any
 from convert_fit_to_gpx import CreateGpxTrackFromFitActivity
 from playwright.sync_api import sync_playwright
+from publish_profiler import Stage
 
 ####################################################################################
 ### This module creates a map image with a track from a garmin activity file
@@ -34,6 +37,32 @@ from playwright.sync_api import sync_playwright
 ### The dynamic API supports all map types.
 ####################################################################################
 
+# the running browser of each thread, playwright objects must only be used by the thread that created them
+__browsers = threading.local()
+
+def __GetBrowser() -> Any:
+    """ Returns the browser of the current thread and starts it if needed.
+    The browser is kept running for the next map images until CloseBrowser() is called.
+
+    Returns:
+        Any: The playwright chromium browser.
+    """
+    if getattr(__browsers, "browser", None) is None:
+        __browsers.playwright = sync_playwright().start()
+        __browsers.browser = __browsers.playwright.chromium.launch()
+
+    return __browsers.browser
+
+def CloseBrowser() -> None:
+    """ Closes the browser of the current thread. """
+    if getattr(__browsers, "browser", None) is None:
+        return
+
+    __browsers.browser.close()
+    __browsers.playwright.stop()
+    __browsers.browser = None
+    __browsers.playwright = None
+
 def __ReadGoogleApiKey() -> str:
     """ Reads the Google API key from file.
     The google API key is stored in the file "google_api_key.json"
@@ -142,16 +171,17 @@ def __CreateAndSaveMapImage(img_filename : str,
 </html>
 """
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
+    with Stage("chromium screenshot"):
+        browser = __GetBrowser()
         page = browser.new_page(viewport={"width": img_width, "height": img_height})
+        try:
+            page.set_content(html_content, wait_until="load")
+            
+            page.wait_for_function("window.mapReady === true", timeout=30000)
         
-        page.set_content(html_content, wait_until="load")
-        
-        page.wait_for_function("window.mapReady === true", timeout=30000)
-    
-        page.screenshot(path=img_filename)
-        browser.close()    
+            page.screenshot(path=img_filename)
+        finally:
+            page.close()
 
 def CreateImageWithTrackOnMap(fit_filename : str, output_filename : str,
                           img_width : int, img_height : int, map_type : str,
@@ -187,5 +217,7 @@ if __name__ == "__main__":
     CreateImageWithTrackOnMap(file_name, "map3.png", 800, 600, "terrain", color, 3)
     CreateImageWithTrackOnMap(file_name, "map4.jpg", 800, 600, "satellite", color, 3)
 
+    CloseBrowser()
+
 
 
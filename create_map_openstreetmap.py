@@ -25,13 +25,15 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 IN THE SOFTWARE.
 """
 
-import random
-from staticmap import StaticMap, Line 
+from staticmap import Line
+from map_tiles import TileMap, TileSource
+from publish_profiler import Stage
 from convert_fit_to_gpx import ReadFitFile, GetTrackPointsFromMessages
 
 def CreateImageWithTrackOnMap(fit_filename : str, output_filename : str,
                               img_width : int, img_height : int,
-                              path_color : str = "red", path_width : int = 3) -> None:
+                              path_color : str = "red", path_width : int = 3,
+                              tile_source : TileSource | None = None) -> None:
     """ Creates an image from a track on a map with Open street map.
 
     Args:
@@ -41,18 +43,16 @@ def CreateImageWithTrackOnMap(fit_filename : str, output_filename : str,
         img_height (int): The image high in pixels.
         path_color (str, optional): The track color (suitable for PIL/Pillow, e.g. red, blue). Defaults to "red".
         path_width (int, optional): The track width. Defaults to 3.
+        tile_source (TileSource | None, optional): Read the map tiles from this source, e.g. a local MBTiles file. Defaults to the tile server.
     """
     fitMessages = ReadFitFile(fit_filename)
     pointList = GetTrackPointsFromMessages(fitMessages)
 
-    server_list = [ "a", "b", "c" ]
-    server = server_list[random.randint(0, len(server_list) - 1)]
+    url_tmp = "https://{s}.tile.openstreetmap.de/{z}/{x}/{y}.png"
+    #url_tmp = "https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
+    #url_tmp = "https://{s}.tile.opentopomap.org/{z}/{x}/{y}.png"
 
-    url_tmp = "https://" + server + ".tile.openstreetmap.de/{z}/{x}/{y}.png"
-    #url_tmp = "https://" + server + ".tile.openstreetmap.org/{z}/{x}/{y}.png"
-    #url_tmp = "https://" + server + ".tile.opentopomap.org/{z}/{x}/{y}.png"
-
-    map = StaticMap(img_width, img_height, url_template=url_tmp)
+    map = TileMap(img_width, img_height, url_template=url_tmp, tile_source=tile_source)
 
     for idx in range(1, len(pointList) - 3):
         p1 = pointList[idx - 1]
@@ -60,7 +60,8 @@ def CreateImageWithTrackOnMap(fit_filename : str, output_filename : str,
         line = Line( ( (p1.Longitude, p1.Latitude), (p2.Longitude, p2.Latitude)), path_color, path_width )
         map.add_line(line)
 
-    image = map.render()
+    with Stage("render map tiles"):
+        image = map.render()
     image.save(output_filename)
 
 # for testing only
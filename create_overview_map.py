@@ -25,15 +25,27 @@ FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
 IN THE SOFTWARE.
 """
 
-import random
-from staticmap import StaticMap, CircleMarker, Line 
+import argparse
+import math
+from typing import Iterable
+import numpy as np
+from matplotlib import colormaps
+from PIL import Image
+from staticmap import CircleMarker, Line
+from map_tiles import TileMap, TileSource, LonLatToTile, GetMBTilesSource
+from publish_profiler import Stage
 from convert_fit_to_gpx import ReadFitFile, GetTrackPointsFromMessages
+from track_index import OpenTrackIndex, IterTrackGeometries, GetTrackExtent, SimplifyTrack, EncodeGeometry, DecodeGeometry
+
+# the tracks of the heatmap are simplified with this tolerance in meters, like the tracks of the archive index
+HEATMAP_TOLERANCE = 10.0
 
 def CreateImageOverviewMap(fit_filename : str,
                            output_filename : str,
                            img_width : int, img_height : int,
                            zoom : int = 8,
-                           path_color : str = "red", path_width : int = 3) -> None:
+                           path_color : str = "red", path_width : int = 3,
+                           tile_source : TileSource | None = None) -> None:
     """ Creates an overview image showing a specific area on the map.
 
     Args:
@@ -42,16 +54,14 @@ def CreateImageOverviewMap(fit_filename : str,
         img_width (int): The image width in pixels.
         img_height (int): The image height in pixels.
         zoom (int): The zoom level of the map.
+        tile_source (TileSource | None, optional): Read the map tiles from this source, e.g. a local MBTiles file. Defaults to the tile server.
     """
     fitMessages = ReadFitFile(fit_filename)
     pointList = GetTrackPointsFromMessages(fitMessages)
 
-    server_list = [ "a", "b", "c" ]
-    server = server_list[random.randint(0, len(server_list) - 1)]
-
-    url_tmp = "https://" + server + ".tile.opentopomap.org/{z}/{x}/{y}.png"
+    url_tmp = "https://{s}.tile.opentopomap.org/{z}/{x}/{y}.png"
 
-    map = StaticMap(img_width, img_height, url_template=url_tmp)
+    map = TileMap(img_width, img_height, url_template=url_tmp, tile_source=tile_source)
 
     centerLongitude = 0.0
     centerLatitude = 0.0
@@ -73,10 +83,217 @@ def CreateImageOverviewMap(fit_filename : str,
 
     map.add_marker(CircleMarker(center, "red", 15))
 
-    image = map.render(zoom=zoom, center=center)
+    with Stage("render map tiles"):
+        image = map.render(zoom=zoom, center=center)
     image.save(output_filename)
 
-# for testing only
+def __CalculateZoom(extent : tuple[float, float, float, float], img_width : int, img_height : int, padding : int = 20) -> int:
+    """ Calculates the largest zoom level showing the whole extent.
+
+    Args:
+        extent (tuple[float, float, float, float]): The extent: min longitude, min latitude, max longitude, max latitude.
+        img_width (int): The image width in pixels.
+        img_height (int): The image height in pixels.
+        padding (int, optional): The minimum distance from the tracks to the image border in pixels. Defaults to 20.
+
+    Returns:
+        int: The zoom level.
+    """
+    for zoom in range(17, -1, -1):
+        x, y = LonLatToTile(np.array(extent[0::2]), np.array(extent[1::2]), zoom)
+        if (x[1] - x[0]) * 256 <= img_width - 2 * padding and (y[0] - y[1]) * 256 <= img_height - 2 * padding:
+            return zoom
+
+    return 0
+
+def __AccumulateTrack(counts : np.ndarray, x : np.ndarray, y : np.ndarray) -> None:
+    """ Rasterizes a track into the accumulation raster, each pixel is counted once per track.
+
+    Args:
+        counts (np.ndarray): The accumulation raster.
+        x (np.ndarray): The x pixel coordinates of the track points.
+        y (np.ndarray): The y pixel coordinates of the track points.
+    """
+    height, width = counts.shape
+
+    # sample the track segments with half a pixel step
+    segmentLength = np.hypot(np.diff(x), np.diff(y))
+    keep = np.concatenate(([ True ], segmentLength > 0))
+    x, y = x[keep], y[keep]
+    cumLength = np.concatenate(([ 0.0 ], np.cumsum(segmentLength[segmentLength > 0])))
+
+    samples = np.append(np.arange(0.0, cumLength[-1], 0.5), cumLength[-1])
+    px = np.floor(np.interp(samples, cumLength, x)).astype(np.int64)
+    py = np.floor(np.interp(samples, cumLength, y)).astype(np.int64)
+
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    pixels = np.unique(py[inside] * width + px[inside])
+
+    counts.reshape(-1)[pixels] += 1
+
+def RenderHeatmapOverviewMap(tracks : Iterable[list[tuple[float, float]]],
+                             extent : tuple[float, float, float, float],
+                             output_filename : str,
+                             img_width : int, img_height : int,
+                             zoom : int | None = None,
+                             colormap : str = "hot", path_width : int = 3,
+                             tile_source : TileSource | None = None) -> None:
+    """ Creates an overview image showing many tracks as density heatmap on the map.
+    The tracks are rasterized one after another into an accumulation raster and are not kept,
+    so memory depends on the image size and the longest track and not on the number of tracks.
+
+    Args:
+        tracks (Iterable[list[tuple[float, float]]]): The tracks, each a list of latitude, longitude in degrees.
+            The tracks are read once, e.g. from a generator.
+        extent (tuple[float, float, float, float]): The bounding box of all tracks: minimum longitude, minimum latitude,
+            maximum longitude and maximum latitude in degrees, e.g. from GetTrackExtent.
+        output_filename (str): The image output filename. (PNG or JPG)
+        img_width (int): The image width in pixels.
+        img_height (int): The image height in pixels.
+        zoom (int | None, optional): The zoom level of the map. Defaults to the largest zoom level showing all tracks.
+        colormap (str, optional): The matplotlib colormap of the heatmap. Defaults to "hot".
+        path_width (int, optional): The track width in pixels. Defaults to 3.
+        tile_source (TileSource | None, optional): Read the map tiles from this source, e.g. a local MBTiles file. Defaults to the tile server.
+    """
+    if zoom is None:
+        zoom = __CalculateZoom(extent, img_width, img_height)
+
+    centerX, centerY = LonLatToTile(np.array([ (extent[0] + extent[2]) / 2 ]), np.array([ (extent[1] + extent[3]) / 2 ]), zoom)
+
+    with Stage("heatmap accumulation"):
+        counts = np.zeros((img_height, img_width), dtype=np.int32)
+
+        for track in tracks:
+            if not track:
+                continue
+
+            points = np.array(track, dtype=np.float64)
+            x, y = LonLatToTile(points[:, 1], points[:, 0], zoom)
+            __AccumulateTrack(counts, (x - centerX[0]) * 256 + img_width / 2, (y - centerY[0]) * 256 + img_height / 2)
+
+        # widen the tracks
+        radius = (path_width - 1) // 2
+        if radius > 0:
+            padded = np.pad(counts, radius)
+            widened = counts.copy()
+            for dy in range(2 * radius + 1):
+                for dx in range(2 * radius + 1):
+                    np.maximum(widened, padded[dy : dy + img_height, dx : dx + img_width], out=widened)
+            counts = widened
+
+    with Stage("heatmap colorize"):
+        intensity = np.log1p(counts) / math.log1p(max(int(counts.max()), 1))
+        rgba = colormaps[colormap](0.3 + 0.6 * intensity, bytes=True)
+        rgba[..., 3] = np.where(counts > 0, 255, 0)
+        heatmap = Image.fromarray(rgba, "RGBA")
+
+    url_tmp = "https://{s}.tile.opentopomap.org/{z}/{x}/{y}.png"
+
+    map = TileMap(img_width, img_height, url_template=url_tmp, tile_source=tile_source)
+
+    center = ((extent[0] + extent[2]) / 2, (extent[1] + extent[3]) / 2)
+    with Stage("render map tiles"):
+        background = map.render(zoom=zoom, center=center)
+
+    image = Image.alpha_composite(background.convert("RGBA"), heatmap)
+    if output_filename.lower().endswith((".jpg", ".jpeg")):
+        image = image.convert("RGB")
+    image.save(output_filename)
+
+def __ReadTrack(fit_filename : str) -> list[tuple[float, float]]:
+    """ Reads the track points of a FIT file.
+
+    Args:
+        fit_filename (str): The FIT file containing the track data.
+
+    Returns:
+        list[tuple[float, float]]: The track points as latitude, longitude in degrees.
+    """
+    return [ (p.Latitude, p.Longitude) for p in GetTrackPointsFromMessages(ReadFitFile(fit_filename)) ]
+
+def CreateImageHeatmapOverviewMap(fit_filenames : list[str],
+                                  output_filename : str,
+                                  img_width : int, img_height : int,
+                                  zoom : int | None = None,
+                                  colormap : str = "hot", path_width : int = 3,
+                                  tile_source : TileSource | None = None) -> None:
+    """ Creates an overview image showing the tracks of many FIT files as density heatmap on the map.
+    Each FIT file is decoded once. Only a packed, simplified copy of each track is kept until the
+    bounding box of all tracks is known, then the tracks are rasterized one after another.
+
+    Args:
+        fit_filenames (list[str]): The FIT files containing the track data.
+        output_filename (str): The image output filename. (PNG or JPG)
+        img_width (int): The image width in pixels.
+        img_height (int): The image height in pixels.
+        zoom (int | None, optional): The zoom level of the map. Defaults to the largest zoom level showing all tracks.
+        colormap (str, optional): The matplotlib colormap of the heatmap. Defaults to "hot".
+        path_width (int, optional): The track width in pixels. Defaults to 3.
+        tile_source (TileSource | None, optional): Read the map tiles from this source, e.g. a local MBTiles file. Defaults to the tile server.
+    """
+    extent : tuple[float, float, float, float] | None = None
+    tracks : list[bytes] = []
+
+    with Stage("read tracks"):
+        for fit_filename in fit_filenames:
+            track = __ReadTrack(fit_filename)
+            if not track:
+                continue
+
+            points = np.array(track, dtype=np.float64)
+            trackExtent = (points[:, 1].min(), points[:, 0].min(), points[:, 1].max(), points[:, 0].max())
+
+            if extent is None:
+                extent = trackExtent
+            else:
+                extent = (min(extent[0], trackExtent[0]), min(extent[1], trackExtent[1]),
+                          max(extent[2], trackExtent[2]), max(extent[3], trackExtent[3]))
+
+            tracks.append(EncodeGeometry(SimplifyTrack(track, HEATMAP_TOLERANCE)))
+
+    if extent is None:
+        raise Exception("no tracks to render")
+
+    RenderHeatmapOverviewMap((DecodeGeometry(blob) for blob in tracks), extent, output_filename, img_width, img_height, zoom, colormap, path_width, tile_source)
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
 if __name__ == "__main__":
-    CreateImageOverviewMap("test.fit", "germany.png", 400, 400, zoom=8)
 
+    argParser = argparse.ArgumentParser("create_overview_map", description="Creates an overview map of one track or a heatmap of many tracks.")
+    argParser.add_argument("filenames", help='input filenames "abc.FIT"', nargs="*")
+    argParser.add_argument("-o", "--output", help="image output filename", required=True)
+    argParser.add_argument("-s", "--size", help="image width and height in pixels", nargs=2, type=int, default=[400, 400])
+    argParser.add_argument("-z", "--zoom", help="zoom level of the map", type=int, required=False)
+    argParser.add_argument("-hm", "--heatmap", help="draw all tracks as density heatmap", action="store_true")
+    argParser.add_argument("-a", "--archive", help='draw the tracks of the archive "abc.sqlite" as heatmap (see track_index)', required=False)
+    argParser.add_argument("-y", "--year", help="only archived activities of this year", required=False)
+    argParser.add_argument("-sp", "--sport", help="only archived activities of this sport, e.g. hiking", required=False)
+    argParser.add_argument("-mbt", "--mbtiles", help='read the map tiles from the local MBTiles file "abc.mbtiles"', required=False)
+    args = argParser.parse_args()
+
+    width, height = args.size
+    tileSource = GetMBTilesSource(args.mbtiles) if args.mbtiles is not None else None
+
+    if args.archive is not None:
+        archive = OpenTrackIndex(args.archive)
+        extent = GetTrackExtent(archive, args.year, args.sport)
+        if extent is None:
+            raise Exception("no archived activities to render")
+
+        print("Create heatmap of the archived activities ...")
+        tracks = ( track for _, track in IterTrackGeometries(archive, args.year, args.sport) )
+        RenderHeatmapOverviewMap(tracks, extent, args.output, width, height, args.zoom, tile_source=tileSource)
+        archive.close()
+    elif args.heatmap:
+        print(f"Create heatmap of {len(args.filenames)} activities ...")
+        CreateImageHeatmapOverviewMap(args.filenames, args.output, width, height, args.zoom, tile_source=tileSource)
+    else:
+        if len(args.filenames) != 1:
+            raise Exception("an overview map shows one track, use --heatmap for several tracks")
+
+        CreateImageOverviewMap(args.filenames[0], args.output, width, height, zoom=args.zoom if args.zoom is not None else 8, tile_source=tileSource)
+
+    print("done")
@@ -0,0 +1,359 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import math
+import sqlite3
+import numpy as np
+from datetime import datetime
+from track_index import OpenTrackIndex, BuildTrackIndex, IterTrackGeometries, GetTrackGeometry, EARTH_RADIUS
+from publish_profiler import Count
+
+####################################################################################
+### This module finds duplicate activities in the archive, e.g. the same hike
+### exported twice or recorded on two devices, without comparing every pair.
+###
+### The simplified track of each activity (see track_index) is snapped to a grid
+### and the set of grid cells is reduced to a MinHash signature. Tracks with
+### similar cell sets get equal signature bands with high probability, so the
+### bands are used as buckets (locality-sensitive hashing). Only activities
+### sharing a bucket and starting at about the same time are candidates, they
+### are confirmed with a bounded Hausdorff distance of the tracks.
+####################################################################################
+
+DEFAULT_GRID_SIZE = 100.0
+DEFAULT_BANDS = 16
+DEFAULT_ROWS = 4
+DEFAULT_MAX_DISTANCE = 50.0
+DEFAULT_MAX_START_DIFFERENCE = 900.0
+
+METERS_PER_DEGREE = math.radians(1.0) * EARTH_RADIUS
+
+# fixed seed, the signatures of different runs must be comparable
+__HASH_SEED = 0x5EED
+
+def __ToMeters(points : list[tuple[float, float]], refLatitude : float, refLongitude : float) -> tuple[np.ndarray, np.ndarray]:
+    """ Projects positions to a local plane around a reference position.
+
+    Args:
+        points (list[tuple[float, float]]): The positions as latitude, longitude in degrees.
+        refLatitude (float): The reference latitude in degrees.
+        refLongitude (float): The reference longitude in degrees.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The x and y coordinates in meters.
+    """
+    coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    x = (coords[:, 1] - refLongitude) * METERS_PER_DEGREE * math.cos(math.radians(refLatitude))
+    y = (coords[:, 0] - refLatitude) * METERS_PER_DEGREE
+    return x, y
+
+def __Densify(x : np.ndarray, y : np.ndarray, spacing : float) -> tuple[np.ndarray, np.ndarray]:
+    """ Adds points along a track, so no two consecutive points are further apart than the spacing.
+
+    Args:
+        x (np.ndarray): The x coordinates in meters.
+        y (np.ndarray): The y coordinates in meters.
+        spacing (float): The maximum distance of the points in meters.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The coordinates of the densified track.
+    """
+    if len(x) < 2:
+        return x, y
+
+    cumLength = np.concatenate(([ 0.0 ], np.cumsum(np.hypot(np.diff(x), np.diff(y)))))
+    samples = np.union1d(np.arange(0.0, cumLength[-1], spacing), cumLength)
+    return np.interp(samples, cumLength, x), np.interp(samples, cumLength, y)
+
+def SnapTrackToGrid(points : list[tuple[float, float]], gridSize : float = DEFAULT_GRID_SIZE) -> np.ndarray:
+    """ Returns the grid cells a track passes through.
+    The grid rows have a fixed height, the cells of each row are about square, so the cells do not depend on the track.
+
+    Args:
+        points (list[tuple[float, float]]): The track points as latitude, longitude in degrees.
+        gridSize (float, optional): The size of the grid cells in meters. Defaults to 100.
+
+    Returns:
+        np.ndarray: The sorted unique cell IDs (uint64).
+    """
+    if not points:
+        return np.empty(0, dtype=np.uint64)
+
+    # densify in a local plane, the simplified track has long straight segments
+    refLatitude, refLongitude = points[0]
+    x, y = __Densify(*__ToMeters(points, refLatitude, refLongitude), gridSize / 2)
+
+    latitude = refLatitude + y / METERS_PER_DEGREE
+    longitude = refLongitude + x / (METERS_PER_DEGREE * math.cos(math.radians(refLatitude)))
+
+    rowHeight = gridSize / METERS_PER_DEGREE
+    row = np.floor(latitude / rowHeight)
+    cellWidth = rowHeight / np.maximum(np.cos(np.radians((row + 0.5) * rowHeight)), 1e-6)
+    column = np.floor(longitude / cellWidth)
+
+    cells = (row.astype(np.int64).astype(np.uint64) << np.uint64(32)) | (column.astype(np.int64).astype(np.uint64) & np.uint64(0xFFFFFFFF))
+    return np.unique(cells)
+
+def __HashParameters(numHashes : int) -> tuple[np.ndarray, np.ndarray]:
+    """ Returns the parameters of the MinHash functions.
+
+    Args:
+        numHashes (int): The number of hash functions.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The odd multipliers and the offsets (uint64).
+    """
+    rng = np.random.default_rng(__HASH_SEED)
+    multipliers = rng.integers(0, 2**63, numHashes, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    offsets = rng.integers(0, 2**63, numHashes, dtype=np.uint64)
+    return multipliers, offsets
+
+def CalculateMinHash(cells : np.ndarray, numHashes : int = DEFAULT_BANDS * DEFAULT_ROWS) -> np.ndarray:
+    """ Calculates the MinHash signature of a set of grid cells.
+    The probability of two equal signature values is the Jaccard similarity of the sets.
+
+    Args:
+        cells (np.ndarray): The cell IDs, see SnapTrackToGrid().
+        numHashes (int, optional): The number of hash functions (signature length). Defaults to 64.
+
+    Returns:
+        np.ndarray: The signature (uint32).
+    """
+    multipliers, offsets = __HashParameters(numHashes)
+
+    # multiply-shift hashing, the uint64 arithmetic wraps around
+    hashes = (cells[None, :] * multipliers[:, None] + offsets[:, None]) >> np.uint64(32)
+    return hashes.min(axis=1).astype(np.uint32)
+
+def FindCandidatePairs(signatures : dict[int, np.ndarray], startTimes : dict[int, datetime | None],
+                       bands : int = DEFAULT_BANDS, rows : int = DEFAULT_ROWS,
+                       maxStartDifference : float | None = DEFAULT_MAX_START_DIFFERENCE) -> set[tuple[int, int]]:
+    """ Finds the activities sharing a bucket of a signature band and starting at about the same time.
+
+    Args:
+        signatures (dict[int, np.ndarray]): The MinHash signature per activity ID, bands * rows values.
+        startTimes (dict[int, datetime | None]): The start time per activity ID.
+        bands (int, optional): The number of signature bands. Defaults to 16.
+        rows (int, optional): The number of signature values per band. Defaults to 4.
+        maxStartDifference (float | None, optional): The maximum difference of the start times in seconds,
+            None to ignore the start times. Defaults to 900.
+
+    Returns:
+        set[tuple[int, int]]: The candidate pairs of activity IDs, the smaller ID first.
+    """
+    buckets : dict[tuple[int, bytes], list[int]] = {}
+    for activityId, signature in signatures.items():
+        for band in range(bands):
+            key = (band, signature[band * rows : (band + 1) * rows].tobytes())
+            buckets.setdefault(key, []).append(activityId)
+
+    pairs : set[tuple[int, int]] = set()
+    for activityIds in buckets.values():
+        if len(activityIds) < 2:
+            continue
+
+        # sorted by start time, so only the neighbours within the time window are compared
+        if maxStartDifference is not None:
+            timed = sorted((startTimes[a].timestamp(), a) for a in activityIds if startTimes.get(a) is not None) # type: ignore
+            for idx, (startA, a) in enumerate(timed):
+                for startB, b in timed[idx + 1:]:
+                    if startB - startA > maxStartDifference:
+                        break
+                    pairs.add((min(a, b), max(a, b)))
+        else:
+            for idx, a in enumerate(activityIds):
+                for b in activityIds[idx + 1:]:
+                    pairs.add((min(a, b), max(a, b)))
+
+    return pairs
+
+def __DirectedDistanceWithin(ax : np.ndarray, ay : np.ndarray, bx : np.ndarray, by : np.ndarray, maxDistance : float) -> bool:
+    """ Checks if every point of track A is within a distance of the line segments of track B.
+    Stops at the first point too far away.
+
+    Returns:
+        bool: True if all points are within the distance.
+    """
+    if len(bx) == 1:
+        bx = np.append(bx, bx)
+        by = np.append(by, by)
+
+    sx, sy = bx[:-1], by[:-1]
+    dx, dy = np.diff(bx), np.diff(by)
+    length2 = dx * dx + dy * dy
+    length2[length2 == 0] = 1.0
+
+    for first in range(0, len(ax), 256):
+        px = ax[first : first + 256, None]
+        py = ay[first : first + 256, None]
+
+        t = np.clip(((px - sx) * dx + (py - sy) * dy) / length2, 0.0, 1.0)
+        distance2 = (px - (sx + t * dx)) ** 2 + (py - (sy + t * dy)) ** 2
+
+        if distance2.min(axis=1).max() > maxDistance * maxDistance:
+            return False
+
+    return True
+
+def HausdorffDistanceWithin(pointsA : list[tuple[float, float]], pointsB : list[tuple[float, float]],
+                            maxDistance : float = DEFAULT_MAX_DISTANCE) -> bool:
+    """ Checks if the Hausdorff distance of two tracks is at most a distance.
+    The tracks are densified to a quarter of the distance, so the check is exact to about this length.
+
+    Args:
+        pointsA (list[tuple[float, float]]): The first track as latitude, longitude in degrees.
+        pointsB (list[tuple[float, float]]): The second track as latitude, longitude in degrees.
+        maxDistance (float, optional): The distance in meters. Defaults to 50.
+
+    Returns:
+        bool: True if every point of each track is within the distance of the other track.
+    """
+    if not pointsA or not pointsB:
+        return False
+
+    refLatitude, refLongitude = pointsA[0]
+    ax, ay = __ToMeters(pointsA, refLatitude, refLongitude)
+    bx, by = __ToMeters(pointsB, refLatitude, refLongitude)
+
+    # the bounding boxes must match, this rejects most pairs cheaply
+    if (abs(ax.min() - bx.min()) > maxDistance or abs(ax.max() - bx.max()) > maxDistance or
+        abs(ay.min() - by.min()) > maxDistance or abs(ay.max() - by.max()) > maxDistance):
+        return False
+
+    spacing = maxDistance / 4
+    return (__DirectedDistanceWithin(*__Densify(ax, ay, spacing), bx, by, maxDistance) and
+            __DirectedDistanceWithin(*__Densify(bx, by, spacing), ax, ay, maxDistance))
+
+def __GroupPairs(pairs : list[tuple[int, int]]) -> list[list[int]]:
+    """ Groups pairs of duplicates transitively (union-find).
+
+    Args:
+        pairs (list[tuple[int, int]]): The pairs of activity IDs.
+
+    Returns:
+        list[list[int]]: The groups of activity IDs, sorted.
+    """
+    parent : dict[int, int] = {}
+
+    def Find(a : int) -> int:
+        while parent.setdefault(a, a) != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    for a, b in pairs:
+        parent[Find(a)] = Find(b)
+
+    groups : dict[int, list[int]] = {}
+    for a in parent:
+        groups.setdefault(Find(a), []).append(a)
+
+    return sorted(sorted(group) for group in groups.values())
+
+def FindDuplicateActivities(db : sqlite3.Connection, gridSize : float = DEFAULT_GRID_SIZE,
+                            bands : int = DEFAULT_BANDS, rows : int = DEFAULT_ROWS,
+                            maxDistance : float = DEFAULT_MAX_DISTANCE,
+                            maxStartDifference : float | None = DEFAULT_MAX_START_DIFFERENCE,
+                            sport : str | None = None) -> list[list[int]]:
+    """ Finds groups of duplicate activities in the spatial index of the archive.
+
+    Args:
+        db (sqlite3.Connection): The archive database with the spatial index (see track_index).
+        gridSize (float, optional): The size of the grid cells in meters. Defaults to 100.
+        bands (int, optional): The number of signature bands, more bands find more candidates. Defaults to 16.
+        rows (int, optional): The number of signature values per band, more rows find fewer candidates. Defaults to 4.
+        maxDistance (float, optional): The maximum Hausdorff distance of duplicate tracks in meters. Defaults to 50.
+        maxStartDifference (float | None, optional): The maximum difference of the start times in seconds,
+            None to ignore the start times. Defaults to 900.
+        sport (str | None, optional): Only activities of this sport, e.g. hiking. Defaults to all activities.
+
+    Returns:
+        list[list[int]]: The groups of duplicate activity IDs.
+    """
+    startTimes : dict[int, datetime | None] = {}
+    for activityId, startTime in db.execute("SELECT id, start_time FROM activities"):
+        startTimes[activityId] = datetime.strptime(startTime, "%Y-%m-%d %H:%M:%S") if startTime else None
+
+    signatures : dict[int, np.ndarray] = {}
+    for activityId, points in IterTrackGeometries(db, sport=sport):
+        cells = SnapTrackToGrid(points, gridSize)
+        if len(cells) > 0:
+            signatures[activityId] = CalculateMinHash(cells, bands * rows)
+
+    pairs = FindCandidatePairs(signatures, startTimes, bands, rows, maxStartDifference)
+    Count("duplicate candidates", len(pairs))
+
+    duplicates = [ (a, b) for a, b in sorted(pairs) if HausdorffDistanceWithin(GetTrackGeometry(db, a), GetTrackGeometry(db, b), maxDistance) ]
+
+    print(f"{len(signatures)} activities, {len(pairs)} candidate pairs, {len(duplicates)} duplicate pairs")
+
+    return __GroupPairs(duplicates)
+
+def __PrintGroups(db : sqlite3.Connection, groups : list[list[int]]) -> None:
+    """ Prints the groups of duplicate activities.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        groups (list[list[int]]): The groups of activity IDs.
+    """
+    for group in groups:
+        for activityId in group:
+            startTime, name, filename = db.execute("SELECT start_time, name, filename FROM activities WHERE id = ?", (activityId,)).fetchone()
+            print(f"{startTime}  {name}  ({filename})")
+        print()
+
+    print(f"{len(groups)} groups of duplicates")
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("duplicate_detection", description="Finds duplicate activities in the archive.")
+    argParser.add_argument("archive", help='archive filename "abc.sqlite" (see activity_archive)')
+    argParser.add_argument("-b", "--build", help="add the archived activities to the spatial index first", action="store_true")
+    argParser.add_argument("-g", "--grid", help="size of the grid cells in meters", type=float, default=DEFAULT_GRID_SIZE)
+    argParser.add_argument("-d", "--max_distance", help="maximum distance of duplicate tracks in meters", type=float, default=DEFAULT_MAX_DISTANCE)
+    argParser.add_argument("-t", "--max_start_difference", help="maximum difference of the start times in seconds, negative to ignore the start times",
+                           type=float, default=DEFAULT_MAX_START_DIFFERENCE)
+    argParser.add_argument("-sp", "--sport", help="only activities of this sport, e.g. hiking", required=False)
+    argParser.add_argument("-w", "--workers", help="number of worker processes", required=False)
+    args = argParser.parse_args()
+
+    archive = OpenTrackIndex(args.archive)
+
+    if args.build:
+        added = BuildTrackIndex(archive, int(args.workers) if args.workers is not None else None)
+        print(f"{added} activities added to the spatial index")
+
+    maxStartDifference = args.max_start_difference if args.max_start_difference >= 0 else None
+    __PrintGroups(archive, FindDuplicateActivities(archive, args.grid, maxDistance=args.max_distance,
+                                                   maxStartDifference=maxStartDifference, sport=args.sport))
+
+    archive.close()
@@ -0,0 +1,307 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import math
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import gpxpy
+import gpxpy.gpx
+import numpy as np
+from convert_fit_to_gpx import TrackPoint, CreateGpxTrackFromFitActivity
+
+####################################################################################
+### This module corrects the altitude of tracks with a digital elevation model
+### (DEM) from local SRTM tiles, so it works offline.
+###
+### The tiles are the ".hgt" files of SRTM1 (3601 x 3601 points) or SRTM3
+### (1201 x 1201 points) covering one degree of latitude and longitude each,
+### e.g. "N47E011.hgt". The files are memory mapped, only the pages of the looked
+### up points are read, and a few recently used tiles are kept open. The
+### elevation of all points of a track is interpolated bilinear at once with
+### numpy. Points outside the tiles or in voids keep their measured altitude.
+####################################################################################
+
+DEFAULT_MAX_OPEN_TILES = 16
+
+HGT_VOID = -32768
+
+class ElevationModel:
+    """ Looks up elevations in a directory of SRTM ".hgt" tiles. """
+
+    def __init__(self, demDir : str, maxOpenTiles : int = DEFAULT_MAX_OPEN_TILES) -> None:
+        """ Creates the elevation model.
+
+        Args:
+            demDir (str): The directory with the ".hgt" tiles.
+            maxOpenTiles (int, optional): The number of memory mapped tiles kept open. Defaults to 16.
+        """
+        if not Path(demDir).is_dir():
+            raise Exception(f"DEM directory {demDir} not found")
+
+        self.DemDir = demDir
+        self.MaxOpenTiles = maxOpenTiles
+
+        # open tiles: (latitude, longitude) of the south west corner -> memory mapped tile, None if there is no tile
+        self.__tiles : OrderedDict[tuple[int, int], np.ndarray | None] = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __TileFilename(self, latitude : int, longitude : int) -> str:
+        """ Returns the filename of a tile.
+
+        Args:
+            latitude (int): The latitude of the south west corner.
+            longitude (int): The longitude of the south west corner.
+
+        Returns:
+            str: The tile filename.
+        """
+        name = f"{'N' if latitude >= 0 else 'S'}{abs(latitude):02d}{'E' if longitude >= 0 else 'W'}{abs(longitude):03d}.hgt"
+
+        path = os.path.join(self.DemDir, name)
+        if not os.path.exists(path):
+            # some downloads use lower case names
+            lowerPath = os.path.join(self.DemDir, name.lower())
+            if os.path.exists(lowerPath):
+                return lowerPath
+
+        return path
+
+    def __GetTile(self, latitude : int, longitude : int) -> np.ndarray | None:
+        """ Returns a memory mapped tile.
+
+        Args:
+            latitude (int): The latitude of the south west corner.
+            longitude (int): The longitude of the south west corner.
+
+        Returns:
+            np.ndarray | None: The elevations (north row first), None if there is no tile.
+        """
+        key = (latitude, longitude)
+
+        with self.__lock:
+            if key in self.__tiles:
+                self.__tiles.move_to_end(key)
+                return self.__tiles[key]
+
+        filename = self.__TileFilename(latitude, longitude)
+
+        tile = None
+        if os.path.exists(filename):
+            size = int(math.isqrt(os.path.getsize(filename) // 2))
+            if size * size * 2 != os.path.getsize(filename):
+                raise Exception(f"{filename} is not a SRTM tile")
+            tile = np.memmap(filename, dtype=">i2", mode="r", shape=(size, size))
+
+        with self.__lock:
+            self.__tiles[key] = tile
+            while len(self.__tiles) > self.MaxOpenTiles:
+                self.__tiles.popitem(last=False)
+
+        return tile
+
+    def LookupElevations(self, latitude : np.ndarray, longitude : np.ndarray) -> np.ndarray:
+        """ Interpolates the elevation of many points.
+
+        Args:
+            latitude (np.ndarray): The latitudes in degrees.
+            longitude (np.ndarray): The longitudes in degrees.
+
+        Returns:
+            np.ndarray: The elevations in meters, NaN for points without DEM data.
+        """
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        elevation = np.full(len(latitude), np.nan)
+
+        if len(latitude) == 0:
+            return elevation
+
+        # one key per tile, most tracks lie on a single tile
+        tileKey = (np.floor(latitude).astype(np.int64) + 90) * 360 + (np.floor(longitude).astype(np.int64) + 180)
+        if np.all(tileKey == tileKey[0]):
+            groups = [ (int(tileKey[0]), np.arange(len(tileKey))) ]
+        else:
+            order = np.argsort(tileKey, kind="stable")
+            keys, starts = np.unique(tileKey[order], return_index=True)
+            groups = list(zip(keys.tolist(), np.split(order, starts[1:])))
+
+        for key, idx in groups:
+            tileLat = key // 360 - 90
+            tileLon = key % 360 - 180
+
+            tile = self.__GetTile(tileLat, tileLon)
+            if tile is None:
+                continue
+
+            size = tile.shape[0]
+
+            # fractional row (from north) and column of the points
+            row = (tileLat + 1 - latitude[idx]) * (size - 1)
+            col = (longitude[idx] - tileLon) * (size - 1)
+
+            row0 = np.clip(np.floor(row).astype(np.int64), 0, size - 2)
+            col0 = np.clip(np.floor(col).astype(np.int64), 0, size - 2)
+            rowFraction = row - row0
+            colFraction = col - col0
+
+            z00 = tile[row0, col0].astype(np.float64)
+            z01 = tile[row0, col0 + 1].astype(np.float64)
+            z10 = tile[row0 + 1, col0].astype(np.float64)
+            z11 = tile[row0 + 1, col0 + 1].astype(np.float64)
+
+            values = (z00 * (1 - rowFraction) * (1 - colFraction) + z01 * (1 - rowFraction) * colFraction
+                      + z10 * rowFraction * (1 - colFraction) + z11 * rowFraction * colFraction)
+
+            void = (z00 == HGT_VOID) | (z01 == HGT_VOID) | (z10 == HGT_VOID) | (z11 == HGT_VOID)
+            values[void] = np.nan
+
+            elevation[idx] = values
+
+        return elevation
+
+    def CorrectElevations(self, latitude : np.ndarray, longitude : np.ndarray, altitude : np.ndarray) -> np.ndarray:
+        """ Replaces measured altitudes with the DEM elevation. Points without DEM data keep their altitude.
+
+        Args:
+            latitude (np.ndarray): The latitudes in degrees.
+            longitude (np.ndarray): The longitudes in degrees.
+            altitude (np.ndarray): The measured altitudes in meters.
+
+        Returns:
+            np.ndarray: The corrected altitudes in meters.
+        """
+        elevation = self.LookupElevations(latitude, longitude)
+        return np.where(np.isnan(elevation), altitude, elevation)
+
+# elevation models shared by all callers: DEM directory -> model
+__elevationModels : dict[str, ElevationModel] = {}
+__elevationModelsLock = threading.Lock()
+
+def GetElevationModel(demDir : str) -> ElevationModel:
+    """ Returns the elevation model of a DEM directory. The model and its open tiles are shared by all callers.
+
+    Args:
+        demDir (str): The directory with the ".hgt" tiles.
+
+    Returns:
+        ElevationModel: The elevation model.
+    """
+    key = str(Path(demDir).resolve())
+
+    with __elevationModelsLock:
+        model = __elevationModels.get(key)
+        if model is None:
+            model = ElevationModel(demDir)
+            __elevationModels[key] = model
+
+    return model
+
+def CorrectTrackPointElevations(pointList : list[TrackPoint], model : ElevationModel) -> int:
+    """ Replaces the altitude of track points with the DEM elevation.
+
+    Args:
+        pointList (list[TrackPoint]): The track points, changed in place.
+        model (ElevationModel): The elevation model.
+
+    Returns:
+        int: The number of corrected points.
+    """
+    latitude = np.fromiter((p.Latitude for p in pointList), np.float64, len(pointList))
+    longitude = np.fromiter((p.Longitude for p in pointList), np.float64, len(pointList))
+
+    elevation = model.LookupElevations(latitude, longitude)
+
+    corrected = 0
+    for point, value in zip(pointList, elevation.tolist()):
+        if not math.isnan(value):
+            point.Altitude = value
+            corrected += 1
+
+    return corrected
+
+def CorrectGpxElevations(gpx : gpxpy.gpx.GPX, model : ElevationModel) -> int:
+    """ Replaces the elevation of all points of a GPX track with the DEM elevation.
+
+    Args:
+        gpx (gpxpy.gpx.GPX): The track, changed in place.
+        model (ElevationModel): The elevation model.
+
+    Returns:
+        int: The number of corrected points.
+    """
+    points = [ p for track in gpx.tracks for segment in track.segments for p in segment.points ]
+
+    latitude = np.fromiter((p.latitude for p in points), np.float64, len(points))
+    longitude = np.fromiter((p.longitude for p in points), np.float64, len(points))
+
+    elevation = model.LookupElevations(latitude, longitude)
+
+    corrected = 0
+    for point, value in zip(points, elevation.tolist()):
+        if not math.isnan(value):
+            point.elevation = value
+            corrected += 1
+
+    return corrected
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("elevation_correction", description="Corrects the altitude of a track with local SRTM elevation tiles.")
+    argParser.add_argument("filename", help='input filename "abc.FIT" or "abc.GPX"')
+    argParser.add_argument("-d", "--dem_dir", help="directory with the SRTM .hgt tiles", required=True)
+    argParser.add_argument("-o", "--output", help="output GPX filename (default: abc_dem.gpx)", required=False)
+    args = argParser.parse_args()
+
+    inputFilename : str = args.filename
+
+    if Path(inputFilename).suffix.lower() == ".gpx":
+        with open(inputFilename, "r") as file:
+            gpx = gpxpy.parse(file)
+    else:
+        gpx = CreateGpxTrackFromFitActivity(inputFilename, splitSegments=True)
+
+    uphill, downhill = gpx.get_uphill_downhill()
+    print(f"Measured: uphill {uphill:.1f} m downhill {downhill:.1f} m")
+
+    corrected = CorrectGpxElevations(gpx, GetElevationModel(args.dem_dir))
+    print(f"Corrected {corrected} of {gpx.get_points_no()} points")
+
+    uphill, downhill = gpx.get_uphill_downhill()
+    print(f"Corrected: uphill {uphill:.1f} m downhill {downhill:.1f} m")
+
+    outputFilename = args.output if args.output is not None else str(Path(inputFilename).with_suffix("")) + "_dem.gpx"
+    with open(outputFilename, "w") as file:
+        file.write(gpx.to_xml())
+
+    print("done")
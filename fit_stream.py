@@ -0,0 +1,338 @@
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Iterator
+from garmin_fit_sdk import Profile # type: ignore
+from convert_fit_to_gpx import TrackPoint, SemicircleToDegress
+
+####################################################################################
+### This module reads the record messages of a FIT file incrementally, without
+### decoding the whole file first like the Garmin SDK decoder. Only the data
+### needed for a track is decoded: time, position, altitude, distance and speed.
+###
+### The reader keeps incomplete messages at the end of the file, so a file still
+### being written, e.g. by a live tracking device, can be read again and again.
+####################################################################################
+
+FIT_EPOCH = datetime(1989, 12, 31, tzinfo=timezone.utc)
+
+MESG_NUM_RECORD = 20
+MESG_NUM_SPORT = 12
+FIELD_TIMESTAMP = 253
+
+# record fields: field number -> name, struct format, invalid value, scale, offset
+RECORD_FIELDS : dict[int, tuple[str, str, int, float, float]] = {
+    0 : ("position_lat", "i", 0x7FFFFFFF, 1, 0),
+    1 : ("position_long", "i", 0x7FFFFFFF, 1, 0),
+    2 : ("altitude", "H", 0xFFFF, 5, 500),
+    5 : ("distance", "I", 0xFFFFFFFF, 100, 0),
+    6 : ("speed", "H", 0xFFFF, 1000, 0),
+    73 : ("enhanced_speed", "I", 0xFFFFFFFF, 1000, 0),
+    78 : ("enhanced_altitude", "I", 0xFFFFFFFF, 5, 500)
+}
+
+READ_SIZE = 1 << 16
+
+class FitMessageDefinition:
+    """ A message definition: the layout of the data messages of a local message type. """
+
+    def __init__(self, globalMesgNum : int, byteOrder : str, fields : list[tuple[int, int, int]], size : int) -> None:
+        """ Creates the definition.
+
+        Args:
+            globalMesgNum (int): The global message number, e.g. 20 for record messages.
+            byteOrder (str): The byte order of the fields for struct: < or >.
+            fields (list[tuple[int, int, int]]): The fields as field number, offset, size.
+            size (int): The size of the data messages without header, including the developer fields.
+        """
+        self.GlobalMesgNum = globalMesgNum
+        self.ByteOrder = byteOrder
+
+        # field number, offset, size
+        self.Fields = fields
+
+        # the size of the data message without its header
+        self.Size = size
+
+class FitRecordReader:
+    """ Reads the record messages of a FIT file incrementally. """
+
+    def __init__(self, file : BinaryIO) -> None:
+        """ Creates the reader.
+
+        Args:
+            file (BinaryIO): The FIT file opened for binary reading, positioned at the start of the file.
+        """
+        self.__file = file
+        self.__buffer = bytearray()
+        self.__offset = 0
+
+        # the data bytes left in the current FIT file, None before the file header,
+        # -1 if the header does not know the size (file still being written)
+        self.__remaining : int | None = None
+
+        self.__definitions : dict[int, FitMessageDefinition] = {}
+        self.__lastTimestamp = 0
+
+        self.Sport : str | None = None
+        """ The sport of the activity, e.g. hiking, None if not read yet. """
+
+    def __Available(self) -> int:
+        """ Returns the number of bytes in the buffer not read yet. """
+        return len(self.__buffer) - self.__offset
+
+    def __Fill(self, size : int) -> bool:
+        """ Reads from the file until the buffer contains the number of bytes.
+
+        Returns:
+            bool: True if enough bytes are available, False at the current end of the file.
+        """
+        while self.__Available() < size:
+            data = self.__file.read(max(READ_SIZE, size))
+            if not data:
+                return False
+
+            if self.__offset > 0:
+                del self.__buffer[:self.__offset]
+                self.__offset = 0
+            self.__buffer += data
+
+        return True
+
+    def __Consume(self, size : int) -> bytes:
+        """ Takes bytes from the buffer, they must be available.
+
+        Returns:
+            bytes: The bytes.
+        """
+        data = bytes(self.__buffer[self.__offset : self.__offset + size])
+        self.__offset += size
+        if self.__remaining is not None and self.__remaining >= 0:
+            self.__remaining -= size
+        return data
+
+    def __ReadFileHeader(self) -> bool:
+        """ Reads the FIT file header.
+
+        Returns:
+            bool: False if the header is not complete yet.
+        """
+        if not self.__Fill(12):
+            return False
+
+        headerSize = self.__buffer[self.__offset]
+        if not self.__Fill(headerSize):
+            return False
+
+        header = bytes(self.__buffer[self.__offset : self.__offset + headerSize])
+        if headerSize < 12 or header[8:12] != b".FIT":
+            raise Exception("not a FIT file")
+
+        self.__offset += headerSize
+        dataSize = struct.unpack_from("<I", header, 4)[0]
+        self.__remaining = dataSize if dataSize > 0 else -1
+        self.__definitions = {}
+        return True
+
+    def __ReadDefinition(self, recordHeader : int) -> bool:
+        """ Reads a definition message including its record header.
+
+        Returns:
+            bool: False if the message is not complete yet.
+        """
+        # the buffer may be moved while filling, so the message is only consumed when complete
+        if not self.__Fill(6):
+            return False
+
+        numFields = self.__buffer[self.__offset + 5]
+        size = 6 + 3 * numFields
+
+        hasDeveloperFields = recordHeader & 0x20
+        if hasDeveloperFields:
+            if not self.__Fill(size + 1):
+                return False
+            size += 1 + 3 * self.__buffer[self.__offset + size]
+
+        if not self.__Fill(size):
+            return False
+
+        data = self.__Consume(size)[1:]
+        byteOrder = ">" if data[1] == 1 else "<"
+        globalMesgNum = struct.unpack_from(byteOrder + "H", data, 2)[0]
+
+        fields : list[tuple[int, int, int]] = []
+        offset = 0
+        for idx in range(numFields):
+            fieldNum, fieldSize = data[5 + 3 * idx], data[6 + 3 * idx]
+            fields.append((fieldNum, offset, fieldSize))
+            offset += fieldSize
+
+        # the developer fields are skipped
+        if hasDeveloperFields:
+            numDeveloperFields = data[5 + 3 * numFields]
+            offset += sum(data[7 + 3 * numFields + 3 * idx] for idx in range(numDeveloperFields))
+
+        self.__definitions[recordHeader & 0x0F] = FitMessageDefinition(globalMesgNum, byteOrder, fields, offset)
+        return True
+
+    def __DecodeRecord(self, definition : FitMessageDefinition, data : bytes, timestamp : int | None) -> dict[str, Any]:
+        """ Decodes the fields of a record message.
+
+        Returns:
+            dict[str, Any]: The record with the field names of the Garmin SDK.
+        """
+        record : dict[str, Any] = {}
+
+        for fieldNum, offset, size in definition.Fields:
+            field = RECORD_FIELDS.get(fieldNum)
+            if field is None or struct.calcsize(field[1]) != size:
+                continue
+
+            name, fmt, invalid, scale, valueOffset = field
+            value = struct.unpack_from(definition.ByteOrder + fmt, data, offset)[0]
+            if value == invalid:
+                continue
+
+            record[name] = value if scale == 1 and valueOffset == 0 else value / scale - valueOffset
+
+        # the enhanced fields contain the same values with a larger range, like the Garmin SDK
+        if "enhanced_altitude" not in record and "altitude" in record:
+            record["enhanced_altitude"] = record["altitude"]
+        if "enhanced_speed" not in record and "speed" in record:
+            record["enhanced_speed"] = record["speed"]
+
+        if timestamp is not None:
+            record["timestamp"] = FIT_EPOCH + timedelta(seconds=timestamp)
+
+        return record
+
+    def ReadRecords(self) -> Iterator[dict[str, Any]]:
+        """ Reads the record messages up to the current end of the file.
+        Call again to read the records appended to the file since the last call.
+
+        Yields:
+            dict[str, Any]: The record messages with the field names of the Garmin SDK, e.g. timestamp, position_lat.
+        """
+        while True:
+            if self.__remaining is None:
+                if not self.__ReadFileHeader():
+                    return
+                continue
+
+            # the CRC at the end of the file, a chained FIT file may follow
+            if self.__remaining == 0:
+                if not self.__Fill(2):
+                    return
+                self.__offset += 2
+                self.__remaining = None
+                continue
+
+            if not self.__Fill(1):
+                return
+
+            recordHeader = self.__buffer[self.__offset]
+
+            if recordHeader & 0x80:
+                # compressed timestamp header
+                localType = (recordHeader >> 5) & 0x03
+                timeOffset = recordHeader & 0x1F
+                timestamp : int | None = (self.__lastTimestamp & ~0x1F) + timeOffset
+                if timeOffset < (self.__lastTimestamp & 0x1F):
+                    timestamp += 0x20 # type: ignore
+            elif recordHeader & 0x40:
+                if not self.__ReadDefinition(recordHeader):
+                    return
+                continue
+            else:
+                localType = recordHeader & 0x0F
+                timestamp = None
+
+            definition = self.__definitions.get(localType)
+            if definition is None:
+                raise Exception(f"FIT data message without definition (local type {localType})")
+
+            if not self.__Fill(1 + definition.Size):
+                return
+
+            self.__Consume(1)
+            data = self.__Consume(definition.Size)
+
+            for fieldNum, offset, size in definition.Fields:
+                if fieldNum == FIELD_TIMESTAMP and size == 4:
+                    timestamp = struct.unpack_from(definition.ByteOrder + "I", data, offset)[0]
+
+            if timestamp is not None:
+                self.__lastTimestamp = timestamp # type: ignore
+
+            if definition.GlobalMesgNum == MESG_NUM_RECORD:
+                yield self.__DecodeRecord(definition, data, timestamp)
+            elif definition.GlobalMesgNum == MESG_NUM_SPORT:
+                for fieldNum, offset, size in definition.Fields:
+                    if fieldNum == 0 and size == 1 and data[offset] != 0xFF:
+                        self.Sport = Profile["types"]["sport"].get(data[offset], str(data[offset]))
+
+def CreateTrackPointFromRecord(record : dict[str, Any], previousAltitude : float = 0.0) -> TrackPoint | None:
+    """ Creates a track point from a record message.
+
+    Args:
+        record (dict[str, Any]): The record message.
+        previousAltitude (float, optional): The altitude used if the record has none. Defaults to 0.
+
+    Returns:
+        TrackPoint | None: The track point, None if the record has no position or no time.
+    """
+    if "position_lat" not in record or "position_long" not in record or "timestamp" not in record:
+        return None
+
+    point = TrackPoint()
+
+    point.Latitude = SemicircleToDegress(record["position_lat"])
+    point.Longitude = SemicircleToDegress(record["position_long"])
+    point.Altitude = record.get("enhanced_altitude", previousAltitude)
+    point.Time = record["timestamp"]
+
+    return point
+
+def IterFitTrackPoints(fitFilename : str) -> Iterator[TrackPoint]:
+    """ Reads the track points of a FIT file incrementally.
+    A missing altitude is taken from the previous point.
+
+    Args:
+        fitFilename (str): The name of the FIT file.
+
+    Yields:
+        TrackPoint: The track points.
+    """
+    with open(fitFilename, "rb") as file:
+        recordReader = FitRecordReader(file)
+        altitude = 0.0
+
+        for record in recordReader.ReadRecords():
+            point = CreateTrackPointFromRecord(record, altitude)
+            if point is not None:
+                altitude = point.Altitude
+                yield point
@@ -26,6 +26,7 @@ IN THE SOFTWARE.
 """
 
 import gpxpy
+import gpxpy.gpx
 import argparse
 
 def TimespanToHoursMinutesSeconds(timeSpan : float) -> tuple[int, int, int]:
@@ -43,6 +44,99 @@ def TimespanToHoursMinutesSeconds(timeSpan : float) -> tuple[int, int, int]:
 
     return hours, minutes, seconds
 
+class TrackStatistic:
+    """ The statistic summary of a track. """
+
+    MovingDistance : float
+    """ The distance while moving in meters. """
+
+    MovingTime : float
+    """ The time while moving in seconds. """
+
+    StoppedTime : float
+    """ The pause time in seconds. """
+
+    MaxSpeed : float
+    """ The maximum speed in meters per second. """
+
+    MinElevation : float
+    """ The minimum altitude in meters. """
+
+    MaxElevation : float
+    """ The maximum altitude in meters. """
+
+    Uphill : float
+    """ The total ascent in meters. """
+
+    Downhill : float
+    """ The total descent in meters. """
+
+    PointCount : int
+    """ The number of GPS points. """
+
+    def AverageSpeed(self) -> float:
+        """ Returns the average speed while moving.
+
+        Returns:
+            float: The average speed in meters per second.
+        """
+        return self.MovingDistance / self.MovingTime if self.MovingTime > 0 else 0.0
+
+def CalculateTrackStatistic(gpx : gpxpy.gpx.GPX, stoppedSpeedThreshold : float) -> TrackStatistic:
+    """ Calculates the statistic summary of a track.
+
+    Args:
+        gpx (gpxpy.gpx.GPX): The track.
+        stoppedSpeedThreshold (float): Threshold speed in meters per second to differ between move and pause.
+
+    Returns:
+        TrackStatistic: The statistic summary.
+    """
+    statistic = TrackStatistic()
+
+    moving_time, stopped_time, moving_distance, _, max_speed = gpx.get_moving_data(stopped_speed_threshold=stoppedSpeedThreshold)
+    statistic.MovingDistance = moving_distance
+    statistic.MovingTime = moving_time
+    statistic.StoppedTime = stopped_time
+    statistic.MaxSpeed = max_speed
+
+    minElevation, maxElevation = gpx.get_elevation_extremes()
+    if maxElevation is None or minElevation is None:
+        raise Exception("missing GPS elevation data")
+    statistic.MinElevation = minElevation
+    statistic.MaxElevation = maxElevation
+
+    statistic.Uphill, statistic.Downhill = gpx.get_uphill_downhill()
+    statistic.PointCount = gpx.get_points_no()
+
+    return statistic
+
+def MergeTrackStatistics(statistics : list[TrackStatistic]) -> TrackStatistic:
+    """ Merges the statistic summaries of the chunks of a track, e.g. of its sessions, to the track totals.
+
+    Args:
+        statistics (list[TrackStatistic]): The statistic summaries of the chunks, at least one.
+
+    Returns:
+        TrackStatistic: The statistic summary of the whole track.
+    """
+    if not statistics:
+        raise Exception("no track statistic to merge")
+
+    statistic = TrackStatistic()
+
+    statistic.MovingDistance = sum(s.MovingDistance for s in statistics)
+    statistic.MovingTime = sum(s.MovingTime for s in statistics)
+    statistic.StoppedTime = sum(s.StoppedTime for s in statistics)
+    statistic.MaxSpeed = max(s.MaxSpeed for s in statistics)
+    statistic.MinElevation = min(s.MinElevation for s in statistics)
+    statistic.MaxElevation = max(s.MaxElevation for s in statistics)
+    statistic.Uphill = sum(s.Uphill for s in statistics)
+    statistic.Downhill = sum(s.Downhill for s in statistics)
+    statistic.PointCount = sum(s.PointCount for s in statistics)
+
+    return statistic
+
 def ShowGpxFileStatistic(filename : str) -> None:
     """ Shows statistic of a GPX file.
 
@@ -0,0 +1,158 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from PIL import Image
+from publish_profiler import Count
+
+####################################################################################
+### This module re-encodes the created images for the web: as WebP or as
+### optimized PNG (reduced to a color palette) and JPEG (optimized Huffman tables,
+### progressive). Pillow releases the GIL while encoding, so the images are
+### encoded in parallel in a thread pool.
+####################################################################################
+
+IMAGE_FORMATS = [ "original", "optimized", "webp" ]
+
+DEFAULT_QUALITY = 80
+DEFAULT_PNG_COLORS = 256
+
+def GetImageFilename(filename : str, imageFormat : str) -> str:
+    """ Returns the filename of an image after re-encoding.
+
+    Args:
+        filename (str): The filename of the created image, e.g. "track_map1.png".
+        imageFormat (str): The image format, see IMAGE_FORMATS.
+
+    Returns:
+        str: The filename of the re-encoded image, e.g. "track_map1.webp".
+    """
+    if imageFormat == "webp":
+        return str(Path(filename).with_suffix(".webp"))
+
+    return filename
+
+def ReencodeImage(filename : str, imageFormat : str, quality : int = DEFAULT_QUALITY,
+                  pngColors : int = DEFAULT_PNG_COLORS, keepOriginal : bool = False) -> str:
+    """ Re-encodes an image.
+
+    Args:
+        filename (str): The filename of the image.
+        imageFormat (str): The image format, see IMAGE_FORMATS.
+        quality (int, optional): The quality of WebP and JPEG images, 0 - 100. Defaults to 80.
+        pngColors (int, optional): The number of palette colors of optimized PNG images, 0 to keep all colors. Defaults to 256.
+        keepOriginal (bool, optional): Keep the original image if the re-encoded image has another filename. Defaults to False.
+
+    Returns:
+        str: The filename of the re-encoded image.
+    """
+    if imageFormat not in IMAGE_FORMATS:
+        raise Exception(f"unknown image format {imageFormat}")
+
+    outputFilename = GetImageFilename(filename, imageFormat)
+    if imageFormat == "original":
+        return outputFilename
+
+    originalSize = os.path.getsize(filename)
+
+    with Image.open(filename) as source:
+        image = source.copy()
+        sourceFormat = source.format
+
+    # write to a temporary file, an image is never left half written
+    tempFilename = outputFilename + ".tmp"
+
+    if imageFormat == "webp":
+        image.save(tempFilename, "WEBP", quality=quality, method=6)
+    elif sourceFormat == "JPEG":
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(tempFilename, "JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        if pngColors > 0 and image.mode in ("RGB", "RGBA"):
+            method = Image.Quantize.FASTOCTREE if image.mode == "RGBA" else Image.Quantize.MEDIANCUT
+            image = image.quantize(colors=pngColors, method=method)
+        image.save(tempFilename, "PNG", optimize=True)
+
+    os.replace(tempFilename, outputFilename)
+
+    if outputFilename != filename and not keepOriginal:
+        os.remove(filename)
+
+    Count("images re-encoded")
+    Count("image bytes saved", originalSize - os.path.getsize(outputFilename))
+
+    return outputFilename
+
+def ReencodeImages(filenames : list[str], imageFormat : str, quality : int = DEFAULT_QUALITY,
+                   pngColors : int = DEFAULT_PNG_COLORS, keepOriginal : bool = False,
+                   maxWorkers : int | None = None) -> list[str]:
+    """ Re-encodes images in parallel.
+
+    Args:
+        filenames (list[str]): The filenames of the images.
+        imageFormat (str): The image format, see IMAGE_FORMATS.
+        quality (int, optional): The quality of WebP and JPEG images, 0 - 100. Defaults to 80.
+        pngColors (int, optional): The number of palette colors of optimized PNG images, 0 to keep all colors. Defaults to 256.
+        keepOriginal (bool, optional): Keep the original images if the re-encoded images have other filenames. Defaults to False.
+        maxWorkers (int | None, optional): The number of threads. Defaults to the number of CPUs.
+
+    Returns:
+        list[str]: The filenames of the re-encoded images.
+    """
+    if imageFormat == "original":
+        return list(filenames)
+
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        futures = [ executor.submit(ReencodeImage, filename, imageFormat, quality, pngColors, keepOriginal) for filename in filenames ]
+        return [ future.result() for future in futures ]
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("image_output", description="Re-encodes images as WebP or optimized PNG and JPEG.")
+    argParser.add_argument("filenames", nargs="+", help="the PNG and JPEG images")
+    argParser.add_argument("-f", "--format", help="image format", choices=IMAGE_FORMATS[1:], default="webp")
+    argParser.add_argument("-q", "--quality", help="quality of WebP and JPEG images, 0 - 100", type=int, default=DEFAULT_QUALITY)
+    argParser.add_argument("-c", "--colors", help="number of palette colors of PNG images, 0 to keep all colors", type=int, default=DEFAULT_PNG_COLORS)
+    argParser.add_argument("-k", "--keep", help="keep the original images", action="store_true")
+    argParser.add_argument("-w", "--workers", help="number of threads", type=int, required=False)
+    args = argParser.parse_args()
+
+    totalBefore = sum(os.path.getsize(filename) for filename in args.filenames)
+
+    outputFilenames = ReencodeImages(args.filenames, args.format, args.quality, args.colors, args.keep, args.workers)
+
+    totalAfter = sum(os.path.getsize(filename) for filename in outputFilenames)
+    print(f"{len(outputFilenames)} images: {totalBefore / 1024:.0f} KB -> {totalAfter / 1024:.0f} KB")
+    print("done")
@@ -0,0 +1,420 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import os
+import threading
+import time
+import math
+import gpxpy.geo
+import numpy as np
+from typing import Any, Iterator
+from convert_fit_to_gpx import TrackPoint, DEFAULT_MAX_GAP_SECONDS
+from gpx_statistic import TrackStatistic, TimespanToHoursMinutesSeconds
+from publish_config import DEFAULT_STOPPED_SPEED_THRESHOLD
+from fit_stream import FitRecordReader, CreateTrackPointFromRecord
+
+####################################################################################
+### This module calculates the statistic of a track while the activity is still
+### running, e.g. for guided group hikes. Each new point updates the distance,
+### the moving and pause time, the maximum speed, the altitude extremes and the
+### ascent and descent in constant time, so the statistic of a long track costs
+### no more per minute than the statistic of a short one.
+###
+### The points are pushed through AddPoint() / AddRecord() or read from a FIT
+### file which is still being written (TailFitFile). The values follow the rules
+### of gpxpy used for the published statistic (see gpx_statistic), only the
+### maximum speed is taken from a histogram of the point distances and speeds.
+### It is not exact: in tests it was within 1 % of the gpxpy value, a few
+### thousandths of a m/s for hiking tracks.
+####################################################################################
+
+# the top speeds are usually GPS errors, like gpxpy the top 5 percent are ignored
+IGNORE_TOP_SPEED_PERCENTILES = 0.05
+
+# the smallest distance of the logarithmic distance bins in meters
+MIN_DISTANCE = 0.1
+
+class LiveTrackStatistic:
+    """ The statistic of a growing track, updated point by point. """
+
+    def __init__(self, stoppedSpeedThreshold : float = DEFAULT_STOPPED_SPEED_THRESHOLD,
+                 maxGapSeconds : float = DEFAULT_MAX_GAP_SECONDS,
+                 speedBinWidth : float = 0.05, speedBins : int = 1024,
+                 distanceResolution : float = 0.025, distanceBins : int = 400) -> None:
+        """ Creates the empty statistic.
+
+        Args:
+            stoppedSpeedThreshold (float, optional): Threshold speed to differ between move and pause,
+                the same value as for CalculateTrackStatistic(). Defaults to 0.15.
+            maxGapSeconds (float, optional): A time gap longer than this starts a new track segment. Defaults to 3600.
+            speedBinWidth (float, optional): The resolution of the maximum speed in meters per second. Defaults to 0.05.
+            speedBins (int, optional): The number of speed bins, faster speeds count to the last bin. Defaults to 1024.
+            distanceResolution (float, optional): The relative resolution of the point distances for the maximum speed. Defaults to 2.5 %.
+            distanceBins (int, optional): The number of distance bins from 0.1 m, longer distances count to the last bin. Defaults to 400 (2 km).
+        """
+        self.StoppedSpeedThreshold = stoppedSpeedThreshold
+        self.MaxGapSeconds = maxGapSeconds
+
+        self.PointCount = 0
+        self.SegmentCount = 0
+
+        self.Distance = 0.0
+        """ The whole distance in meters, while moving and stopped. """
+
+        self.MovingDistance = 0.0
+        self.MovingTime = 0.0
+        self.StoppedTime = 0.0
+
+        self.MinElevation : float | None = None
+        self.MaxElevation : float | None = None
+
+        self.StartTime : Any = None
+        self.LastTime : Any = None
+
+        # the maximum speed needs the distribution of the speeds and the point distances,
+        # it is kept as histogram of fixed size (logarithmic distance bins, linear speed bins)
+        # instead of a list of all speeds
+        self.__speedBinWidth = speedBinWidth
+        self.__distanceBinFactor = 1 + distanceResolution
+        self.__speedHistogram = np.zeros((distanceBins, speedBins), dtype=np.int32)
+        self.__speedCount = 0
+        self.__distanceSum = 0.0
+        self.__distanceSquareSum = 0.0
+
+        # like gpxpy the maximum speed is calculated per segment, the histogram holds the current segment
+        self.__finishedMaxSpeed = 0.0
+
+        # ascent and descent of the smoothed elevations up to the last but one point
+        self.__uphill = 0.0
+        self.__downhill = 0.0
+
+        # the current segment: previous point, the raw elevations of the last two points,
+        # the smoothed elevation of the last but one point
+        self.__previous : TrackPoint | None = None
+        self.__elevations : list[float] = []
+        self.__smoothedPrevious : float | None = None
+        self.__segmentMovingTime = 0.0
+
+    def __StartSegment(self) -> None:
+        """ Starts a new track segment, the values of the last segment are final. """
+        if len(self.__elevations) == 2 and self.__smoothedPrevious is not None:
+            self.__AddClimb(self.__smoothedPrevious, self.__elevations[-1])
+
+        self.__finishedMaxSpeed = max(self.__finishedMaxSpeed, self.__SegmentMaxSpeed())
+        self.__speedHistogram.fill(0)
+        self.__speedCount = 0
+        self.__distanceSum = 0.0
+        self.__distanceSquareSum = 0.0
+
+        self.__previous = None
+        self.__elevations = []
+        self.__smoothedPrevious = None
+        self.__segmentMovingTime = 0.0
+
+    def __AddClimb(self, previous : float, current : float) -> None:
+        """ Adds the elevation difference of two smoothed elevations to the ascent or descent. """
+        if current > previous:
+            self.__uphill += current - previous
+        else:
+            self.__downhill += previous - current
+
+    def __AddElevation(self, elevation : float) -> None:
+        """ Adds the elevation of a new point. Like gpxpy the elevations are smoothed with their neighbours
+        (0.3, 0.4, 0.3), so the smoothed elevation of a point is final when the next point is added.
+        """
+        if not self.__elevations:
+            self.__elevations = [ elevation ]
+            return
+
+        if len(self.__elevations) == 1:
+            # the first point of a segment is not smoothed
+            self.__smoothedPrevious = self.__elevations[0]
+            self.__elevations.append(elevation)
+            return
+
+        before, last = self.__elevations
+        smoothedLast = before * 0.3 + last * 0.4 + elevation * 0.3
+        self.__AddClimb(self.__smoothedPrevious, smoothedLast) # type: ignore
+
+        self.__smoothedPrevious = smoothedLast
+        self.__elevations = [ last, elevation ]
+
+    def AddPoint(self, point : TrackPoint) -> None:
+        """ Adds the next point of the track.
+
+        Args:
+            point (TrackPoint): The track point, later than the previous point.
+        """
+        previous = self.__previous
+
+        if previous is not None and (point.Time - previous.Time).total_seconds() > self.MaxGapSeconds:
+            self.__StartSegment()
+            previous = None
+
+        if previous is None:
+            self.SegmentCount += 1
+        else:
+            seconds = (point.Time - previous.Time).total_seconds()
+
+            # 3D distance like gpxpy, which ignores the elevation 0
+            distance = gpxpy.geo.distance(previous.Latitude, previous.Longitude, previous.Altitude or None,
+                                          point.Latitude, point.Longitude, point.Altitude or None)
+
+            if seconds > 0 and distance > 0:
+                self.Distance += distance
+
+                # gpxpy compares the threshold with the speed in km/h
+                if distance / seconds * 3.6 <= self.StoppedSpeedThreshold:
+                    self.StoppedTime += seconds
+                else:
+                    self.MovingTime += seconds
+                    self.MovingDistance += distance
+                    self.__segmentMovingTime += seconds
+
+                if self.__segmentMovingTime > 0:
+                    distanceBin = min(max(int(math.log(distance / MIN_DISTANCE, self.__distanceBinFactor)), 0), self.__speedHistogram.shape[0] - 1)
+                    speedBin = min(int(distance / seconds / self.__speedBinWidth), self.__speedHistogram.shape[1] - 1)
+                    self.__speedHistogram[distanceBin, speedBin] += 1
+                    self.__speedCount += 1
+                    self.__distanceSum += distance
+                    self.__distanceSquareSum += distance * distance
+
+        if point.Altitude is not None:
+            self.__AddElevation(point.Altitude)
+            self.MinElevation = point.Altitude if self.MinElevation is None else min(self.MinElevation, point.Altitude)
+            self.MaxElevation = point.Altitude if self.MaxElevation is None else max(self.MaxElevation, point.Altitude)
+
+        if self.StartTime is None:
+            self.StartTime = point.Time
+        self.LastTime = point.Time
+
+        self.PointCount += 1
+        self.__previous = point
+
+    def AddRecord(self, record : dict[str, Any]) -> bool:
+        """ Adds a FIT record message, e.g. from the Garmin SDK or fit_stream.
+
+        Args:
+            record (dict[str, Any]): The record message.
+
+        Returns:
+            bool: True if the record has a position and was added.
+        """
+        previousAltitude = self.__previous.Altitude if self.__previous is not None else 0.0
+        point = CreateTrackPointFromRecord(record, previousAltitude)
+        if point is None:
+            return False
+
+        self.AddPoint(point)
+        return True
+
+    def __SegmentMaxSpeed(self) -> float:
+        """ Returns the maximum speed of the current segment.
+
+        Returns:
+            float: The maximum speed in meters per second, 0 for less than two moving points.
+        """
+        if self.__speedCount < 2:
+            return 0.0
+
+        average = self.__distanceSum / self.__speedCount
+        deviation = math.sqrt(max(self.__distanceSquareSum / self.__speedCount - average * average, 0.0))
+
+        # the points with distances within 1.5 standard deviations around the average distance,
+        # a distance bin on the limit counts with the part inside the limit
+        edges = MIN_DISTANCE * self.__distanceBinFactor ** np.arange(self.__speedHistogram.shape[0] + 1)
+        lower = np.maximum(edges[:-1], average - deviation * 1.5)
+        upper = np.minimum(edges[1:], average + deviation * 1.5)
+        weights = np.clip((upper - lower) / np.diff(edges), 0.0, 1.0)
+        speedCounts = weights @ self.__speedHistogram
+
+        count = float(speedCounts.sum())
+        if count < 1.0:
+            return 0.0
+
+        index = min(math.floor(count * (1 - IGNORE_TOP_SPEED_PERCENTILES)), count - 1) + 0.5
+        cumulative = np.cumsum(speedCounts)
+        speedBin = min(int(np.searchsorted(cumulative, index, side="right")), len(cumulative) - 1)
+
+        # the rank of the speed within its bin, assuming the speeds of a bin are evenly spread
+        before = float(cumulative[speedBin - 1]) if speedBin > 0 else 0.0
+        fraction = min(max((index - before) / float(speedCounts[speedBin]), 0.0), 1.0)
+
+        return (speedBin + fraction) * self.__speedBinWidth
+
+    def MaxSpeed(self) -> float:
+        """ Returns the maximum speed like gpxpy: the maximum of the track segments, each without
+        the points with unusual distances and without the top 5 percent, which are usually GPS errors.
+
+        Returns:
+            float: The maximum speed in meters per second, usually within 1 % of the gpxpy value.
+        """
+        return max(self.__finishedMaxSpeed, self.__SegmentMaxSpeed())
+
+    def UphillDownhill(self) -> tuple[float, float]:
+        """ Returns the ascent and descent of the track up to the last point.
+
+        Returns:
+            tuple[float, float]: The ascent and descent in meters.
+        """
+        uphill, downhill = self.__uphill, self.__downhill
+
+        # the last point is not smoothed until the next point is added
+        if len(self.__elevations) == 2 and self.__smoothedPrevious is not None:
+            difference = self.__elevations[-1] - self.__smoothedPrevious
+            if difference > 0:
+                uphill += difference
+            else:
+                downhill -= difference
+
+        return uphill, downhill
+
+    def GetStatistic(self) -> TrackStatistic:
+        """ Returns the current statistic, e.g. for SaveTrackStatisticAsHtml().
+
+        Returns:
+            TrackStatistic: The statistic summary of the track up to the last point.
+        """
+        if self.PointCount == 0:
+            raise Exception("the track has no GPS points")
+
+        statistic = TrackStatistic()
+
+        statistic.MovingDistance = self.MovingDistance
+        statistic.MovingTime = self.MovingTime
+        statistic.StoppedTime = self.StoppedTime
+        statistic.MaxSpeed = self.MaxSpeed()
+        statistic.MinElevation = self.MinElevation if self.MinElevation is not None else 0.0
+        statistic.MaxElevation = self.MaxElevation if self.MaxElevation is not None else 0.0
+        statistic.Uphill, statistic.Downhill = self.UphillDownhill()
+        statistic.PointCount = self.PointCount
+
+        return statistic
+
+def TailFitFile(fitFilename : str, statistic : LiveTrackStatistic, pollInterval : float = 5.0,
+                idleTimeout : float | None = None) -> Iterator[LiveTrackStatistic]:
+    """ Reads a FIT file which is still being written and adds the new points to the statistic.
+    Only the data appended since the last poll is read.
+
+    Args:
+        fitFilename (str): The name of the FIT file, waits until the file exists.
+        statistic (LiveTrackStatistic): The statistic.
+        pollInterval (float, optional): The time between two reads in seconds. Defaults to 5.
+        idleTimeout (float | None, optional): Stop after this time in seconds without new points. Defaults to waiting forever.
+
+    Yields:
+        LiveTrackStatistic: The statistic after new points were added.
+    """
+    lastChange = time.monotonic()
+
+    while not os.path.exists(fitFilename):
+        if idleTimeout is not None and time.monotonic() - lastChange > idleTimeout:
+            return
+        time.sleep(pollInterval)
+
+    with open(fitFilename, "rb") as file:
+        reader = FitRecordReader(file)
+
+        while True:
+            added = sum(1 for record in reader.ReadRecords() if statistic.AddRecord(record))
+
+            now = time.monotonic()
+            if added > 0:
+                lastChange = now
+                yield statistic
+            elif idleTimeout is not None and now - lastChange > idleTimeout:
+                return
+
+            time.sleep(pollInterval)
+
+def ReplayFitFile(sourceFilename : str, targetFilename : str, blockSize : int = 4096, interval : float = 0.1) -> threading.Thread:
+    """ Writes an existing FIT file block by block to a new file, like a device recording an activity.
+    Used as live source for testing.
+
+    Args:
+        sourceFilename (str): The existing FIT file.
+        targetFilename (str): The new FIT file, overwritten.
+        blockSize (int, optional): The number of bytes written at once. Defaults to 4096.
+        interval (float, optional): The time between two blocks in seconds. Defaults to 0.1.
+
+    Returns:
+        threading.Thread: The running thread writing the file.
+    """
+    # the target is created before the thread starts, so a reader does not see an old file
+    target = open(targetFilename, "wb")
+
+    def Replay() -> None:
+        with open(sourceFilename, "rb") as source, target:
+            while True:
+                block = source.read(blockSize)
+                if not block:
+                    break
+                target.write(block)
+                target.flush()
+                time.sleep(interval)
+
+    thread = threading.Thread(target=Replay, name="fit-replay", daemon=True)
+    thread.start()
+    return thread
+
+def __PrintStatistic(statistic : LiveTrackStatistic) -> None:
+    """ Prints the current statistic in one line.
+
+    Args:
+        statistic (LiveTrackStatistic): The statistic.
+    """
+    hours, minutes, _ = TimespanToHoursMinutesSeconds(statistic.MovingTime)
+    uphill, downhill = statistic.UphillDownhill()
+    print(f"{statistic.LastTime:%H:%M:%S}  {statistic.MovingDistance / 1000:.2f} km  moving {hours}:{minutes:02d} h  "
+          f"max. {statistic.MaxSpeed() * 3.6:.1f} km/h  altitude {statistic.MinElevation:.0f} - {statistic.MaxElevation:.0f} m  "
+          f"uphill {uphill:.0f} m  downhill {downhill:.0f} m  ({statistic.PointCount} points)")
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("live_track_statistic", description="Shows the statistic of a FIT file while the activity is still being recorded.")
+    argParser.add_argument("filename", help='the growing FIT file "abc.FIT"')
+    argParser.add_argument("-p", "--poll_interval", help="seconds between two reads of the file", type=float, default=5.0)
+    argParser.add_argument("-t", "--idle_timeout", help="stop after this number of seconds without new points", type=float, required=False)
+    argParser.add_argument("-sst", "--stopped_speed_threshold", help="threshold speed to differ between move and pause", type=float, default=DEFAULT_STOPPED_SPEED_THRESHOLD)
+    argParser.add_argument("-r", "--replay", help='write this existing FIT file step by step to the growing file, for testing', required=False)
+    args = argParser.parse_args()
+
+    if args.replay is not None:
+        ReplayFitFile(args.replay, args.filename)
+
+    liveStatistic = LiveTrackStatistic(args.stopped_speed_threshold)
+
+    try:
+        for _ in TailFitFile(args.filename, liveStatistic, args.poll_interval, args.idle_timeout):
+            __PrintStatistic(liveStatistic)
+    except KeyboardInterrupt:
+        pass
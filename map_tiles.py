@@ -0,0 +1,345 @@
+# type: ignore
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import io
+import math
+import queue
+import random
+import sqlite3
+import threading
+import numpy as np
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+from PIL import Image
+from staticmap import StaticMap
+from publish_profiler import Count
+
+TILE_SIZE = 256
+
+def LonLatToTile(longitude : np.ndarray, latitude : np.ndarray, zoom : int) -> tuple[np.ndarray, np.ndarray]:
+    """ Projects positions to web mercator tile coordinates.
+
+    Args:
+        longitude (np.ndarray): The longitudes in degrees.
+        latitude (np.ndarray): The latitudes in degrees.
+        zoom (int): The zoom level of the map.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The x and y tile coordinates, the integer part is the tile number.
+    """
+    n = 2.0 ** zoom
+    x = (np.asarray(longitude) + 180.0) / 360.0 * n
+    latRad = np.radians(latitude)
+    y = (1.0 - np.log(np.tan(latRad) + 1.0 / np.cos(latRad)) / math.pi) / 2.0 * n
+    return x, y
+
+# downloaded map tiles: URL -> tile image data
+__tileCache : OrderedDict[str, bytes] = OrderedDict()
+__tileCacheBytes = 0
+__tileCacheMaxBytes = 64 * 1024 * 1024
+__tileCacheLock = threading.Lock()
+
+def SetTileCacheSize(maxBytes : int) -> None:
+    """ Sets the memory used for keeping downloaded map tiles.
+
+    Args:
+        maxBytes (int): The maximum size of all kept map tiles in bytes, 0 switches the cache off.
+    """
+    global __tileCacheMaxBytes
+
+    with __tileCacheLock:
+        __tileCacheMaxBytes = maxBytes
+        __TrimTileCache()
+
+def __TrimTileCache() -> None:
+    """ Removes the oldest map tiles until the cache size limit is kept. The cache lock must be held. """
+    global __tileCacheBytes
+
+    while __tileCacheBytes > __tileCacheMaxBytes and __tileCache:
+        _, data = __tileCache.popitem(last=False)
+        __tileCacheBytes -= len(data)
+
+def GetCachedTile(url : str) -> bytes | None:
+    """ Returns a map tile from the cache.
+
+    Args:
+        url (str): The URL of the map tile.
+
+    Returns:
+        bytes | None: The tile image data, None if the tile is not in the cache.
+    """
+    with __tileCacheLock:
+        data = __tileCache.get(url)
+        if data is not None:
+            __tileCache.move_to_end(url)
+        return data
+
+def AddCachedTile(url : str, data : bytes) -> None:
+    """ Stores a map tile in the cache.
+
+    Args:
+        url (str): The URL of the map tile.
+        data (bytes): The tile image data.
+    """
+    global __tileCacheBytes
+
+    with __tileCacheLock:
+        if len(data) > __tileCacheMaxBytes or url in __tileCache:
+            return
+        __tileCache[url] = data
+        __tileCacheBytes += len(data)
+        __TrimTileCache()
+
+class TileSource(ABC):
+    """ A source of map tiles other than a tile server, e.g. a local MBTiles file. """
+
+    @abstractmethod
+    def UrlTemplate(self) -> str:
+        """ Returns a URL template identifying the tiles of this source, used as key of the tile cache.
+
+        Returns:
+            str: The URL template with the placeholders {z}, {x}, {y}.
+        """
+        ...
+
+    @abstractmethod
+    def GetTiles(self, tiles : list[tuple[int, int, int]]) -> dict[tuple[int, int, int], bytes]:
+        """ Reads many map tiles at once.
+
+        Args:
+            tiles (list[tuple[int, int, int]]): The zoom, x and y of the tiles (XYZ scheme).
+
+        Returns:
+            dict[tuple[int, int, int], bytes]: The tile image data of the found tiles.
+        """
+        ...
+
+class MBTilesSource(TileSource):
+    """ Reads map tiles from a local MBTiles file (SQLite database) with a pool of read only connections. """
+
+    def __init__(self, filename : str, poolSize : int = 4) -> None:
+        """ Opens the MBTiles file.
+
+        Args:
+            filename (str): The MBTiles filename.
+            poolSize (int, optional): The number of database connections. Defaults to 4.
+        """
+        path = Path(filename).resolve()
+        if not path.is_file():
+            raise Exception(f"MBTiles file {filename} not found")
+
+        self.Filename = str(path)
+        self.__connections : queue.Queue[sqlite3.Connection] = queue.Queue()
+
+        for _ in range(poolSize):
+            # immutable: the file is not changed while rendering, so SQLite needs no locks
+            db = sqlite3.connect(f"{path.as_uri()}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+            self.__connections.put(db)
+
+        with self.__Connection() as db:
+            metadata = dict(db.execute("SELECT name, value FROM metadata").fetchall())
+        self.Metadata : dict[str, str] = metadata
+
+    @contextmanager
+    def __Connection(self) -> Iterator[sqlite3.Connection]:
+        """ Borrows a database connection from the pool. """
+        db = self.__connections.get()
+        try:
+            yield db
+        finally:
+            self.__connections.put(db)
+
+    def UrlTemplate(self) -> str:
+        """ Returns a URL template identifying the tiles of this source, used as key of the tile cache.
+
+        Returns:
+            str: The URL template with the placeholders {z}, {x}, {y}.
+        """
+        filename = self.Filename.replace("{", "{{").replace("}", "}}")
+        return f"mbtiles://{filename}/{{z}}/{{x}}/{{y}}"
+
+    def GetTiles(self, tiles : list[tuple[int, int, int]]) -> dict[tuple[int, int, int], bytes]:
+        """ Reads many map tiles at once, with one query per zoom level.
+
+        Args:
+            tiles (list[tuple[int, int, int]]): The zoom, x and y of the tiles (XYZ scheme).
+
+        Returns:
+            dict[tuple[int, int, int], bytes]: The tile image data of the found tiles.
+        """
+        wanted = set(tiles)
+        result : dict[tuple[int, int, int], bytes] = {}
+
+        with self.__Connection() as db:
+            for zoom in sorted({ z for z, _, _ in wanted }):
+                xs = [ x for z, x, _ in wanted if z == zoom ]
+                ys = [ y for z, _, y in wanted if z == zoom ]
+
+                # MBTiles uses the TMS scheme with the y axis pointing north
+                maxRow = (1 << zoom) - 1
+                rows = db.execute("SELECT tile_column, tile_row, tile_data FROM tiles "
+                                  "WHERE zoom_level = ? AND tile_column BETWEEN ? AND ? AND tile_row BETWEEN ? AND ?",
+                                  (zoom, min(xs), max(xs), maxRow - max(ys), maxRow - min(ys)))
+
+                for x, row, data in rows:
+                    key = (zoom, x, maxRow - row)
+                    if key in wanted:
+                        result[key] = bytes(data)
+
+        Count("MBTiles tiles read", len(result))
+
+        return result
+
+# opened MBTiles files: filename -> tile source
+__mbtilesSources : dict[str, MBTilesSource] = {}
+__mbtilesSourcesLock = threading.Lock()
+
+def GetMBTilesSource(filename : str) -> MBTilesSource:
+    """ Returns the tile source of a MBTiles file. The source and its connections are shared by all callers.
+
+    Args:
+        filename (str): The MBTiles filename.
+
+    Returns:
+        MBTilesSource: The tile source.
+    """
+    key = str(Path(filename).resolve())
+
+    with __mbtilesSourcesLock:
+        source = __mbtilesSources.get(key)
+        if source is None:
+            source = MBTilesSource(filename)
+            __mbtilesSources[key] = source
+
+    return source
+
+def __CreateEmptyTile() -> bytes:
+    """ Returns a transparent map tile as PNG image data. """
+    data = io.BytesIO()
+    Image.new("RGBA", (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0)).save(data, "PNG")
+    return data.getvalue()
+
+EMPTY_TILE = __CreateEmptyTile()
+
+class TileMap(StaticMap):
+    """ Static map which keeps the downloaded map tiles in memory and counts them for the profiler.
+    The placeholder {s} in the URL template is replaced by a random tile server for each tile.
+    With a tile source the tiles are read from the source instead, e.g. a local MBTiles file.
+    """
+
+    def __init__(self, width : int, height : int, url_template : str, servers : tuple[str, ...] = ("a", "b", "c"),
+                 tile_source : TileSource | None = None, **kwargs) -> None:
+        """ Creates the map.
+
+        Args:
+            width (int): The image width in pixels.
+            height (int): The image height in pixels.
+            url_template (str): The tile URL with the placeholders {s}, {z}, {x}, {y}.
+            servers (tuple[str, ...], optional): The tile servers replacing {s}. Defaults to ("a", "b", "c").
+            tile_source (TileSource | None, optional): Read the tiles from this source instead of the tile servers. Defaults to None.
+        """
+        if tile_source is not None:
+            url_template = tile_source.UrlTemplate()
+
+        # keep {s} in the formatted URL, so the tile server does not change the cache key
+        super().__init__(width, height, url_template=url_template.replace("{s}", "{{s}}"), **kwargs)
+        self.servers = tuple(servers)
+        self.tile_source = tile_source
+
+        # tiles read from the tile source for the current rendering: URL -> tile image data
+        self.source_tiles : dict[str, bytes] = {}
+
+    def _draw_base_layer(self, image : Image.Image) -> None:
+        """ Draws the map tiles. Tiles of a tile source are read with one batch lookup before drawing.
+
+        Args:
+            image (Image.Image): The map image.
+        """
+        if self.tile_source is None:
+            super()._draw_base_layer(image)
+            return
+
+        # the same tile range as StaticMap._draw_base_layer
+        x_min = int(math.floor(self.x_center - (0.5 * self.width / self.tile_size)))
+        y_min = int(math.floor(self.y_center - (0.5 * self.height / self.tile_size)))
+        x_max = int(math.ceil(self.x_center + (0.5 * self.width / self.tile_size)))
+        y_max = int(math.ceil(self.y_center + (0.5 * self.height / self.tile_size)))
+
+        max_tile = 2 ** self.zoom
+        wanted : dict[str, tuple[int, int, int]] = {}
+        for x in range(x_min, x_max):
+            for y in range(y_min, y_max):
+                key = (self.zoom, (x + max_tile) % max_tile, (y + max_tile) % max_tile)
+                url = self.url_template.format(z=key[0], x=key[1], y=key[2])
+
+                data = GetCachedTile(url)
+                if data is not None:
+                    Count("map tile cache hits")
+                    self.source_tiles[url] = data
+                else:
+                    wanted[url] = key
+
+        if wanted:
+            tiles = self.tile_source.GetTiles(list(wanted.values()))
+            for url, key in wanted.items():
+                # tiles missing in the source are drawn transparent
+                data = tiles.get(key, EMPTY_TILE)
+                self.source_tiles[url] = data
+                AddCachedTile(url, data)
+
+        try:
+            super()._draw_base_layer(image)
+        finally:
+            self.source_tiles = {}
+
+    def get(self, url : str, **kwargs) -> tuple[int, bytes]:
+        """ Downloads a map tile or takes it from the cache or the tiles read from the tile source.
+
+        Args:
+            url (str): The URL of the map tile.
+
+        Returns:
+            tuple[int, bytes]: The HTTP status code and the tile image data.
+        """
+        if self.tile_source is not None:
+            return 200, self.source_tiles.get(url, EMPTY_TILE)
+
+        data = GetCachedTile(url)
+        if data is not None:
+            Count("map tile cache hits")
+            return 200, data
+
+        Count("map tiles fetched")
+        status, data = super().get(url.replace("{s}", random.choice(self.servers)), **kwargs)
+
+        if status == 200:
+            AddCachedTile(url, data)
+
+        return status, data
@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import heapq
+from datetime import datetime
+import gpxpy.gpx
+from pathlib import Path
+from typing import Iterator
+from convert_fit_to_gpx import TrackPoint, WriteGpxFileSegments, CreateGpxTrackFromTrackChunks, DEFAULT_MAX_GAP_SECONDS
+from fit_stream import FitRecordReader, CreateTrackPointFromRecord
+from publish_profiler import Count
+
+####################################################################################
+### This module merges several FIT files of one route, e.g. the days of a
+### multi-day hike or the files of a device restart, into one track.
+###
+### The record messages of all files are read incrementally (see fit_stream) and
+### merged in time order with a heap, so only one record per file is in memory
+### besides the merged track. Where files overlap in time the file which
+### started first is kept, duplicate timestamps are removed.
+####################################################################################
+
+class MergedFitFiles:
+    """ The merged track points of several FIT files. """
+
+    def __init__(self, fitFilenames : list[str]) -> None:
+        """ Creates the merge.
+
+        Args:
+            fitFilenames (list[str]): The names of the FIT files, in any order.
+        """
+        self.FitFilenames = fitFilenames
+
+        self.Sport : str | None = None
+        """ The sport of the first file with a sport message, e.g. hiking, known after reading the track points. """
+
+    def __IterFileTrackPoints(self, fitFilename : str) -> Iterator[TrackPoint]:
+        """ Reads the track points of a FIT file incrementally.
+
+        Args:
+            fitFilename (str): The name of the FIT file.
+
+        Yields:
+            TrackPoint: The track points.
+        """
+        with open(fitFilename, "rb") as file:
+            reader = FitRecordReader(file)
+            altitude = 0.0
+
+            for record in reader.ReadRecords():
+                point = CreateTrackPointFromRecord(record, altitude)
+                if point is not None:
+                    altitude = point.Altitude
+                    yield point
+
+            if self.Sport is None:
+                self.Sport = reader.Sport
+
+    def IterTrackPoints(self) -> Iterator[TrackPoint]:
+        """ Merges the track points of the files in time order (k-way merge).
+
+        Yields:
+            TrackPoint: The merged track points with strictly increasing time.
+        """
+        readers = [ self.__IterFileTrackPoints(filename) for filename in self.FitFilenames ]
+
+        # time, file index, point: the file index keeps equal times in file order
+        heap : list[tuple[datetime, int, TrackPoint]] = []
+        for idx, reader in enumerate(readers):
+            point = next(reader, None)
+            if point is not None:
+                heap.append((point.Time, idx, point))
+        heapq.heapify(heap)
+
+        # each file has at most one point in the heap
+        pending = [ False ] * len(readers)
+        for _, idx, _ in heap:
+            pending[idx] = True
+
+        currentIdx = -1
+        lastTime = None
+        dropped = 0
+
+        while heap:
+            _, idx, point = heap[0]
+
+            nextPoint = next(readers[idx], None)
+            if nextPoint is not None:
+                heapq.heapreplace(heap, (nextPoint.Time, idx, nextPoint))
+            else:
+                heapq.heappop(heap)
+                pending[idx] = False
+
+            # while the current file continues the points of overlapping files are dropped
+            if idx != currentIdx and currentIdx >= 0 and pending[currentIdx]:
+                dropped += 1
+                continue
+
+            if lastTime is not None and point.Time <= lastTime:
+                dropped += 1
+                continue
+
+            currentIdx = idx
+            lastTime = point.Time
+            yield point
+
+        Count("merged track points dropped", dropped)
+
+    def IterTrackChunks(self, maxGapSeconds : float = DEFAULT_MAX_GAP_SECONDS) -> Iterator[list[TrackPoint]]:
+        """ Returns the merged track points split into chunks at long time gaps, e.g. the nights of a multi-day hike.
+
+        Args:
+            maxGapSeconds (float, optional): A time gap longer than this starts a new chunk. Defaults to 3600.
+
+        Yields:
+            list[TrackPoint]: The track points of a chunk.
+        """
+        chunk : list[TrackPoint] = []
+
+        for point in self.IterTrackPoints():
+            if chunk and (point.Time - chunk[-1].Time).total_seconds() > maxGapSeconds:
+                yield chunk
+                chunk = []
+            chunk.append(point)
+
+        if chunk:
+            yield chunk
+
+def MergeFitFilesToGpxFile(fitFilenames : list[str], gpxFilename : str, name : str | None = None,
+                           maxGapSeconds : float = DEFAULT_MAX_GAP_SECONDS) -> None:
+    """ Merges FIT files to a GPX track with one segment per chunk between long time gaps.
+
+    Args:
+        fitFilenames (list[str]): The names of the FIT files.
+        gpxFilename (str): The name of the GPX file.
+        name (str | None, optional): The name of the track. Defaults to the name of the GPX file.
+        maxGapSeconds (float, optional): A time gap longer than this starts a new segment. Defaults to 3600.
+    """
+    merge = MergedFitFiles(fitFilenames)
+    segments = list(merge.IterTrackChunks(maxGapSeconds))
+
+    print(f"Number of points: {sum(len(segment) for segment in segments)}")
+    print(f"Number of segments: {len(segments)}")
+
+    WriteGpxFileSegments(gpxFilename, name if name is not None else Path(gpxFilename).stem, merge.Sport or "", segments)
+
+def CreateGpxTrackFromFitFiles(fitFilenames : list[str], maxGapSeconds : float = DEFAULT_MAX_GAP_SECONDS) -> gpxpy.gpx.GPX:
+    """ Merges FIT files to a GPX track, e.g. for the statistic and the exports of the publish pipeline.
+
+    Args:
+        fitFilenames (list[str]): The names of the FIT files.
+        maxGapSeconds (float, optional): A time gap longer than this starts a new segment. Defaults to 3600.
+
+    Returns:
+        gpxpy.gpx.GPX: The GPX track with one segment per chunk between long time gaps.
+    """
+    merge = MergedFitFiles(fitFilenames)
+    gpx = CreateGpxTrackFromTrackChunks(merge.IterTrackChunks(maxGapSeconds))
+
+    if merge.Sport is not None:
+        gpx.tracks[0].type = merge.Sport
+
+    return gpx
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("merge_fit_files", description="Merges several GARMIN activity FIT files of one route into one GPX track.")
+    argParser.add_argument("filenames", help='input filenames "abc.FIT"', nargs="+")
+    argParser.add_argument("-o", "--output", help='output filename "abc.GPX"', required=True)
+    argParser.add_argument("-n", "--name", help="name of the track, defaults to the output filename", required=False)
+    argParser.add_argument("-mg", "--max_gap", help="time gap in seconds which starts a new track segment", required=False)
+    args = argParser.parse_args()
+
+    maxGapSeconds = float(args.max_gap) if args.max_gap is not None else DEFAULT_MAX_GAP_SECONDS
+
+    MergeFitFilesToGpxFile(args.filenames, args.output, args.name, maxGapSeconds)
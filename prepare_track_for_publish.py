@@ -28,35 +28,50 @@ IN THE SOFTWARE.
 import gpxpy
 import gpxpy.gpx
 import argparse
-from convert_fit_to_gpx import CreateGpxTrackFromFitActivity
-from gpx_statistic import TimespanToHoursMinutesSeconds
+from convert_fit_to_gpx import ReadFitFile, IterTrackChunksFromMessages, IterTrackChunksFromGpx, CreateGpxTrackFromTrackPoints, ResampleTrackPoints, DEFAULT_MAX_GAP_SECONDS
+from track_resample import RESAMPLE_MODES
+from publish_config import PublishConfig, DEFAULT_PUBLISH_CONFIG, DEFAULT_STOPPED_SPEED_THRESHOLD
+from gpx_statistic import TimespanToHoursMinutesSeconds, TrackStatistic, CalculateTrackStatistic, MergeTrackStatistics
 from pathlib import Path
-import matplotlib.pyplot as plt
+from datetime import datetime
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import math
 import create_map_googlemaps_js as create_map_googlemaps
 import create_map_openstreetmap
 import create_overview_map
-
-stoppedSpeedThreshold = 0.15
-
-ALTITUDE_PROFILE_IMG_WIDTH = 1000
-ALTITUDE_PROFILE_IMG_HEIGHT = 200
-
-MAP_PREVIEW_IMG_WIDTH = 400
-MAP_PREVIEW_IMG_HEIGHT = 400
-
-MAP_IMG_WIDTH = 1500
-MAP_IMG_HEIGHT = 1500
-
-
-def SaveAllTrackInfosAsHtml(gpx : gpxpy.gpx.GPX, filename : str, name : str) -> None:
-    """ Creates a HTML table with the track statistic and saves it.
+from map_tiles import GetMBTilesSource
+import publish_profiler
+import track_export
+from elevation_correction import GetElevationModel, CorrectTrackPointElevations
+import track_splits
+from image_output import GetImageFilename, ReencodeImages, IMAGE_FORMATS, DEFAULT_QUALITY
+from publish_manifest import PublishManifest, HashInputs, GetFileKey
+from activity_archive import HashFile
+from typing import Callable
+from publish_profiler import Stage, Count
+
+def SaveTrackStatisticAsHtml(statistic : TrackStatistic, filename : str, name : str,
+                             splits : list[track_splits.TrackSplit] | None = None,
+                             laps : list[track_splits.TrackSplit] | None = None,
+                             imageFormat : str = "original") -> None:
+    """ Creates a HTML table with an already calculated track statistic and saves it.
 
     Args:
-        gpx (gpxpy.gpx.GPX): The track.
+        statistic (TrackStatistic): The track statistic.
         filename (str): The filename for the HTML track statistic.
+        name (str): The name of the track.
+        splits (list[track_splits.TrackSplit] | None, optional): The per kilometer splits, shown below the altitude profile. Defaults to None.
+        laps (list[track_splits.TrackSplit] | None, optional): The laps, shown below the splits. Defaults to None.
+        imageFormat (str, optional): The format of the linked images, see image_output.IMAGE_FORMATS. Defaults to "original".
     """
-    moving_time, stopped_time, moving_distance, _, max_speed = gpx.get_moving_data(stopped_speed_threshold=stoppedSpeedThreshold)
+    moving_time = statistic.MovingTime
+    moving_distance = statistic.MovingDistance
+    minElevation = statistic.MinElevation
+    maxElevation = statistic.MaxElevation
+    uphill = statistic.Uphill
+    downhill = statistic.Downhill
 
     print(f"Track length: {moving_distance / 1000:.2f} km")
 
@@ -65,45 +80,48 @@ def SaveAllTrackInfosAsHtml(gpx : gpxpy.gpx.GPX, filename : str, name : str) ->
 
     print(f"Average speed: {moving_distance / moving_time * 3.6:.1f} km/h")
 
-    hours_pause, minutes_pause, _ = TimespanToHoursMinutesSeconds(stopped_time)
+    hours_pause, minutes_pause, _ = TimespanToHoursMinutesSeconds(statistic.StoppedTime)
     print(f"Pause time: {hours_pause} Hours {minutes_pause:02d} Minutes")
 
-    print(f"Maximum speed: {max_speed * 3.6:.1f} km/h")
+    print(f"Maximum speed: {statistic.MaxSpeed * 3.6:.1f} km/h")
     
-    print(f"Number of GPS points: {gpx.get_points_no()}")
+    print(f"Number of GPS points: {statistic.PointCount}")
 
-    minElevation, maxElevation = gpx.get_elevation_extremes()
-    if maxElevation is None or minElevation is None:
-        raise Exception("missing GPS elevation data")
-    
     print(f"Minimum altitude: {minElevation:.1f} m Maximum altitude: {maxElevation:.1f} m")
     print(f"Höhenunterschied: {maxElevation - minElevation:.1f} m")
 
-    uphill, downhill = gpx.get_uphill_downhill()
     print(f"Uphill: {uphill:.1f} m downhill: {downhill:.1f} m")
 
     base = f"/{name}_published/{name}"
 
+    map1 = GetImageFilename(f"{base}_map1.png", imageFormat)
+    map_preview1 = GetImageFilename(f"{base}_map_preview1.png", imageFormat)
+    map2 = GetImageFilename(f"{base}_map2.jpg", imageFormat)
+    map_preview2 = GetImageFilename(f"{base}_map_preview2.jpg", imageFormat)
+    overview_large = GetImageFilename(f"{base}_overview_large.jpg", imageFormat)
+    overview = GetImageFilename(f"{base}_overview.jpg", imageFormat)
+    altitude = GetImageFilename(f"{base}_altitude.png", imageFormat)
+
     html_code = f"""
 <div class="wp-block-columns is-layout-flex wp-container-core-columns-is-layout-9d6595d7 wp-block-columns-is-layout-flex">
     <div class="wp-block-column is-layout-flow wp-block-column-is-layout-flow">
         <figure class="wp-block-image size-large">
-            <a href="{base}_map1.png">
-                <img decoding="async" src="{base}_map_preview1.png" alt=""/>
+            <a href="{map1}">
+                <img decoding="async" src="{map_preview1}" alt=""/>
             </a>
         </figure>
     </div>
     <div class="wp-block-column is-layout-flow wp-block-column-is-layout-flow">
         <figure class="wp-block-image size-large">
-            <a href="{base}_map2.jpg">
-                <img decoding="async" src="{base}_map_preview2.jpg" alt=""/>
+            <a href="{map2}">
+                <img decoding="async" src="{map_preview2}" alt=""/>
             </a>
         </figure>
     </div>
     <div class="wp-block-column is-layout-flow wp-block-column-is-layout-flow">
         <figure class="wp-block-image size-large">
-            <a href="{base}_overview_large.jpg">
-                <img decoding="async" src="{base}_overview.jpg" alt=""/>
+            <a href="{overview_large}">
+                <img decoding="async" src="{overview}" alt=""/>
             </a>
         </figure>
     </div>
@@ -134,29 +152,90 @@ def SaveAllTrackInfosAsHtml(gpx : gpxpy.gpx.GPX, filename : str, name : str) ->
     </table>
 </figure>
 <figure class="wp-block-image size-large">
-    <img decoding="async" src="{base}_altitude.png" alt=""/>
+    <img decoding="async" src="{altitude}" alt=""/>
 </figure>
 """
+
+    if splits:
+        html_code += track_splits.FormatSplitsAsHtml(splits, "km")
+    if laps:
+        html_code += track_splits.FormatSplitsAsHtml(laps, "Runde")
     
     with open(filename, "w") as file:
         file.write(html_code)
 
-def SaveSmoothedTrackAsGpx(gpx : gpxpy.gpx.GPX, filename : str) -> gpxpy.gpx.GPX:
-    """ Creates a smoothed track and saves it.
+def SmoothTrack(gpx : gpxpy.gpx.GPX) -> gpxpy.gpx.GPX:
+    """ Reduces the number of points of a track and smoothes it in place.
 
     Args:
         gpx (gpxpy.gpx.GPX): The track.
-        filename (str): The filename for the smoothed track.
+
+    Returns:
+        gpxpy.gpx.GPX: The same track, smoothed.
     """
-    cloned_gpx = gpx.clone()
-    cloned_gpx.reduce_points(gpx.get_points_no() // 2, min_distance=10)
-    cloned_gpx.smooth()
+    gpx.reduce_points(max(gpx.get_points_no() // 2, 2), min_distance=10)
+    gpx.smooth()
 
-    xml = cloned_gpx.to_xml()
-    with open(filename, "w") as file:
-        file.write(xml)
+    return gpx
+
+def ProcessTrackInChunks(fitFilepath : str, removePointsBegin : int = 0, removePointsEnd : int = 0,
+                         config : PublishConfig = DEFAULT_PUBLISH_CONFIG) -> tuple[TrackStatistic, gpxpy.gpx.GPX, list[tuple[datetime, datetime]]]:
+    """ Splits the track into chunks at sessions, long time gaps and optionally laps, and calculates the
+    statistic and the smoothed track chunk by chunk. Only one chunk is held as full resolution gpxpy
+    track at a time. The decoded FIT messages of the whole file are kept during the run.
+
+    Args:
+        fitFilepath (str): The FIT activity filename.
+        removePointsBegin (int, optional): Number of points to remove from the beginning of the track. Defaults to 0.
+        removePointsEnd (int, optional): Number of points to remove from the end of the track. Defaults to 0.
+        config (PublishConfig, optional): The settings: chunking, DEM correction, resampling and stopped speed threshold.
+            Defaults to the default settings.
+
+    Returns:
+        tuple[TrackStatistic, gpxpy.gpx.GPX, list[tuple[datetime, datetime]]]: The statistic of the whole track, the smoothed track
+            with one segment per chunk and the start and end time of the laps recorded in the FIT file.
+    """
+    with Stage("create track"):
+        messages = ReadFitFile(fitFilepath)
+
+    laps = track_splits.GetLapTimes(messages)
+
+    smoothedTrack = gpxpy.gpx.GPX()
+    smoothedTrack.tracks.append(gpxpy.gpx.GPXTrack(name=Path(fitFilepath).stem))
+    if messages.get("sport_mesgs"):
+        smoothedTrack.tracks[0].type = str(messages["sport_mesgs"][0]["sport"])
+
+    statistics : list[TrackStatistic] = []
+
+    elevationModel = GetElevationModel(config.DemDir) if config.DemDir is not None else None
+
+    for chunk in IterTrackChunksFromMessages(messages, config.MaxGapSeconds, config.SplitOnLaps, removePointsBegin, removePointsEnd):
+        Count("track points in", len(chunk))
+        Count("track chunks", 1)
+
+        if config.ResampleMode is not None:
+            with Stage("resampling"):
+                chunk = ResampleTrackPoints(chunk, config.ResampleMode, config.ResampleStep)
+
+        if elevationModel is not None:
+            with Stage("elevation correction"):
+                Count("DEM corrected points", CorrectTrackPointElevations(chunk, elevationModel))
 
-    return cloned_gpx
+        gpx = CreateGpxTrackFromTrackPoints(chunk)
+        del chunk
+
+        with Stage("statistic"):
+            statistics.append(CalculateTrackStatistic(gpx, config.StoppedSpeedThreshold))
+
+        with Stage("smoothing"):
+            smoothedTrack.tracks[0].segments += SmoothTrack(gpx).tracks[0].segments
+
+    if not statistics:
+        raise Exception("the track has no GPS points")
+
+    print(f"Number of track segments: {len(statistics)}")
+
+    return MergeTrackStatistics(statistics), smoothedTrack, laps
 
 def SaveAltitudeProfileImage(gpx : gpxpy.gpx.GPX, filename : str, width : int, height : int) -> None:
     """ Creates an altutude profile image and saves it (PNG image).
@@ -182,29 +261,67 @@ def SaveAltitudeProfileImage(gpx : gpxpy.gpx.GPX, filename : str, width : int, h
     if yMax - yMin < 200:
         yMax = yMin + 200
     
-    dpi = plt.rcParams["figure.dpi"]
-    fig, ax = plt.subplots(figsize=(width / dpi, height / dpi)) # type: ignore
+    # a figure of its own instead of the global pyplot state, so concurrent publish runs can draw at the same time
+    dpi = matplotlib.rcParams["figure.dpi"]
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+
+    ax = fig.add_subplot()
     ax.plot(distance, altitude) # type: ignore
     ax.set_xlabel("Entfernung in km") # type: ignore
     ax.set_ylabel("Höhe in m") # type: ignore
-    
-    plt.grid() # type: ignore
-    plt.fill_between(distance, altitude, color="#9999C0") # type: ignore
-    plt.ylim(yMin, yMax) # type: ignore
-    
+
+    ax.grid() # type: ignore
+    ax.fill_between(distance, altitude, color="#9999C0") # type: ignore
+    ax.set_ylim(yMin, yMax) # type: ignore
+
     fig.tight_layout()
-    plt.savefig(filename) # type: ignore
+    fig.savefig(filename) # type: ignore
+
+def SaveTrackExports(gpx : gpxpy.gpx.GPX, basepath : str, exportFormats : list[str],
+                     coordinatePrecision : int, elevationPrecision : int, compress : bool) -> list[str]:
+    """ Saves the track in the export formats for downloading and embedding.
+
+    Args:
+        gpx (gpxpy.gpx.GPX): The track.
+        basepath (str): The filename without suffix.
+        exportFormats (list[str]): The file formats, see track_export.EXPORT_FORMATS.
+        coordinatePrecision (int): The number of decimal places of latitude and longitude.
+        elevationPrecision (int): The number of decimal places of the elevation.
+        compress (bool): Also save a gzip compressed copy of each file, for web servers serving precompressed files.
+
+    Returns:
+        list[str]: The created files.
+    """
+    name = gpx.tracks[0].name if gpx.tracks and gpx.tracks[0].name else Path(basepath).name
+    trackType = gpx.tracks[0].type if gpx.tracks and gpx.tracks[0].type else ""
 
-    # plt.show() # type: ignore
+    filenames : list[str] = []
+    for exportFormat in exportFormats:
+        filename = basepath + track_export.EXPORT_FORMATS[exportFormat]
+        track_export.ExportTrack(filename, exportFormat, name, trackType, IterTrackChunksFromGpx(gpx),
+                                 coordinatePrecision, elevationPrecision)
+        filenames.append(filename)
 
-def PrepareTrackForWordpressPublish(fitFilepath : str, altitudeProfileImgWidth : int, altitudeProfileImgHeight : int,
-                           mapPreviewImgWidth : int, mapPreviewImgHeight : int,
-                           mapImgWidth : int, mapImgHeight : int,
-                           removePointsBegin : int = 0, removePointsEnd : int = 0) -> None:
+        if compress:
+            filenames.append(track_export.CompressFile(filename))
+
+    return filenames
+
+def PrepareTrackForWordpressPublish(fitFilepath : str, config : PublishConfig = DEFAULT_PUBLISH_CONFIG,
+                                    removePointsBegin : int = 0, removePointsEnd : int = 0, rebuild : bool = False) -> str:
     """ Prepares the track for publishing on Wordpress: creates statistic, high profile and a smoothed GPX track.
+    The function uses no global settings, so several tracks can be published concurrently in one process.
 
     Args:
         fitFilename (str): the FIT activity filename.
+        config (PublishConfig, optional): The settings of the publish run. Defaults to the default settings.
+        removePointsBegin (int, optional): Number of points to remove from the beginning of the track. Defaults to 0.
+        removePointsEnd (int, optional): Number of points to remove from the end of the track. Defaults to 0.
+        rebuild (bool, optional): Create all files, otherwise only files whose inputs changed since the last run. Defaults to False.
+
+    Returns:
+        str: The directory with the created files.
     """
 
     name = Path(fitFilepath).stem
@@ -212,31 +329,93 @@ def PrepareTrackForWordpressPublish(fitFilepath : str, altitudeProfileImgWidth :
     Path(basedir).mkdir(exist_ok=True)
     basepath = str(Path(basedir).joinpath(name))
 
-    gpx = CreateGpxTrackFromFitActivity(fitFilepath, removePointsBegin, removePointsEnd)
+    manifest = PublishManifest(basedir, rebuild)
 
-    SaveAllTrackInfosAsHtml(gpx, basepath + ".html", name)
+    # the inputs of each artifact
+    fitHash = HashFile(fitFilepath)
+    trackInputs = HashInputs(fitHash, removePointsBegin, removePointsEnd, config.MaxGapSeconds, config.SplitOnLaps, config.DemDir, config.ResampleMode, config.ResampleStep)
+    imageInputs = (config.ImageFormat, config.ImageQuality)
 
-    smoothedTrack = SaveSmoothedTrackAsGpx(gpx, basepath + ".gpx")
+    exportInputs = HashInputs(trackInputs, config.ExportFormats, config.CoordinatePrecision, config.ElevationPrecision, config.CompressExports)
+    htmlInputs = HashInputs(trackInputs, name, config.StoppedSpeedThreshold, config.SplitDistance, config.ImageFormat)
+    altitudeInputs = HashInputs(trackInputs, config.AltitudeProfileImgWidth, config.AltitudeProfileImgHeight, imageInputs)
 
-    SaveAltitudeProfileImage(smoothedTrack, basepath + "_altitude.png", altitudeProfileImgWidth, altitudeProfileImgHeight)
+    trackUpToDate = (manifest.IsUpToDate("track export", exportInputs) and manifest.IsUpToDate("statistic", htmlInputs)
+                     and manifest.IsUpToDate("altitude profile", altitudeInputs))
 
-    track_color = "#E00000"
+    smoothedTrack = None
+    if not trackUpToDate:
+        statistic, smoothedTrack, lapTimes = ProcessTrackInChunks(fitFilepath, removePointsBegin, removePointsEnd, config)
+        Count("track points out", smoothedTrack.get_points_no())
+
+        if not manifest.IsUpToDate("statistic", htmlInputs):
+            with Stage("splits"):
+                profile = track_splits.CreateTrackProfile(smoothedTrack)
+                splits = track_splits.CalculateDistanceSplits(profile, config.SplitDistance)
+                laps = track_splits.CalculateLapSplits(profile, lapTimes)
+
+            # a single lap is the whole track
+            SaveTrackStatisticAsHtml(statistic, basepath + ".html", name, splits, laps if len(laps) > 1 else None, config.ImageFormat)
+            manifest.Update("statistic", htmlInputs, [ basepath + ".html" ])
 
-    # print("create preview maps ...")
-    create_map_openstreetmap.CreateImageWithTrackOnMap(fitFilepath, basepath + "_map_preview1.png", mapPreviewImgWidth, mapPreviewImgHeight, "red", 3)
-    create_map_googlemaps.CreateImageWithTrackOnMap(fitFilepath, basepath + "_map_preview2.jpg", mapPreviewImgWidth, mapPreviewImgHeight, "hybrid", track_color, 3)
-    # create_map_googlemaps.CreateImageWithTrackOnMap(fitFilepath, basepath + "_map_preview3.png", mapPreviewImgWidth, mapPreviewImgHeight, "terrain", track_color, 3)
+        if not manifest.IsUpToDate("track export", exportInputs):
+            with Stage("track export"):
+                files = SaveTrackExports(smoothedTrack, basepath, config.ExportFormats, config.CoordinatePrecision, config.ElevationPrecision, config.CompressExports)
+            manifest.Update("track export", exportInputs, files)
 
-    # print("create maps ...")
-    create_map_openstreetmap.CreateImageWithTrackOnMap(fitFilepath, basepath + "_map1.png", mapImgWidth, mapImgHeight, "red", 3)
-    create_map_googlemaps.CreateImageWithTrackOnMap(fitFilepath, basepath + "_map2.jpg", 1280, 1280, "hybrid", track_color, 3)
-    # create_map_googlemaps.CreateImageWithTrackOnMap(fitFilepath, basepath + "_map3.png", 1280, 1280, "terrain", track_color, 3)
+    track_color = "#E00000"
 
-    create_overview_map.CreateImageOverviewMap(fitFilepath, basepath + "_overview.jpg", mapPreviewImgWidth, mapPreviewImgHeight, zoom=8, path_color=track_color, path_width=3)
-    create_overview_map.CreateImageOverviewMap(fitFilepath, basepath + "_overview_large.jpg", 900, 900, zoom=8, path_color=track_color, path_width=3)
+    mapTiles = GetMBTilesSource(config.MapTilesFilename) if config.MapTilesFilename is not None else None
+    overviewTiles = GetMBTilesSource(config.OverviewTilesFilename) if config.OverviewTilesFilename is not None else None
+
+    # the maps show the whole track of the FIT file, they do not depend on the trimming
+    mapTilesKey = GetFileKey(config.MapTilesFilename)
+    overviewTilesKey = GetFileKey(config.OverviewTilesFilename)
+
+    # artifact, image filename, inputs, creation
+    images : list[tuple[str, str, str, Callable[[], None]]] = [
+        ("altitude profile", basepath + "_altitude.png", altitudeInputs,
+            lambda : SaveAltitudeProfileImage(smoothedTrack, basepath + "_altitude.png", config.AltitudeProfileImgWidth, config.AltitudeProfileImgHeight)),
+        ("preview map OpenStreetMap", basepath + "_map_preview1.png",
+            HashInputs(fitHash, "openstreetmap", config.MapPreviewImgWidth, config.MapPreviewImgHeight, "red", 3, mapTilesKey, imageInputs),
+            lambda : create_map_openstreetmap.CreateImageWithTrackOnMap(fitFilepath, basepath + "_map_preview1.png", config.MapPreviewImgWidth, config.MapPreviewImgHeight, "red", 3, mapTiles)),
+        ("preview map Google Maps", basepath + "_map_preview2.jpg",
+            HashInputs(fitHash, "googlemaps hybrid", config.MapPreviewImgWidth, config.MapPreviewImgHeight, track_color, 3, imageInputs),
+            lambda : create_map_googlemaps.CreateImageWithTrackOnMap(fitFilepath, basepath + "_map_preview2.jpg", config.MapPreviewImgWidth, config.MapPreviewImgHeight, "hybrid", track_color, 3)),
+        ("map OpenStreetMap", basepath + "_map1.png",
+            HashInputs(fitHash, "openstreetmap", config.MapImgWidth, config.MapImgHeight, "red", 3, mapTilesKey, imageInputs),
+            lambda : create_map_openstreetmap.CreateImageWithTrackOnMap(fitFilepath, basepath + "_map1.png", config.MapImgWidth, config.MapImgHeight, "red", 3, mapTiles)),
+        ("map Google Maps", basepath + "_map2.jpg",
+            HashInputs(fitHash, "googlemaps hybrid", 1280, 1280, track_color, 3, imageInputs),
+            lambda : create_map_googlemaps.CreateImageWithTrackOnMap(fitFilepath, basepath + "_map2.jpg", 1280, 1280, "hybrid", track_color, 3)),
+        ("overview map", basepath + "_overview.jpg",
+            HashInputs(fitHash, "overview", config.MapPreviewImgWidth, config.MapPreviewImgHeight, 8, track_color, 3, overviewTilesKey, imageInputs),
+            lambda : create_overview_map.CreateImageOverviewMap(fitFilepath, basepath + "_overview.jpg", config.MapPreviewImgWidth, config.MapPreviewImgHeight, zoom=8, path_color=track_color, path_width=3, tile_source=overviewTiles)),
+        ("overview map large", basepath + "_overview_large.jpg",
+            HashInputs(fitHash, "overview", 900, 900, 8, track_color, 3, overviewTilesKey, imageInputs),
+            lambda : create_overview_map.CreateImageOverviewMap(fitFilepath, basepath + "_overview_large.jpg", 900, 900, zoom=8, path_color=track_color, path_width=3, tile_source=overviewTiles))
+    ]
+
+    created : list[tuple[str, str, str]] = []
+    for artifact, filename, inputs, create in images:
+        if manifest.IsUpToDate(artifact, inputs):
+            Count("artifacts up to date")
+            continue
+
+        with Stage(artifact):
+            create()
+        created.append((artifact, filename, inputs))
+
+    with Stage("image encoding"):
+        encoded = ReencodeImages([ filename for _, filename, _ in created ], config.ImageFormat, config.ImageQuality)
+
+    for (artifact, _, inputs), filename in zip(created, encoded):
+        manifest.Update(artifact, inputs, [ filename ])
 
     print("done")
 
+    return basedir
+
 ###################################################################################################
 # The standalone application starts here.
 ###################################################################################################
@@ -248,6 +427,23 @@ if __name__ == "__main__":
     argParser.add_argument("-rb", "--remove_begin", help="remove number of points from the begin of the track", required=False)
     argParser.add_argument("-re", "--remove_end", help="remove number of points from the end of the track", required=False)
     argParser.add_argument("-sst", "--stopped_speed_threshold", help="threshold speed to differ between move and pause", required=False)
+    argParser.add_argument("-mg", "--max_gap", help="time gap in seconds starting a new track segment (default 3600)", required=False)
+    argParser.add_argument("-sl", "--split_laps", help="start a new track segment at each lap", action="store_true")
+    argParser.add_argument("-ef", "--export_formats", help="comma separated file formats of the track: gpx, geojson, polyline (default gpx)", default="gpx")
+    argParser.add_argument("-p", "--precision", help="decimal places of the track coordinates", type=int, default=track_export.DEFAULT_COORDINATE_PRECISION)
+    argParser.add_argument("-ep", "--elevation_precision", help="decimal places of the track elevation", type=int, default=track_export.DEFAULT_ELEVATION_PRECISION)
+    argParser.add_argument("-z", "--gzip", help="also save gzip compressed copies of the track files", action="store_true")
+    argParser.add_argument("-dem", "--dem_dir", help="correct the altitude with the SRTM .hgt tiles in this directory", required=False)
+    argParser.add_argument("-r", "--resample", help="resample the track onto a uniform time or distance grid", choices=RESAMPLE_MODES, required=False)
+    argParser.add_argument("-rs", "--resample_step", help="step of the resample grid in seconds or meters (default 5 s or 10 m)", type=float, required=False)
+    argParser.add_argument("-sd", "--split_distance", help="distance of the splits in the HTML table in meters, 0 for no splits", type=float, default=track_splits.DEFAULT_SPLIT_DISTANCE)
+    argParser.add_argument("-if", "--image_format", help="re-encode the images: optimized (PNG palette, optimized JPEG) or webp", choices=IMAGE_FORMATS, default="original")
+    argParser.add_argument("-iq", "--image_quality", help="quality of re-encoded WebP and JPEG images, 0 - 100", type=int, default=DEFAULT_QUALITY)
+    argParser.add_argument("-mt", "--map_tiles", help='read the OpenStreetMap map tiles from the local MBTiles file "abc.mbtiles"', required=False)
+    argParser.add_argument("-ot", "--overview_tiles", help='read the overview map tiles from the local MBTiles file "abc.mbtiles"', required=False)
+    argParser.add_argument("-f", "--force", help="create all files, not only the files whose inputs changed", action="store_true")
+    argParser.add_argument("-prof", "--profile", help="print time and memory used by each stage", action="store_true")
+    argParser.add_argument("-pj", "--profile_json", help="write time and memory used by each stage to a JSON trace file", required=False)
     args = argParser.parse_args()
 
     removePointsBegin = abs(int(args.remove_begin)) if args.remove_begin is not None else 0
@@ -258,11 +454,35 @@ if __name__ == "__main__":
     if removePointsEnd > 0:
         print(f"removing {removePointsEnd} points from the end of the track")
 
-    if args.stopped_speed_threshold is not None:
-        stoppedSpeedThreshold = float(args.stopped_speed_threshold)
-
-    PrepareTrackForWordpressPublish(args.filename,
-                           ALTITUDE_PROFILE_IMG_WIDTH, ALTITUDE_PROFILE_IMG_HEIGHT,
-                           MAP_PREVIEW_IMG_WIDTH, MAP_PREVIEW_IMG_HEIGHT,
-                           MAP_IMG_WIDTH, MAP_IMG_HEIGHT,
-                           removePointsBegin, removePointsEnd)
+    stoppedSpeedThreshold = float(args.stopped_speed_threshold) if args.stopped_speed_threshold is not None else DEFAULT_STOPPED_SPEED_THRESHOLD
+    maxGapSeconds = float(args.max_gap) if args.max_gap is not None else DEFAULT_MAX_GAP_SECONDS
+
+    exportFormats = [ f.strip() for f in args.export_formats.split(",") if f.strip() ]
+    for exportFormat in exportFormats:
+        if exportFormat not in track_export.EXPORT_FORMATS:
+            raise Exception(f"unknown export format {exportFormat}")
+    if "gpx" not in exportFormats:
+        # the HTML page links the GPX track
+        exportFormats.insert(0, "gpx")
+
+    config = PublishConfig(StoppedSpeedThreshold=stoppedSpeedThreshold, MaxGapSeconds=maxGapSeconds, SplitOnLaps=args.split_laps,
+                           ExportFormats=tuple(exportFormats), CoordinatePrecision=args.precision,
+                           ElevationPrecision=args.elevation_precision, CompressExports=args.gzip, DemDir=args.dem_dir,
+                           ResampleMode=args.resample, ResampleStep=args.resample_step, SplitDistance=args.split_distance,
+                           ImageFormat=args.image_format, ImageQuality=args.image_quality,
+                           MapTilesFilename=args.map_tiles, OverviewTilesFilename=args.overview_tiles)
+
+    if args.profile or args.profile_json is not None:
+        publish_profiler.EnableProfiling()
+
+    with Stage("publish"):
+        PrepareTrackForWordpressPublish(args.filename, config, removePointsBegin, removePointsEnd, args.force)
+
+    create_map_googlemaps.CloseBrowser()
+
+    profiler = publish_profiler.DisableProfiling()
+    if profiler is not None:
+        if args.profile:
+            profiler.PrintSummary()
+        if args.profile_json is not None:
+            profiler.WriteJsonTrace(args.profile_json)
@@ -0,0 +1,135 @@
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+from dataclasses import dataclass
+import track_export
+from convert_fit_to_gpx import DEFAULT_MAX_GAP_SECONDS
+from track_resample import RESAMPLE_MODES
+from track_splits import DEFAULT_SPLIT_DISTANCE
+from image_output import IMAGE_FORMATS, DEFAULT_QUALITY
+
+####################################################################################
+### This module holds the settings of a publish run (see prepare_track_for_publish).
+### The configuration is immutable and passed explicitly to each run, so several
+### runs with different settings can execute concurrently in one process, e.g. in
+### the worker pool of publish_queue. Use dataclasses.replace() to derive a changed
+### configuration.
+####################################################################################
+
+DEFAULT_STOPPED_SPEED_THRESHOLD = 0.15
+
+ALTITUDE_PROFILE_IMG_WIDTH = 1000
+ALTITUDE_PROFILE_IMG_HEIGHT = 200
+
+MAP_PREVIEW_IMG_WIDTH = 400
+MAP_PREVIEW_IMG_HEIGHT = 400
+
+MAP_IMG_WIDTH = 1500
+MAP_IMG_HEIGHT = 1500
+
+@dataclass(frozen=True)
+class PublishConfig:
+    """ The settings of a publish run. """
+
+    StoppedSpeedThreshold : float = DEFAULT_STOPPED_SPEED_THRESHOLD
+    """ Threshold speed to differ between move and pause. """
+
+    AltitudeProfileImgWidth : int = ALTITUDE_PROFILE_IMG_WIDTH
+    """ The width of the altitude profile image in pixels. """
+
+    AltitudeProfileImgHeight : int = ALTITUDE_PROFILE_IMG_HEIGHT
+    """ The height of the altitude profile image in pixels. """
+
+    MapPreviewImgWidth : int = MAP_PREVIEW_IMG_WIDTH
+    """ The width of the preview and overview map images in pixels. """
+
+    MapPreviewImgHeight : int = MAP_PREVIEW_IMG_HEIGHT
+    """ The height of the preview and overview map images in pixels. """
+
+    MapImgWidth : int = MAP_IMG_WIDTH
+    """ The width of the OpenStreetMap map image in pixels. """
+
+    MapImgHeight : int = MAP_IMG_HEIGHT
+    """ The height of the OpenStreetMap map image in pixels. """
+
+    MaxGapSeconds : float = DEFAULT_MAX_GAP_SECONDS
+    """ A time gap longer than this starts a new track segment. """
+
+    SplitOnLaps : bool = False
+    """ Start a new track segment at each lap. """
+
+    ExportFormats : tuple[str, ...] = ( "gpx", )
+    """ The file formats of the downloadable track, see track_export.EXPORT_FORMATS, must contain gpx. """
+
+    CoordinatePrecision : int = track_export.DEFAULT_COORDINATE_PRECISION
+    """ The number of decimal places of latitude and longitude in the exported track. """
+
+    ElevationPrecision : int = track_export.DEFAULT_ELEVATION_PRECISION
+    """ The number of decimal places of the elevation in the exported track. """
+
+    CompressExports : bool = False
+    """ Also save gzip compressed copies of the track files. """
+
+    DemDir : str | None = None
+    """ Directory with SRTM tiles to correct the altitude, None for no correction. """
+
+    ResampleMode : str | None = None
+    """ Resample the track onto a uniform time or distance grid, see track_resample, None for no resampling. """
+
+    ResampleStep : float | None = None
+    """ The resample grid step in seconds or meters, None for the default of the mode. """
+
+    SplitDistance : float = DEFAULT_SPLIT_DISTANCE
+    """ The distance of the splits in the HTML table in meters, 0 for no splits. """
+
+    ImageFormat : str = "original"
+    """ Re-encode the images, see image_output.IMAGE_FORMATS. """
+
+    ImageQuality : int = DEFAULT_QUALITY
+    """ The quality of re-encoded WebP and JPEG images, 0 - 100. """
+
+    MapTilesFilename : str | None = None
+    """ Local MBTiles file for the OpenStreetMap maps, None for the tile server. """
+
+    OverviewTilesFilename : str | None = None
+    """ Local MBTiles file for the overview maps, None for the tile server. """
+
+    def __post_init__(self) -> None:
+        """ Checks the settings. """
+        for exportFormat in self.ExportFormats:
+            if exportFormat not in track_export.EXPORT_FORMATS:
+                raise Exception(f"unknown export format {exportFormat}")
+
+        # the HTML page links the GPX track
+        if "gpx" not in self.ExportFormats:
+            raise Exception("the export formats must contain gpx")
+
+        if self.ImageFormat not in IMAGE_FORMATS:
+            raise Exception(f"unknown image format {self.ImageFormat}")
+
+        if self.ResampleMode is not None and self.ResampleMode not in RESAMPLE_MODES:
+            raise Exception(f"unknown resample mode {self.ResampleMode}")
+
+DEFAULT_PUBLISH_CONFIG = PublishConfig()
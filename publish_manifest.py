@@ -0,0 +1,136 @@
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+####################################################################################
+### This module keeps a build manifest in the "_published" directory. For each
+### created file (artifact) the manifest stores a hash of everything the file
+### depends on: the FIT file, the trimming, the image size, the map type and so
+### on. A later publish run only creates the artifacts whose inputs changed.
+####################################################################################
+
+MANIFEST_FILENAME = "publish_manifest.json"
+
+# increase when the created files change for the same inputs, e.g. a new map style
+MANIFEST_VERSION = 1
+
+def HashInputs(*inputs : Any) -> str:
+    """ Calculates the hash of the inputs of an artifact.
+
+    Args:
+        inputs (Any): The inputs, anything JSON serializable or convertible to string.
+
+    Returns:
+        str: The SHA-256 hash as hex string.
+    """
+    data = json.dumps([ MANIFEST_VERSION, *inputs ], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+def GetFileKey(filename : str | None) -> str | None:
+    """ Returns a key changing with the content of an input file, from its path, size and modification time.
+    Used for large input files like MBTiles, which are too large to be hashed on each run.
+
+    Args:
+        filename (str | None): The filename.
+
+    Returns:
+        str | None: The key, None if there is no file.
+    """
+    if filename is None:
+        return None
+
+    stat = os.stat(filename)
+    return f"{Path(filename).resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+class PublishManifest:
+    """ The build manifest of a "_published" directory. """
+
+    def __init__(self, basedir : str, rebuild : bool = False) -> None:
+        """ Loads the manifest of the directory.
+
+        Args:
+            basedir (str): The "_published" directory.
+            rebuild (bool, optional): Consider all artifacts outdated. Defaults to False.
+        """
+        self.Basedir = basedir
+        self.Rebuild = rebuild
+
+        # artifact -> { "inputs" : hash, "files" : [ filenames ] }
+        self.__artifacts : dict[str, dict[str, Any]] = {}
+
+        filename = Path(basedir).joinpath(MANIFEST_FILENAME)
+        if filename.exists():
+            try:
+                with open(filename, "r") as file:
+                    data = json.load(file)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.__artifacts = data.get("artifacts", {})
+            except (OSError, ValueError):
+                print(f"ignoring damaged manifest {filename}")
+
+    def IsUpToDate(self, artifact : str, inputsHash : str) -> bool:
+        """ Checks if an artifact was created from the same inputs and its files still exist.
+
+        Args:
+            artifact (str): The artifact name.
+            inputsHash (str): The hash of the current inputs, see HashInputs().
+
+        Returns:
+            bool: True if the artifact does not need to be created again.
+        """
+        if self.Rebuild:
+            return False
+
+        entry = self.__artifacts.get(artifact)
+        if entry is None or entry.get("inputs") != inputsHash:
+            return False
+
+        return all(Path(self.Basedir).joinpath(name).exists() for name in entry.get("files", []))
+
+    def Update(self, artifact : str, inputsHash : str, files : list[str]) -> None:
+        """ Records a created artifact and saves the manifest, so an interrupted run keeps the finished artifacts.
+
+        Args:
+            artifact (str): The artifact name.
+            inputsHash (str): The hash of the inputs, see HashInputs().
+            files (list[str]): The created files.
+        """
+        self.__artifacts[artifact] = { "inputs" : inputsHash, "files" : [ Path(name).name for name in files ] }
+        self.Save()
+
+    def Save(self) -> None:
+        """ Saves the manifest. """
+        filename = Path(self.Basedir).joinpath(MANIFEST_FILENAME)
+        tempFilename = str(filename) + ".tmp"
+
+        with open(tempFilename, "w") as file:
+            json.dump({ "version" : MANIFEST_VERSION, "artifacts" : self.__artifacts }, file, indent=2, sort_keys=True)
+
+        os.replace(tempFilename, filename)
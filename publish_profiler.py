@@ -0,0 +1,270 @@
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Iterator
+
+try:
+    import resource
+except ImportError:     # not available on Windows
+    resource = None     # type: ignore
+
+####################################################################################
+### This module measures the time and memory used by the stages of the publish
+### pipeline and counts events like decoded points or downloaded map tiles.
+###
+### Profiling is switched off by default. Then Stage() and Count() return
+### immediately, so the instrumentation can stay in the code.
+####################################################################################
+
+class StageRecord:
+    """ The measurement of a single stage. """
+
+    Name : str
+    """ The name of the stage. """
+
+    Depth : int
+    """ The nesting depth of the stage, 0 for top level stages. """
+
+    Start : float
+    """ The start time in seconds relative to the start of the profiler. """
+
+    Duration : float
+    """ The duration of the stage in seconds. """
+
+    PythonMemoryPeak : int
+    """ The peak of the python memory allocated during the stage in bytes (tracemalloc). """
+
+    RssPeak : int
+    """ The peak resident set size of the process at the end of the stage in bytes. """
+
+class Profiler:
+    """ Collects the stage measurements and the counters of a publish run. Stages and counters can be used from several threads. """
+
+    def __init__(self, traceMemory : bool = True) -> None:
+        """ Creates the profiler.
+
+        Args:
+            traceMemory (bool, optional): Measure the python memory peak with tracemalloc. Defaults to True.
+        """
+        self.Stages : list[StageRecord] = []
+        self.Counters : dict[str, int] = {}
+
+        self.__traceMemory = traceMemory
+        # running stages of each thread: [record, python memory at start, python memory peak of finished child stages]
+        self.__threadState = threading.local()
+        self.__lock = threading.Lock()
+        self.__startTime = time.perf_counter()
+
+        if self.__traceMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __GetRssPeak(self) -> int:
+        """ Returns the peak resident set size of the process.
+
+        Returns:
+            int: The peak resident set size in bytes, 0 if not available.
+        """
+        if resource is None:
+            return 0
+
+        # ru_maxrss is given in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def __GetStack(self) -> list[list[Any]]:
+        """ Returns the running stages of the current thread.
+
+        Returns:
+            list[list[Any]]: The running stages, the innermost stage last.
+        """
+        stack = getattr(self.__threadState, "stack", None)
+        if stack is None:
+            stack = []
+            self.__threadState.stack = stack
+        return stack
+
+    def Close(self) -> None:
+        """ Stops the memory tracing. """
+        if self.__traceMemory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def Stage(self, name : str) -> Iterator[None]:
+        """ Measures the time and memory of a stage. Stages can be nested, each thread has its own nesting.
+        The python memory peak is measured for the whole process, so stages running in parallel share it.
+
+        Args:
+            name (str): The name of the stage.
+        """
+        stack = self.__GetStack()
+
+        record = StageRecord()
+        record.Name = name
+        record.Depth = len(stack)
+
+        memoryStart = 0
+        if self.__traceMemory:
+            memoryStart, peak = tracemalloc.get_traced_memory()
+            if stack:
+                parent = stack[-1]
+                parent[2] = max(parent[2], peak)
+            tracemalloc.reset_peak()
+
+        frame = [record, memoryStart, 0]
+        stack.append(frame)
+        with self.__lock:
+            self.Stages.append(record)
+
+        record.Start = time.perf_counter() - self.__startTime
+        try:
+            yield
+        finally:
+            record.Duration = time.perf_counter() - self.__startTime - record.Start
+
+            stack.pop()
+
+            record.PythonMemoryPeak = 0
+            if self.__traceMemory:
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame[2])
+                record.PythonMemoryPeak = max(peak - frame[1], 0)
+                if stack:
+                    parent = stack[-1]
+                    parent[2] = max(parent[2], peak)
+
+            record.RssPeak = self.__GetRssPeak()
+
+    def Count(self, name : str, value : int = 1) -> None:
+        """ Increments a counter. This function is thread safe.
+
+        Args:
+            name (str): The name of the counter.
+            value (int, optional): The value to add. Defaults to 1.
+        """
+        with self.__lock:
+            self.Counters[name] = self.Counters.get(name, 0) + value
+
+    def PrintSummary(self) -> None:
+        """ Prints the stage measurements and the counters as table. """
+        print()
+        print(f"{'Stage':<44} {'Time [s]':>9} {'Py peak [MB]':>13} {'RSS peak [MB]':>14}")
+        print("-" * 83)
+
+        for stage in self.Stages:
+            name = "  " * stage.Depth + stage.Name
+            print(f"{name:<44} {stage.Duration:>9.3f} {stage.PythonMemoryPeak / 1e6:>13.1f} {stage.RssPeak / 1e6:>14.1f}")
+
+        if self.Counters:
+            print()
+            print(f"{'Counter':<44} {'Value':>9}")
+            print("-" * 54)
+            for name, value in self.Counters.items():
+                print(f"{name:<44} {value:>9}")
+
+        print()
+
+    def WriteJsonTrace(self, filename : str) -> None:
+        """ Writes the stage measurements and the counters to a JSON file.
+
+        Args:
+            filename (str): The name of the JSON file.
+        """
+        trace = {
+            "stages" : [ {
+                "name" : stage.Name,
+                "depth" : stage.Depth,
+                "start_s" : stage.Start,
+                "duration_s" : stage.Duration,
+                "python_memory_peak_bytes" : stage.PythonMemoryPeak,
+                "rss_peak_bytes" : stage.RssPeak
+            } for stage in self.Stages ],
+            "counters" : self.Counters
+        }
+
+        with open(filename, "w") as file:
+            json.dump(trace, file, indent=2)
+
+# The active profiler, None if profiling is switched off.
+__activeProfiler : Profiler | None = None
+
+def EnableProfiling(traceMemory : bool = True) -> Profiler:
+    """ Switches profiling on.
+
+    Args:
+        traceMemory (bool, optional): Measure the python memory peak with tracemalloc. Defaults to True.
+
+    Returns:
+        Profiler: The active profiler.
+    """
+    global __activeProfiler
+
+    __activeProfiler = Profiler(traceMemory)
+    return __activeProfiler
+
+def DisableProfiling() -> Profiler | None:
+    """ Switches profiling off.
+
+    Returns:
+        Profiler | None: The profiler that was active before.
+    """
+    global __activeProfiler
+
+    profiler = __activeProfiler
+    __activeProfiler = None
+
+    if profiler is not None:
+        profiler.Close()
+
+    return profiler
+
+def Stage(name : str) -> ContextManager[None]:
+    """ Measures a stage with the active profiler. Does nothing if profiling is switched off.
+
+    Args:
+        name (str): The name of the stage.
+
+    Returns:
+        ContextManager[None]: The context manager measuring the stage.
+    """
+    profiler = __activeProfiler
+    if profiler is None:
+        return nullcontext()
+
+    return profiler.Stage(name)
+
+def Count(name : str, value : int = 1) -> None:
+    """ Increments a counter of the active profiler. Does nothing if profiling is switched off.
+
+    Args:
+        name (str): The name of the counter.
+        value (int, optional): The value to add. Defaults to 1.
+    """
+    profiler = __activeProfiler
+    if profiler is not None:
+        profiler.Count(name, value)
@@ -0,0 +1,251 @@
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import queue
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable
+import create_map_googlemaps_js as create_map_googlemaps
+import prepare_track_for_publish as publish
+from convert_fit_to_gpx import SetFitFileCacheSize
+from publish_config import PublishConfig, DEFAULT_PUBLISH_CONFIG
+
+####################################################################################
+### This module runs publish jobs (see prepare_track_for_publish) in a pool of
+### long running worker threads. The workers keep their browser running and
+### share the decoded FIT files and the downloaded map tiles, so each job only
+### costs the work for its own track.
+###
+### Finished jobs are kept for status queries, the oldest are dropped when there
+### are too many of them or when they are too old.
+####################################################################################
+
+DEFAULT_MAX_FINISHED_JOBS = 256
+DEFAULT_FINISHED_JOB_TTL = 24 * 3600.0
+
+class PublishJob:
+    """ A track waiting for or being published. """
+
+    def __init__(self, fitFilepath : str, removePointsBegin : int, removePointsEnd : int) -> None:
+        """ Creates the publish job.
+
+        Args:
+            fitFilepath (str): The FIT activity filename.
+            removePointsBegin (int): Number of points to remove from the beginning of the track.
+            removePointsEnd (int): Number of points to remove from the end of the track.
+        """
+        self.Id = uuid.uuid4().hex[:12]
+        self.FitFilepath = fitFilepath
+        self.RemovePointsBegin = removePointsBegin
+        self.RemovePointsEnd = removePointsEnd
+
+        # queued, running, done, failed
+        self.Status = "queued"
+        self.Error : str | None = None
+        self.OutputDir : str | None = None
+
+        self.SubmitTime = time.time()
+        self.StartTime : float | None = None
+        self.EndTime : float | None = None
+
+        self.__done = threading.Event()
+
+    def Wait(self, timeout : float | None = None) -> bool:
+        """ Waits until the job is done or failed.
+
+        Args:
+            timeout (float | None, optional): The maximum waiting time in seconds. Defaults to waiting forever.
+
+        Returns:
+            bool: True if the job is finished.
+        """
+        return self.__done.wait(timeout)
+
+    def Finish(self, status : str, error : str | None = None) -> None:
+        """ Marks the job as finished.
+
+        Args:
+            status (str): The final status: done, failed.
+            error (str | None, optional): The error message of a failed job. Defaults to None.
+        """
+        self.Status = status
+        self.Error = error
+        self.EndTime = time.time()
+        self.__done.set()
+
+    def ToDict(self) -> dict[str, object]:
+        """ Returns the job status as dictionary, e.g. for JSON.
+
+        Returns:
+            dict[str, object]: The job status.
+        """
+        return {
+            "id" : self.Id,
+            "fit_file" : self.FitFilepath,
+            "status" : self.Status,
+            "error" : self.Error,
+            "output_dir" : self.OutputDir,
+            "submit_time" : self.SubmitTime,
+            "start_time" : self.StartTime,
+            "end_time" : self.EndTime
+        }
+
+class PublishWorkerPool:
+    """ A bounded queue of publish jobs processed by long running worker threads. """
+
+    def __init__(self, numWorkers : int = 1, maxQueuedJobs : int = 16, fitFileCacheSize : int = 8,
+                 config : PublishConfig | None = None, maxFinishedJobs : int = DEFAULT_MAX_FINISHED_JOBS,
+                 finishedJobTtl : float = DEFAULT_FINISHED_JOB_TTL,
+                 onJobDropped : Callable[[PublishJob], None] | None = None) -> None:
+        """ Creates the pool and starts the worker threads.
+
+        Args:
+            numWorkers (int, optional): The number of worker threads. Defaults to 1.
+            maxQueuedJobs (int, optional): The maximum number of waiting jobs. Defaults to 16.
+            fitFileCacheSize (int, optional): The number of decoded FIT files kept in memory. Defaults to 8.
+            config (PublishConfig | None, optional): The publish settings used for all jobs. Defaults to the default settings.
+            maxFinishedJobs (int, optional): The number of finished jobs kept for status queries. Defaults to 256.
+            finishedJobTtl (float, optional): The time in seconds a finished job is kept. Defaults to one day.
+            onJobDropped (Callable[[PublishJob], None] | None, optional): Called for each dropped finished job,
+                e.g. to delete its files. Defaults to None.
+        """
+        SetFitFileCacheSize(fitFileCacheSize)
+
+        self.__config = config if config is not None else DEFAULT_PUBLISH_CONFIG
+
+        self.__queue : queue.Queue[PublishJob | None] = queue.Queue(maxQueuedJobs)
+        self.__jobs : dict[str, PublishJob] = {}
+        self.__jobsLock = threading.Lock()
+
+        self.__maxFinishedJobs = maxFinishedJobs
+        self.__finishedJobTtl = finishedJobTtl
+        self.__onJobDropped = onJobDropped
+
+        self.__workers = [ threading.Thread(target=self.__Work, name=f"publish-worker-{idx}", daemon=True) for idx in range(numWorkers) ]
+        for worker in self.__workers:
+            worker.start()
+
+    def Submit(self, fitFilepath : str, removePointsBegin : int = 0, removePointsEnd : int = 0,
+               block : bool = True) -> PublishJob:
+        """ Adds a publish job to the queue.
+
+        Args:
+            fitFilepath (str): The FIT activity filename.
+            removePointsBegin (int, optional): Number of points to remove from the beginning of the track. Defaults to 0.
+            removePointsEnd (int, optional): Number of points to remove from the end of the track. Defaults to 0.
+            block (bool, optional): Wait while the queue is full, otherwise raise queue.Full. Defaults to True.
+
+        Returns:
+            PublishJob: The job.
+        """
+        job = PublishJob(fitFilepath, removePointsBegin, removePointsEnd)
+
+        self.__DropFinishedJobs()
+
+        with self.__jobsLock:
+            self.__jobs[job.Id] = job
+
+        try:
+            self.__queue.put(job, block=block)
+        except queue.Full:
+            with self.__jobsLock:
+                del self.__jobs[job.Id]
+            raise
+
+        return job
+
+    def GetJob(self, jobId : str) -> PublishJob | None:
+        """ Returns a job.
+
+        Args:
+            jobId (str): The job ID.
+
+        Returns:
+            PublishJob | None: The job, None if there is no job with this ID.
+        """
+        with self.__jobsLock:
+            return self.__jobs.get(jobId)
+
+    def GetJobs(self) -> list[PublishJob]:
+        """ Returns all jobs.
+
+        Returns:
+            list[PublishJob]: The jobs in submit order.
+        """
+        with self.__jobsLock:
+            return list(self.__jobs.values())
+
+    def __DropFinishedJobs(self) -> None:
+        """ Drops the finished jobs which are too old and the oldest finished jobs above the limit. """
+        now = time.time()
+
+        with self.__jobsLock:
+            finished = sorted((job for job in self.__jobs.values() if job.EndTime is not None), key=lambda job: job.EndTime or 0.0)
+            tooMany = max(len(finished) - self.__maxFinishedJobs, 0)
+            dropped = [ job for idx, job in enumerate(finished)
+                        if idx < tooMany or now - (job.EndTime or now) > self.__finishedJobTtl ]
+            for job in dropped:
+                del self.__jobs[job.Id]
+
+        if self.__onJobDropped is not None:
+            for job in dropped:
+                try:
+                    self.__onJobDropped(job)
+                except Exception:
+                    traceback.print_exc()
+
+    def Shutdown(self) -> None:
+        """ Finishes the queued jobs and stops the worker threads. """
+        for _ in self.__workers:
+            self.__queue.put(None)
+
+        for worker in self.__workers:
+            worker.join()
+
+    def __Work(self) -> None:
+        """ The worker thread: publishes the queued tracks until it gets the stop marker. """
+        try:
+            while True:
+                job = self.__queue.get()
+                if job is None:
+                    break
+
+                job.Status = "running"
+                job.StartTime = time.time()
+                print(f"publish {job.FitFilepath} ...")
+
+                try:
+                    job.OutputDir = publish.PrepareTrackForWordpressPublish(job.FitFilepath, self.__config,
+                                                                            job.RemovePointsBegin, job.RemovePointsEnd)
+                    job.Finish("done")
+                except Exception as e:
+                    traceback.print_exc()
+                    job.Finish("failed", str(e))
+
+                self.__DropFinishedJobs()
+        finally:
+            create_map_googlemaps.CloseBrowser()
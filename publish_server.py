@@ -0,0 +1,311 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import json
+import mimetypes
+import os
+import queue
+import re
+import shutil
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit, parse_qs, unquote
+from publish_queue import PublishWorkerPool, PublishJob, DEFAULT_MAX_FINISHED_JOBS, DEFAULT_FINISHED_JOB_TTL
+from publish_config import PublishConfig
+from image_output import IMAGE_FORMATS
+
+####################################################################################
+### This module runs a local HTTP service for publishing tracks. The worker pool
+### (see publish_queue) keeps the browser, the map tiles and the decoded FIT files
+### between the requests, so each request only costs the work for its own track.
+###
+###   POST /jobs?name=abc.fit&remove_begin=0&remove_end=0   upload a FIT file (request body)
+###   GET  /jobs                                            status of all jobs
+###   GET  /jobs/<id>?wait=30                               status of a job, optionally wait until it is finished
+###   GET  /jobs/<id>/html                                  the created HTML
+###   GET  /jobs/<id>/files                                 the names of the created files
+###   GET  /jobs/<id>/files/<name>                          a created file
+###
+### Each upload gets its own directory. When the worker pool drops a finished job
+### (too many finished jobs or too old) the directory is deleted as well.
+####################################################################################
+
+DEFAULT_PORT = 8080
+DEFAULT_MAX_UPLOAD_BYTES = 64 * 1024 * 1024
+
+class PublishServer(ThreadingHTTPServer):
+    """ The HTTP server with the publish worker pool. """
+
+    daemon_threads = True
+
+    def __init__(self, address : tuple[str, int], pool : PublishWorkerPool, uploadDir : str,
+                 maxUploadBytes : int = DEFAULT_MAX_UPLOAD_BYTES) -> None:
+        """ Creates the server.
+
+        Args:
+            address (tuple[str, int]): The host and port to listen on.
+            pool (PublishWorkerPool): The worker pool processing the uploaded tracks.
+            uploadDir (str): The directory for the uploaded FIT files and the created files.
+            maxUploadBytes (int, optional): The maximum size of an uploaded FIT file. Defaults to 64 MB.
+        """
+        super().__init__(address, PublishRequestHandler)
+        self.Pool = pool
+        self.UploadDir = uploadDir
+        self.MaxUploadBytes = maxUploadBytes
+
+        Path(uploadDir).mkdir(parents=True, exist_ok=True)
+
+class PublishRequestHandler(BaseHTTPRequestHandler):
+    """ Handles the requests of the publish service. """
+
+    server : PublishServer
+
+    def __SendJson(self, status : int, data : Any, headers : dict[str, str] | None = None) -> None:
+        """ Sends a JSON response.
+
+        Args:
+            status (int): The HTTP status code.
+            data (Any): The response data.
+            headers (dict[str, str] | None, optional): Additional response headers. Defaults to None.
+        """
+        body = json.dumps(data, indent=2).encode("utf-8")
+        self.__SendBytes(status, body, "application/json", headers)
+
+    def __SendBytes(self, status : int, body : bytes, contentType : str, headers : dict[str, str] | None = None) -> None:
+        """ Sends a response.
+
+        Args:
+            status (int): The HTTP status code.
+            body (bytes): The response body.
+            contentType (str): The content type of the body.
+            headers (dict[str, str] | None, optional): Additional response headers. Defaults to None.
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __SendError(self, status : int, message : str) -> None:
+        """ Sends an error response.
+
+        Args:
+            status (int): The HTTP status code.
+            message (str): The error message.
+        """
+        self.__SendJson(status, { "error" : message })
+
+    def __GetFinishedJob(self, jobId : str) -> PublishJob | None:
+        """ Returns a successfully finished job, sends an error response otherwise.
+
+        Args:
+            jobId (str): The job ID.
+
+        Returns:
+            PublishJob | None: The job, None if an error response was sent.
+        """
+        job = self.server.Pool.GetJob(jobId)
+        if job is None:
+            self.__SendError(404, f"unknown job {jobId}")
+            return None
+
+        if job.Status != "done" or job.OutputDir is None:
+            self.__SendError(409, f"job {jobId} is {job.Status}")
+            return None
+
+        return job
+
+    def do_GET(self) -> None:
+        """ Returns the job status and the created files. """
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = [ unquote(part) for part in url.path.split("/") if part ]
+
+        if parts == [ "jobs" ]:
+            self.__SendJson(200, [ job.ToDict() for job in self.server.Pool.GetJobs() ])
+            return
+
+        if len(parts) < 2 or parts[0] != "jobs":
+            self.__SendError(404, "not found")
+            return
+
+        jobId = parts[1]
+
+        if len(parts) == 2:
+            job = self.server.Pool.GetJob(jobId)
+            if job is None:
+                self.__SendError(404, f"unknown job {jobId}")
+                return
+
+            if "wait" in query:
+                try:
+                    timeout = min(float(query["wait"][0]), 300.0)
+                except ValueError:
+                    self.__SendError(400, "wait must be a number of seconds")
+                    return
+                job.Wait(timeout)
+
+            self.__SendJson(200, job.ToDict())
+            return
+
+        job = self.__GetFinishedJob(jobId)
+        if job is None or job.OutputDir is None:
+            return
+
+        files = sorted(entry.name for entry in os.scandir(job.OutputDir) if entry.is_file())
+
+        if parts[2:] == [ "html" ]:
+            filename = Path(job.FitFilepath).stem + ".html"
+            self.__SendBytes(200, Path(job.OutputDir).joinpath(filename).read_bytes(), "text/html; charset=utf-8")
+        elif parts[2:] == [ "files" ]:
+            self.__SendJson(200, files)
+        elif len(parts) == 4 and parts[2] == "files" and parts[3] in files:
+            contentType = mimetypes.guess_type(parts[3])[0] or "application/octet-stream"
+            self.__SendBytes(200, Path(job.OutputDir).joinpath(parts[3]).read_bytes(), contentType)
+        else:
+            self.__SendError(404, "not found")
+
+    def do_POST(self) -> None:
+        """ Stores an uploaded FIT file and adds a publish job. """
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+
+        if url.path.rstrip("/") != "/jobs":
+            self.__SendError(404, "not found")
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            self.__SendError(400, "Content-Length must be a number")
+            return
+
+        if length <= 0:
+            self.__SendError(411, "missing FIT file in the request body")
+            return
+        if length > self.server.MaxUploadBytes:
+            self.__SendError(413, "FIT file too large")
+            return
+
+        # the published files are named after the FIT file
+        name = Path(query.get("name", [ "activity.fit" ])[0]).name
+        name = re.sub(r"[^\w\-. ]", "_", name)
+        if not name.lower().endswith(".fit"):
+            name += ".fit"
+
+        try:
+            removePointsBegin = abs(int(query.get("remove_begin", [ "0" ])[0]))
+            removePointsEnd = abs(int(query.get("remove_end", [ "0" ])[0]))
+        except ValueError:
+            self.__SendError(400, "remove_begin and remove_end must be numbers")
+            return
+
+        data = self.rfile.read(length)
+
+        uploadDir = Path(self.server.UploadDir).joinpath(uuid.uuid4().hex[:12])
+        uploadDir.mkdir()
+        fitFilepath = uploadDir.joinpath(name)
+        fitFilepath.write_bytes(data)
+
+        try:
+            job = self.server.Pool.Submit(str(fitFilepath), removePointsBegin, removePointsEnd, block=False)
+        except queue.Full:
+            shutil.rmtree(uploadDir, ignore_errors=True)
+            self.__SendError(503, "too many waiting jobs, try again later")
+            return
+
+        self.__SendJson(202, job.ToDict(), { "Location" : f"/jobs/{job.Id}" })
+
+def __DeleteJobFiles(uploadDir : str, job : PublishJob) -> None:
+    """ Deletes the directory with the uploaded FIT file and the created files of a job.
+
+    Args:
+        uploadDir (str): The directory for the uploaded FIT files and the created files.
+        job (PublishJob): The dropped job.
+    """
+    jobDir = Path(job.FitFilepath).resolve().parent
+    if jobDir.parent == Path(uploadDir).resolve():
+        shutil.rmtree(jobDir, ignore_errors=True)
+
+def RunPublishServer(host : str, port : int, uploadDir : str, numWorkers : int = 1, maxQueuedJobs : int = 16,
+                     config : PublishConfig | None = None, maxFinishedJobs : int = DEFAULT_MAX_FINISHED_JOBS,
+                     finishedJobTtl : float = DEFAULT_FINISHED_JOB_TTL) -> None:
+    """ Runs the publish service until interrupted with Ctrl+C.
+
+    Args:
+        host (str): The host address to listen on.
+        port (int): The port to listen on.
+        uploadDir (str): The directory for the uploaded FIT files and the created files.
+        numWorkers (int, optional): The number of worker threads. Defaults to 1.
+        maxQueuedJobs (int, optional): The maximum number of waiting jobs. Defaults to 16.
+        config (PublishConfig | None, optional): The publish settings used for all jobs. Defaults to the default settings.
+        maxFinishedJobs (int, optional): The number of finished jobs kept with their files. Defaults to 256.
+        finishedJobTtl (float, optional): The time in seconds a finished job and its files are kept. Defaults to one day.
+    """
+    pool = PublishWorkerPool(numWorkers, maxQueuedJobs, config=config, maxFinishedJobs=maxFinishedJobs,
+                             finishedJobTtl=finishedJobTtl, onJobDropped=lambda job: __DeleteJobFiles(uploadDir, job))
+    server = PublishServer((host, port), pool, uploadDir)
+
+    print(f"publish service listening on http://{host}:{port}/jobs, press Ctrl+C to stop")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("stopping, finishing queued jobs ...")
+    finally:
+        server.server_close()
+        pool.Shutdown()
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("publish_server", description="Runs a local HTTP service preparing uploaded FIT files for publishing.")
+    argParser.add_argument("-H", "--host", help="host address to listen on", default="127.0.0.1")
+    argParser.add_argument("-p", "--port", help="port to listen on", type=int, default=DEFAULT_PORT)
+    argParser.add_argument("-d", "--upload_dir", help="directory for the uploaded and created files", default="publish_uploads")
+    argParser.add_argument("-w", "--workers", help="number of worker threads", type=int, default=1)
+    argParser.add_argument("-q", "--max_queued", help="maximum number of waiting jobs", type=int, default=16)
+    argParser.add_argument("-kj", "--keep_jobs", help="number of finished jobs kept with their files", type=int, default=DEFAULT_MAX_FINISHED_JOBS)
+    argParser.add_argument("-jt", "--job_ttl", help="hours a finished job and its files are kept", type=float, default=DEFAULT_FINISHED_JOB_TTL / 3600)
+    argParser.add_argument("-dem", "--dem_dir", help="correct the altitude with the SRTM .hgt tiles in this directory", required=False)
+    argParser.add_argument("-mt", "--map_tiles", help='read the OpenStreetMap map tiles from the local MBTiles file "abc.mbtiles"', required=False)
+    argParser.add_argument("-ot", "--overview_tiles", help='read the overview map tiles from the local MBTiles file "abc.mbtiles"', required=False)
+    argParser.add_argument("-if", "--image_format", help="re-encode the images: optimized (PNG palette, optimized JPEG) or webp", choices=IMAGE_FORMATS, default="original")
+    args = argParser.parse_args()
+
+    config = PublishConfig(DemDir=args.dem_dir, MapTilesFilename=args.map_tiles, OverviewTilesFilename=args.overview_tiles,
+                           ImageFormat=args.image_format)
+
+    RunPublishServer(args.host, args.port, args.upload_dir, args.workers, args.max_queued, config, args.keep_jobs, args.job_ttl * 3600)
@@ -0,0 +1,228 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import os
+import shutil
+import time
+from pathlib import Path
+from publish_queue import PublishWorkerPool
+
+try:
+    from inotify_simple import INotify, flags # type: ignore
+except ImportError:     # optional, the directory is polled without it
+    INotify = None
+
+####################################################################################
+### This module watches a directory, e.g. an inbox directory or the "Activity"
+### folder of a mounted GARMIN device, and publishes new FIT files automatically.
+###
+### The directory is watched with inotify if the package inotify_simple is
+### installed, otherwise it is polled. A file is only published after its size
+### and modification time did not change for some seconds, so partially copied
+### files are not read.
+####################################################################################
+
+class FitFileWatcher:
+    """ Finds new or changed FIT files in a directory. """
+
+    def __init__(self, directory : str, settleSeconds : float = 5.0, pollInterval : float = 10.0, skipExisting : bool = False) -> None:
+        """ Creates the watcher.
+
+        Args:
+            directory (str): The watched directory.
+            settleSeconds (float, optional): The time a file must not change before it is reported. Defaults to 5.
+            pollInterval (float, optional): The time between two scans of the directory in seconds. Defaults to 10.
+            skipExisting (bool, optional): Do not report files which are already in the directory. Defaults to False.
+        """
+        self.Directory = directory
+        self.SettleSeconds = settleSeconds
+        self.PollInterval = pollInterval
+
+        # reported files: path -> (size, modification time)
+        self.__reported : dict[str, tuple[int, int]] = {}
+
+        # changing files: path -> (size, modification time, time since unchanged)
+        self.__candidates : dict[str, tuple[int, int, float]] = {}
+
+        self.__lastScan = 0.0
+
+        self.__inotify = None
+        if INotify is not None:
+            self.__inotify = INotify()
+            self.__inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.MODIFY)
+
+        if skipExisting:
+            for path in self.__ListFitFiles():
+                stat = os.stat(path)
+                self.__reported[path] = (stat.st_size, stat.st_mtime_ns)
+
+    def __ListFitFiles(self) -> list[str]:
+        """ Returns all FIT files in the directory.
+
+        Returns:
+            list[str]: The file paths.
+        """
+        with os.scandir(self.Directory) as entries:
+            return [ entry.path for entry in entries if entry.is_file() and entry.name.lower().endswith(".fit") ]
+
+    def __AddCandidate(self, path : str, now : float) -> None:
+        """ Checks a file and remembers it if it is new or changed.
+
+        Args:
+            path (str): The file path.
+            now (float): The current time.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.__candidates.pop(path, None)
+            return
+
+        state = (stat.st_size, stat.st_mtime_ns)
+        if self.__reported.get(path) == state:
+            return
+
+        candidate = self.__candidates.get(path)
+        if candidate is None or candidate[:2] != state:
+            self.__candidates[path] = (state[0], state[1], now)
+
+    def WaitForNewFiles(self) -> list[str]:
+        """ Waits for changes in the directory and returns the files which did not change for the settle time.
+
+        Returns:
+            list[str]: The new or changed FIT files, may be empty.
+        """
+        changed : list[str] = []
+
+        if self.__inotify is not None:
+            for event in self.__inotify.read(timeout=1000):
+                if event.name.lower().endswith(".fit"):
+                    changed.append(os.path.join(self.Directory, event.name))
+        else:
+            time.sleep(min(1.0, self.PollInterval))
+
+        now = time.monotonic()
+
+        # scan the whole directory from time to time, inotify does not see changes made by a mounted device
+        if now - self.__lastScan >= self.PollInterval:
+            self.__lastScan = now
+            changed += self.__ListFitFiles()
+
+        for path in changed:
+            self.__AddCandidate(path, now)
+
+        # files that are still changing restart their settle time
+        for path in list(self.__candidates):
+            self.__AddCandidate(path, now)
+
+        ready : list[str] = []
+        for path, (size, mtime, since) in list(self.__candidates.items()):
+            if now - since >= self.SettleSeconds:
+                del self.__candidates[path]
+                self.__reported[path] = (size, mtime)
+                ready.append(path)
+
+        return sorted(ready)
+
+def CopyToOutputDir(fitFilepath : str, outputDir : str | None) -> str | None:
+    """ Copies a FIT file to the output directory, so the published files are not written to the watched directory.
+
+    Args:
+        fitFilepath (str): The FIT file.
+        outputDir (str | None): The output directory, None to publish in the watched directory.
+
+    Returns:
+        str | None: The FIT file to publish, None if this file was already published.
+    """
+    if outputDir is None:
+        target = Path(fitFilepath)
+    else:
+        target = Path(outputDir).joinpath(Path(fitFilepath).name)
+
+    published = Path(str(target.with_suffix("")) + "_published")
+
+    if published.is_dir() and target.exists() and target.stat().st_size == os.stat(fitFilepath).st_size:
+        print(f"{fitFilepath} was already published")
+        return None
+
+    if outputDir is not None:
+        Path(outputDir).mkdir(parents=True, exist_ok=True)
+        shutil.copy2(fitFilepath, target)
+
+    return str(target)
+
+def WatchAndPublish(inboxDir : str, outputDir : str | None = None,
+                    numWorkers : int = 1, maxQueuedJobs : int = 16,
+                    settleSeconds : float = 5.0, pollInterval : float = 10.0,
+                    skipExisting : bool = False) -> None:
+    """ Watches a directory and publishes each new FIT file until interrupted with Ctrl+C.
+
+    Args:
+        inboxDir (str): The watched directory.
+        outputDir (str | None, optional): The FIT files are copied to this directory and published there. Defaults to the watched directory.
+        numWorkers (int, optional): The number of worker threads. Defaults to 1.
+        maxQueuedJobs (int, optional): The maximum number of waiting jobs. Defaults to 16.
+        settleSeconds (float, optional): The time a file must not change before it is published. Defaults to 5.
+        pollInterval (float, optional): The time between two scans of the directory in seconds. Defaults to 10.
+        skipExisting (bool, optional): Do not publish files which are already in the directory. Defaults to False.
+    """
+    watcher = FitFileWatcher(inboxDir, settleSeconds, pollInterval, skipExisting)
+    pool = PublishWorkerPool(numWorkers, maxQueuedJobs)
+
+    print(f"watching {inboxDir} ({'inotify' if INotify is not None else 'polling'}), press Ctrl+C to stop")
+
+    try:
+        while True:
+            for fitFilepath in watcher.WaitForNewFiles():
+                target = CopyToOutputDir(fitFilepath, outputDir)
+                if target is not None:
+                    # waits while the queue is full
+                    job = pool.Submit(target)
+                    print(f"queued {target} (job {job.Id})")
+    except KeyboardInterrupt:
+        print("stopping, finishing queued jobs ...")
+    finally:
+        pool.Shutdown()
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("publish_watcher", description="Watches a directory and prepares each new FIT file for publishing.")
+    argParser.add_argument("directory", help="the watched directory, e.g. the Activity folder of the GARMIN device")
+    argParser.add_argument("-o", "--output_dir", help="copy the FIT files to this directory and publish them there", required=False)
+    argParser.add_argument("-w", "--workers", help="number of worker threads", type=int, default=1)
+    argParser.add_argument("-q", "--max_queued", help="maximum number of waiting jobs", type=int, default=16)
+    argParser.add_argument("-s", "--settle", help="seconds a file must not change before it is published", type=float, default=5.0)
+    argParser.add_argument("-p", "--poll_interval", help="seconds between two scans of the directory", type=float, default=10.0)
+    argParser.add_argument("-se", "--skip_existing", help="do not publish files which are already in the directory", action="store_true")
+    args = argParser.parse_args()
+
+    WatchAndPublish(args.directory, args.output_dir, args.workers, args.max_queued, args.settle, args.poll_interval, args.skip_existing)
@@ -0,0 +1,109 @@
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import struct
+from pathlib import Path
+from typing import Any
+from convert_fit_to_gpx import ReadFitFile, GetTrackPointsFromMessages, TrackPoint
+from fit_stream import FitRecordReader, CreateTrackPointFromRecord, IterFitTrackPoints
+
+####################################################################################
+### Tests of the incremental FIT reader (see fit_stream) against the Garmin SDK.
+####################################################################################
+
+class GrowingFile:
+    """ A file which is still being written: only the bytes written so far can be read. """
+
+    def __init__(self, data : bytes) -> None:
+        self.Data = data
+        self.Size = 0
+        self.__position = 0
+
+    def read(self, size : int = -1) -> bytes:
+        end = self.Size if size < 0 else min(self.__position + size, self.Size)
+        data = self.Data[self.__position : end]
+        self.__position = end
+        return data
+
+def __AssertSamePoints(points : list[TrackPoint], expectedPoints : list[TrackPoint]) -> None:
+    """ Compares the track points with the points decoded by the Garmin SDK. """
+    assert len(points) == len(expectedPoints)
+
+    for point, expected in zip(points, expectedPoints):
+        assert point.Latitude == expected.Latitude
+        assert point.Longitude == expected.Longitude
+        assert point.Altitude == expected.Altitude
+        assert point.Time == expected.Time
+
+def __ReadPieceByPiece(data : bytes, pieceSize : int) -> list[dict[str, Any]]:
+    """ Reads the records while the file grows by the piece size, so messages are cut at all positions. """
+    file = GrowingFile(data)
+    reader = FitRecordReader(file) # type: ignore
+    records : list[dict[str, Any]] = []
+
+    while file.Size < len(data):
+        file.Size = min(file.Size + pieceSize, len(data))
+        records += reader.ReadRecords()
+
+    return records
+
+def test_track_points_like_garmin_sdk(fit_file : Path) -> None:
+    """ The track points are the same as decoded by the Garmin SDK. """
+    expectedPoints = GetTrackPointsFromMessages(ReadFitFile(str(fit_file)))
+
+    __AssertSamePoints(list(IterFitTrackPoints(str(fit_file))), expectedPoints)
+
+def test_read_truncated_file(fit_file : Path) -> None:
+    """ A file read while it is written gives the same records as the complete file. """
+    data = fit_file.read_bytes()
+    with open(fit_file, "rb") as file:
+        expectedRecords = list(FitRecordReader(file).ReadRecords())
+
+    for pieceSize in (1, 7, 777, 4096):
+        assert __ReadPieceByPiece(data, pieceSize) == expectedRecords
+
+    expectedPoints = GetTrackPointsFromMessages(ReadFitFile(str(fit_file)))
+    points = [ CreateTrackPointFromRecord(record) for record in __ReadPieceByPiece(data, 13) ]
+    __AssertSamePoints([ point for point in points if point is not None ], expectedPoints)
+
+def test_chained_files(fit_file : Path, multi_session_fit_file : Path) -> None:
+    """ The records of chained FIT files are read one file after the other. """
+    data = fit_file.read_bytes() + multi_session_fit_file.read_bytes()
+    expectedPoints = GetTrackPointsFromMessages(ReadFitFile(str(fit_file))) + \
+        GetTrackPointsFromMessages(ReadFitFile(str(multi_session_fit_file)))
+
+    points = [ CreateTrackPointFromRecord(record) for record in __ReadPieceByPiece(data, 1000) ]
+    __AssertSamePoints([ point for point in points if point is not None ], expectedPoints)
+
+def test_header_without_data_size(fit_file : Path) -> None:
+    """ A device still recording writes the data size 0 to the header, the records are read up to the end. """
+    # the file is not finished yet, so it has no CRC at the end
+    data = bytearray(fit_file.read_bytes()[:-2])
+    struct.pack_into("<I", data, 4, 0)
+
+    expectedPoints = GetTrackPointsFromMessages(ReadFitFile(str(fit_file)))
+
+    points = [ CreateTrackPointFromRecord(record) for record in __ReadPieceByPiece(bytes(data), 4096) ]
+    __AssertSamePoints([ point for point in points if point is not None ], expectedPoints)
@@ -0,0 +1,100 @@
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+from pathlib import Path
+import pytest
+from convert_fit_to_gpx import ReadFitFile, IterTrackChunksFromMessages, CreateGpxTrackFromTrackPoints
+from gpx_statistic import TrackStatistic, CalculateTrackStatistic, MergeTrackStatistics
+from live_track_statistic import LiveTrackStatistic, TailFitFile, ReplayFitFile
+
+####################################################################################
+### Tests of the live statistic (see live_track_statistic) against the statistic
+### of the finished track calculated by gpxpy.
+####################################################################################
+
+STOPPED_SPEED_THRESHOLD = 0.15
+
+# the documented tolerance of the maximum speed
+MAX_SPEED_TOLERANCE = 0.01
+
+def __ReplayStatistic(fitFile : Path, tmpPath : Path) -> LiveTrackStatistic:
+    """ Replays the FIT file like a device recording the activity and reads it while it grows. """
+    liveFile = tmpPath / "live.fit"
+    statistic = LiveTrackStatistic(STOPPED_SPEED_THRESHOLD)
+
+    replay = ReplayFitFile(str(fitFile), str(liveFile), blockSize=1000, interval=0.005)
+    updates = sum(1 for _ in TailFitFile(str(liveFile), statistic, pollInterval=0.01, idleTimeout=0.5))
+    replay.join()
+
+    # the statistic was updated while the file was written, not only once at the end
+    assert updates > 1
+    return statistic
+
+def __ChunkStatistics(fitFile : Path) -> list[TrackStatistic]:
+    """ Returns the gpxpy statistic of each segment of the finished track. """
+    chunks = IterTrackChunksFromMessages(ReadFitFile(str(fitFile)))
+    return [ CalculateTrackStatistic(CreateGpxTrackFromTrackPoints(chunk), STOPPED_SPEED_THRESHOLD) for chunk in chunks ]
+
+def __AssertSameStatistic(statistic : TrackStatistic, expected : TrackStatistic) -> None:
+    """ Compares the live statistic with the gpxpy statistic, the maximum speed within the tolerance. """
+    assert statistic.PointCount == expected.PointCount
+    assert statistic.MovingDistance == pytest.approx(expected.MovingDistance)
+    assert statistic.MovingTime == pytest.approx(expected.MovingTime)
+    assert statistic.StoppedTime == pytest.approx(expected.StoppedTime)
+    assert statistic.MinElevation == pytest.approx(expected.MinElevation)
+    assert statistic.MaxElevation == pytest.approx(expected.MaxElevation)
+    assert statistic.Uphill == pytest.approx(expected.Uphill)
+    assert statistic.Downhill == pytest.approx(expected.Downhill)
+    assert statistic.MaxSpeed == pytest.approx(expected.MaxSpeed, rel=MAX_SPEED_TOLERANCE)
+
+def test_replayed_track(fit_file : Path, tmp_path : Path) -> None:
+    """ The statistic of a replayed track is the statistic of the finished track. """
+    statistic = __ReplayStatistic(fit_file, tmp_path)
+
+    assert statistic.SegmentCount == 1
+    __AssertSameStatistic(statistic.GetStatistic(), MergeTrackStatistics(__ChunkStatistics(fit_file)))
+
+def test_replayed_multi_session_track(multi_session_fit_file : Path, tmp_path : Path) -> None:
+    """ A track of several sessions has a segment per session, like the chunks of the finished track. """
+    statistic = __ReplayStatistic(multi_session_fit_file, tmp_path)
+    chunkStatistics = __ChunkStatistics(multi_session_fit_file)
+
+    assert len(chunkStatistics) == 2
+    assert statistic.SegmentCount == 2
+    __AssertSameStatistic(statistic.GetStatistic(), MergeTrackStatistics(chunkStatistics))
+
+def test_max_speed_per_segment(multi_session_fit_file : Path, tmp_path : Path) -> None:
+    """ The maximum speed of each segment is within the tolerance of the gpxpy value. """
+    chunks = list(IterTrackChunksFromMessages(ReadFitFile(str(multi_session_fit_file))))
+    statistic = LiveTrackStatistic(STOPPED_SPEED_THRESHOLD)
+    maxSpeed = 0.0
+
+    for chunk in chunks:
+        for point in chunk:
+            statistic.AddPoint(point)
+
+        expected = CalculateTrackStatistic(CreateGpxTrackFromTrackPoints(chunk), STOPPED_SPEED_THRESHOLD).MaxSpeed
+        maxSpeed = max(maxSpeed, expected)
+        assert statistic.MaxSpeed() == pytest.approx(maxSpeed, rel=MAX_SPEED_TOLERANCE)
@@ -0,0 +1,90 @@
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import math
+import numpy as np
+from track_tiles import GetTouchedTiles, TileStyle
+from map_tiles import TILE_SIZE
+
+####################################################################################
+### Tests of the tiles a track is drawn on (see track_tiles).
+####################################################################################
+
+def __TileToLatLon(x : float, y : float, zoom : int) -> tuple[float, float]:
+    """ Converts web mercator tile coordinates to latitude, longitude in degrees. """
+    n = 2.0 ** zoom
+    longitude = x / n * 360.0 - 180.0
+    latitude = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / n))))
+    return latitude, longitude
+
+def __SampledTiles(tileCoords : list[tuple[float, float]], zoom : int, padding : float) -> set[tuple[int, int, int]]:
+    """ Returns the tiles touched by densely sampled points of the track, widened by the padding. """
+    tiles : set[tuple[int, int, int]] = set()
+    for (x0, y0), (x1, y1) in zip(tileCoords, tileCoords[1:]):
+        for t in np.linspace(0.0, 1.0, 2000):
+            x, y = x0 + t * (x1 - x0), y0 + t * (y1 - y0)
+            for dx in (-padding, 0.0, padding):
+                for dy in (-padding, 0.0, padding):
+                    tiles.add((zoom, math.floor(x + dx), math.floor(y + dy)))
+    return tiles
+
+def test_segment_crossing_tile_corner() -> None:
+    """ A segment cutting the corner of a tile is also drawn on that tile. """
+    zoom = 10
+    points = [ __TileToLatLon(512.90, 340.12, zoom), __TileToLatLon(513.12, 339.90, zoom) ]
+
+    tiles = GetTouchedTiles(points, zoom, zoom, TileStyle())
+
+    assert (zoom, 513, 340) in tiles
+    assert { (zoom, 512, 340), (zoom, 513, 339) } <= tiles
+
+def test_touched_tiles_cover_sampled_track() -> None:
+    """ All tiles reached by the widened track are found, and only tiles near the track. """
+    rng = np.random.default_rng(1)
+    style = TileStyle(width=5)
+    padding = (style.Width / 2 + 1) / TILE_SIZE
+    zoom = 12
+
+    for _ in range(20):
+        tileCoords = [ (float(x), float(y)) for x, y in 1500.0 + np.cumsum(rng.normal(0.0, 1.5, (6, 2)), axis=0) ]
+        points = [ __TileToLatLon(x, y, zoom) for x, y in tileCoords ]
+
+        tiles = GetTouchedTiles(points, zoom, zoom, style)
+
+        assert __SampledTiles(tileCoords, zoom, padding) <= tiles
+
+        # each tile lies within the padding of the bounding box of a segment
+        for _, tileX, tileY in tiles:
+            assert any(min(x0, x1) - padding <= tileX + 1 and max(x0, x1) + padding >= tileX and
+                       min(y0, y1) - padding <= tileY + 1 and max(y0, y1) + padding >= tileY
+                       for (x0, y0), (x1, y1) in zip(tileCoords, tileCoords[1:]))
+
+def test_single_point_track() -> None:
+    """ A track of one point is drawn on the tile of the point on each zoom level. """
+    latitude, longitude = __TileToLatLon(100.5, 200.5, 9)
+
+    tiles = GetTouchedTiles([ (latitude, longitude) ], 8, 9, TileStyle())
+
+    assert tiles == { (8, 50, 100), (9, 100, 200) }
@@ -0,0 +1,304 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import gzip
+import io
+import shutil
+from pathlib import Path
+from typing import Iterable, TextIO
+from xml.sax.saxutils import escape
+import gpxpy
+from convert_fit_to_gpx import TrackPoint, ReadFitFile, IterTrackChunksFromMessages, IterTrackChunksFromGpx, DEFAULT_MAX_GAP_SECONDS
+
+####################################################################################
+### This module exports tracks in size optimized formats for the web: a compact
+### GPX file without indentation, GeoJSON and the Google encoded polyline.
+###
+### The number of decimal places is configurable, 6 decimal places of the
+### coordinates are about 0.1 m, more than the accuracy of GPS. The files are
+### written point by point, without building a document tree in memory, and can
+### be gzip compressed.
+####################################################################################
+
+EXPORT_FORMATS = {
+    "gpx" : ".gpx",
+    "geojson" : ".geojson",
+    "polyline" : ".polyline"
+}
+
+DEFAULT_COORDINATE_PRECISION = 6
+DEFAULT_ELEVATION_PRECISION = 1
+DEFAULT_POLYLINE_PRECISION = 5
+
+def __FormatNumber(value : float, precision : int) -> str:
+    """ Formats a number with a maximum number of decimal places and without trailing zeros.
+
+    Args:
+        value (float): The number.
+        precision (int): The maximum number of decimal places.
+
+    Returns:
+        str: The formatted number.
+    """
+    text = f"{value:.{precision}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    if text == "-0":
+        text = "0"
+    return text
+
+def __JsonString(text : str) -> str:
+    """ Returns a JSON string literal.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        str: The quoted and escaped text.
+    """
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"')
+    escaped = "".join(c if ord(c) >= 0x20 else f"\\u{ord(c):04x}" for c in escaped)
+    return f'"{escaped}"'
+
+def OpenExportFile(filename : str, compress : bool = False) -> TextIO:
+    """ Opens a text file for writing, optionally gzip compressed.
+    The compressed file does not contain a timestamp, so the same track always gives the same file.
+
+    Args:
+        filename (str): The name of the file.
+        compress (bool, optional): Gzip compress the file. Defaults to False.
+
+    Returns:
+        TextIO: The opened file.
+    """
+    if not compress:
+        return open(filename, "w", encoding="utf-8")
+
+    return io.TextIOWrapper(gzip.GzipFile(filename, "wb", compresslevel=9, mtime=0), encoding="utf-8")
+
+def CompressFile(filename : str) -> str:
+    """ Writes a gzip compressed copy of a file next to it, e.g. for web servers serving precompressed files.
+
+    Args:
+        filename (str): The name of the file.
+
+    Returns:
+        str: The name of the compressed file.
+    """
+    gzipFilename = filename + ".gz"
+
+    with open(filename, "rb") as source, gzip.GzipFile(gzipFilename, "wb", compresslevel=9, mtime=0) as target:
+        shutil.copyfileobj(source, target)
+
+    return gzipFilename
+
+def WriteCompactGpx(file : TextIO, name : str, trackType : str, segments : Iterable[list[TrackPoint]],
+                    coordinatePrecision : int = DEFAULT_COORDINATE_PRECISION,
+                    elevationPrecision : int = DEFAULT_ELEVATION_PRECISION) -> None:
+    """ Writes a GPX track without indentation.
+
+    Args:
+        file (TextIO): The output file.
+        name (str): The name of the track.
+        trackType (str): The type of the track activity, e.g. hiking.
+        segments (Iterable[list[TrackPoint]]): The track segments, each a list of track points.
+        coordinatePrecision (int, optional): The number of decimal places of latitude and longitude. Defaults to 6.
+        elevationPrecision (int, optional): The number of decimal places of the elevation. Defaults to 1.
+    """
+    file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    file.write('<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="track_export">')
+    file.write(f"<trk><name>{escape(name)}</name><type>{escape(trackType)}</type>")
+
+    for pointList in segments:
+        file.write("<trkseg>")
+
+        for point in pointList:
+            file.write(f'<trkpt lat="{__FormatNumber(point.Latitude, coordinatePrecision)}" lon="{__FormatNumber(point.Longitude, coordinatePrecision)}">')
+            if point.Altitude is not None:
+                file.write(f"<ele>{__FormatNumber(point.Altitude, elevationPrecision)}</ele>")
+            if point.Time is not None:
+                file.write(f"<time>{point.Time.strftime('%Y-%m-%dT%H:%M:%SZ')}</time>")
+            file.write("</trkpt>")
+
+        file.write("</trkseg>")
+
+    file.write("</trk></gpx>\n")
+
+def WriteGeoJson(file : TextIO, name : str, trackType : str, segments : Iterable[list[TrackPoint]],
+                 coordinatePrecision : int = DEFAULT_COORDINATE_PRECISION,
+                 elevationPrecision : int = DEFAULT_ELEVATION_PRECISION) -> None:
+    """ Writes the track as GeoJSON feature with a MultiLineString geometry, one line per segment.
+
+    Args:
+        file (TextIO): The output file.
+        name (str): The name of the track.
+        trackType (str): The type of the track activity, e.g. hiking.
+        segments (Iterable[list[TrackPoint]]): The track segments, each a list of track points.
+        coordinatePrecision (int, optional): The number of decimal places of latitude and longitude. Defaults to 6.
+        elevationPrecision (int, optional): The number of decimal places of the elevation. Defaults to 1.
+    """
+    file.write('{"type":"Feature","properties":{"name":')
+    file.write(__JsonString(name))
+    file.write(',"type":')
+    file.write(__JsonString(trackType))
+    file.write('},"geometry":{"type":"MultiLineString","coordinates":[')
+
+    firstSegment = True
+    for pointList in segments:
+        if not firstSegment:
+            file.write(",")
+        firstSegment = False
+
+        file.write("[")
+        firstPoint = True
+        for point in pointList:
+            if not firstPoint:
+                file.write(",")
+            firstPoint = False
+
+            # GeoJSON positions are longitude, latitude, elevation
+            file.write(f"[{__FormatNumber(point.Longitude, coordinatePrecision)},{__FormatNumber(point.Latitude, coordinatePrecision)}")
+            if point.Altitude is not None:
+                file.write(f",{__FormatNumber(point.Altitude, elevationPrecision)}")
+            file.write("]")
+        file.write("]")
+
+    file.write("]}}\n")
+
+def EncodePolyline(points : Iterable[tuple[float, float]], precision : int = DEFAULT_POLYLINE_PRECISION) -> str:
+    """ Encodes points with the Google encoded polyline algorithm.
+
+    Args:
+        points (Iterable[tuple[float, float]]): The points as latitude, longitude in degrees.
+        precision (int, optional): The number of decimal places, 5 for Google Maps, 6 for OSRM and Valhalla. Defaults to 5.
+
+    Returns:
+        str: The encoded polyline.
+    """
+    factor = 10 ** precision
+    chars : list[str] = []
+    previousLatitude = 0
+    previousLongitude = 0
+
+    for latitude, longitude in points:
+        lat = round(latitude * factor)
+        lon = round(longitude * factor)
+
+        for delta in (lat - previousLatitude, lon - previousLongitude):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chars.append(chr((0x20 | (value & 0x1F)) + 63))
+                value >>= 5
+            chars.append(chr(value + 63))
+
+        previousLatitude = lat
+        previousLongitude = lon
+
+    return "".join(chars)
+
+def WritePolyline(file : TextIO, segments : Iterable[list[TrackPoint]], precision : int = DEFAULT_POLYLINE_PRECISION) -> None:
+    """ Writes the track as Google encoded polyline, one line per segment. The elevation and time are not stored.
+
+    Args:
+        file (TextIO): The output file.
+        segments (Iterable[list[TrackPoint]]): The track segments, each a list of track points.
+        precision (int, optional): The number of decimal places. Defaults to 5.
+    """
+    for pointList in segments:
+        file.write(EncodePolyline(((p.Latitude, p.Longitude) for p in pointList), precision))
+        file.write("\n")
+
+def ExportTrack(filename : str, exportFormat : str, name : str, trackType : str, segments : Iterable[list[TrackPoint]],
+                coordinatePrecision : int = DEFAULT_COORDINATE_PRECISION,
+                elevationPrecision : int = DEFAULT_ELEVATION_PRECISION,
+                compress : bool = False) -> None:
+    """ Exports a track to a file.
+
+    Args:
+        filename (str): The name of the file.
+        exportFormat (str): The file format: gpx, geojson, polyline.
+        name (str): The name of the track.
+        trackType (str): The type of the track activity, e.g. hiking.
+        segments (Iterable[list[TrackPoint]]): The track segments, each a list of track points.
+        coordinatePrecision (int, optional): The number of decimal places of latitude and longitude,
+            the polyline uses at most 5 decimal places. Defaults to 6.
+        elevationPrecision (int, optional): The number of decimal places of the elevation. Defaults to 1.
+        compress (bool, optional): Gzip compress the file. Defaults to False.
+    """
+    if exportFormat not in EXPORT_FORMATS:
+        raise Exception(f"unknown export format {exportFormat}")
+
+    with OpenExportFile(filename, compress) as file:
+        if exportFormat == "gpx":
+            WriteCompactGpx(file, name, trackType, segments, coordinatePrecision, elevationPrecision)
+        elif exportFormat == "geojson":
+            WriteGeoJson(file, name, trackType, segments, coordinatePrecision, elevationPrecision)
+        else:
+            WritePolyline(file, segments, min(coordinatePrecision, DEFAULT_POLYLINE_PRECISION))
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("track_export", description="Exports a track as compact GPX, GeoJSON or encoded polyline.")
+    argParser.add_argument("filename", help='input filename "abc.FIT" or "abc.GPX"')
+    argParser.add_argument("-f", "--format", help="output format", choices=list(EXPORT_FORMATS), default="gpx")
+    argParser.add_argument("-o", "--output", help="output filename", required=False)
+    argParser.add_argument("-p", "--precision", help="decimal places of the coordinates", type=int, default=DEFAULT_COORDINATE_PRECISION)
+    argParser.add_argument("-ep", "--elevation_precision", help="decimal places of the elevation", type=int, default=DEFAULT_ELEVATION_PRECISION)
+    argParser.add_argument("-z", "--gzip", help="gzip compress the output file", action="store_true")
+    argParser.add_argument("-s", "--split", help="split a FIT track into segments at sessions and long time gaps", action="store_true")
+    args = argParser.parse_args()
+
+    inputFilename : str = args.filename
+    name = Path(inputFilename).stem
+
+    if Path(inputFilename).suffix.lower() == ".gpx":
+        with open(inputFilename, "r") as file:
+            gpx = gpxpy.parse(file)
+        trackType = gpx.tracks[0].type if gpx.tracks and gpx.tracks[0].type else ""
+        segments = IterTrackChunksFromGpx(gpx)
+    else:
+        messages = ReadFitFile(inputFilename)
+        trackType = messages["sport_mesgs"][0]["sport"] if messages.get("sport_mesgs") else ""
+        segments = IterTrackChunksFromMessages(messages, DEFAULT_MAX_GAP_SECONDS if args.split else float("inf"))
+
+    outputFilename = args.output
+    if outputFilename is None:
+        outputFilename = str(Path(inputFilename).with_suffix(EXPORT_FORMATS[args.format]))
+        if args.gzip:
+            outputFilename += ".gz"
+
+    print(f"Export {inputFilename} to {outputFilename} ...")
+
+    ExportTrack(outputFilename, args.format, name, str(trackType), segments, args.precision, args.elevation_precision, args.gzip)
+
+    print(f"File size: {Path(outputFilename).stat().st_size} bytes")
+    print("done")
@@ -0,0 +1,467 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import math
+import sqlite3
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator
+from convert_fit_to_gpx import ReadFitFile, GetTrackPointsFromMessages
+from activity_archive import OpenArchive
+
+####################################################################################
+### This module adds a spatial index to the activity archive. The simplified
+### track of each activity is split into chunks of a few points and the bounding
+### box of each chunk is stored in a SQLite R-tree. Queries look up the candidate
+### chunks in the R-tree and check the track segments of the candidates exactly.
+####################################################################################
+
+__SCHEMA = """
+CREATE TABLE IF NOT EXISTS track_geometry (
+    activity_id INTEGER PRIMARY KEY REFERENCES activities (id),
+    points BLOB NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS track_rtree USING rtree (
+    id,
+    min_latitude, max_latitude,
+    min_longitude, max_longitude,
+    +activity_id INTEGER,
+    +first_point INTEGER,
+    +last_point INTEGER
+);
+"""
+
+EARTH_RADIUS = 6371000.0
+
+DEFAULT_TOLERANCE = 10.0
+DEFAULT_CHUNK_SIZE = 32
+
+def OpenTrackIndex(dbFilename : str) -> sqlite3.Connection:
+    """ Opens the archive database and creates the tables of the spatial index if needed.
+
+    Args:
+        dbFilename (str): The name of the SQLite database file.
+
+    Returns:
+        sqlite3.Connection: The database connection.
+    """
+    db = OpenArchive(dbFilename)
+    db.executescript(__SCHEMA)
+    return db
+
+def __ToMeters(latitude : float, longitude : float, refLatitude : float, refLongitude : float) -> tuple[float, float]:
+    """ Projects a position to a local plane around a reference position.
+
+    Args:
+        latitude (float): The latitude in degrees.
+        longitude (float): The longitude in degrees.
+        refLatitude (float): The reference latitude in degrees.
+        refLongitude (float): The reference longitude in degrees.
+
+    Returns:
+        tuple[float, float]: The x and y coordinate in meters.
+    """
+    x = math.radians(longitude - refLongitude) * EARTH_RADIUS * math.cos(math.radians(refLatitude))
+    y = math.radians(latitude - refLatitude) * EARTH_RADIUS
+    return x, y
+
+def __SegmentDistance(px : float, py : float, ax : float, ay : float, bx : float, by : float) -> float:
+    """ Calculates the distance between a point and a line segment in the plane.
+
+    Returns:
+        float: The distance.
+    """
+    dx = bx - ax
+    dy = by - ay
+    length2 = dx * dx + dy * dy
+
+    t = ((px - ax) * dx + (py - ay) * dy) / length2 if length2 > 0 else 0.0
+    t = min(max(t, 0.0), 1.0)
+
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+def SimplifyTrack(points : list[tuple[float, float]], tolerance : float) -> list[tuple[float, float]]:
+    """ Simplifies a track with the Douglas-Peucker algorithm.
+
+    Args:
+        points (list[tuple[float, float]]): The track points as latitude, longitude in degrees.
+        tolerance (float): The maximum distance of the simplified track from the original track in meters.
+
+    Returns:
+        list[tuple[float, float]]: The simplified track.
+    """
+    if len(points) < 3:
+        return list(points)
+
+    refLatitude, refLongitude = points[0]
+    xy = [ __ToMeters(lat, lon, refLatitude, refLongitude) for lat, lon in points ]
+
+    keep = [ False ] * len(points)
+    keep[0] = keep[-1] = True
+
+    stack = [ (0, len(points) - 1) ]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xy[first]
+        bx, by = xy[last]
+
+        maxDistance = -1.0
+        maxIdx = first
+        for idx in range(first + 1, last):
+            distance = __SegmentDistance(xy[idx][0], xy[idx][1], ax, ay, bx, by)
+            if distance > maxDistance:
+                maxDistance = distance
+                maxIdx = idx
+
+        if maxDistance > tolerance:
+            keep[maxIdx] = True
+            stack.append((first, maxIdx))
+            stack.append((maxIdx, last))
+
+    return [ p for p, k in zip(points, keep) if k ]
+
+def EncodeGeometry(points : list[tuple[float, float]]) -> bytes:
+    """ Packs the track points for storing them in the database.
+
+    Args:
+        points (list[tuple[float, float]]): The track points as latitude, longitude in degrees.
+
+    Returns:
+        bytes: The packed track points.
+    """
+    data = array("d")
+    for lat, lon in points:
+        data.append(lat)
+        data.append(lon)
+    return data.tobytes()
+
+def DecodeGeometry(blob : bytes) -> list[tuple[float, float]]:
+    """ Unpacks the track points stored in the database.
+
+    Args:
+        blob (bytes): The packed track points.
+
+    Returns:
+        list[tuple[float, float]]: The track points as latitude, longitude in degrees.
+    """
+    data = array("d")
+    data.frombytes(blob)
+    return list(zip(data[0::2], data[1::2]))
+
+def __ReadSimplifiedTrack(fitFilename : str, tolerance : float) -> bytes:
+    """ Reads the track from a FIT file and simplifies it.
+
+    Args:
+        fitFilename (str): The name of the FIT file.
+        tolerance (float): The simplification tolerance in meters.
+
+    Returns:
+        bytes: The packed simplified track.
+    """
+    pointList = GetTrackPointsFromMessages(ReadFitFile(fitFilename))
+    points = [ (p.Latitude, p.Longitude) for p in pointList ]
+    return EncodeGeometry(SimplifyTrack(points, tolerance))
+
+def AddTrackGeometry(db : sqlite3.Connection, activityId : int, points : list[tuple[float, float]],
+                     chunkSize : int = DEFAULT_CHUNK_SIZE) -> None:
+    """ Stores the simplified track of an activity and adds it to the spatial index.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        activityId (int): The ID of the activity.
+        points (list[tuple[float, float]]): The simplified track points as latitude, longitude in degrees.
+        chunkSize (int, optional): The number of track segments per R-tree entry. Defaults to 32.
+    """
+    db.execute("INSERT OR REPLACE INTO track_geometry (activity_id, points) VALUES (?, ?)", (activityId, EncodeGeometry(points)))
+    db.execute("DELETE FROM track_rtree WHERE activity_id = ?", (activityId,))
+
+    # consecutive chunks share their end point, so every segment belongs to a chunk
+    rows : list[tuple[float, float, float, float, int, int, int]] = []
+    for first in range(0, max(len(points) - 1, 1), chunkSize):
+        last = min(first + chunkSize, len(points) - 1)
+        chunk = points[first : last + 1]
+        lats = [ p[0] for p in chunk ]
+        lons = [ p[1] for p in chunk ]
+        rows.append((min(lats), max(lats), min(lons), max(lons), activityId, first, last))
+
+    db.executemany("""INSERT INTO track_rtree (min_latitude, max_latitude, min_longitude, max_longitude, activity_id, first_point, last_point)
+                      VALUES (?, ?, ?, ?, ?, ?, ?)""", rows)
+
+def BuildTrackIndex(db : sqlite3.Connection, maxWorkers : int | None = None,
+                    tolerance : float = DEFAULT_TOLERANCE, chunkSize : int = DEFAULT_CHUNK_SIZE) -> int:
+    """ Adds all archived activities which are not yet in the spatial index.
+    The FIT files are read in parallel.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        maxWorkers (int | None, optional): The number of worker processes. Defaults to the number of CPUs.
+        tolerance (float, optional): The simplification tolerance in meters. Defaults to 10.
+        chunkSize (int, optional): The number of track segments per R-tree entry. Defaults to 32.
+
+    Returns:
+        int: The number of added activities.
+    """
+    missing = db.execute("""SELECT id, filename FROM activities
+                            WHERE point_count > 0 AND id NOT IN (SELECT activity_id FROM track_geometry)""").fetchall()
+
+    print(f"{len(missing)} activities to index")
+
+    added = 0
+    with ProcessPoolExecutor(maxWorkers) as pool:
+        futures = { pool.submit(__ReadSimplifiedTrack, filename, tolerance) : (activityId, filename) for activityId, filename in missing }
+
+        for future in as_completed(futures):
+            activityId, filename = futures[future]
+            try:
+                blob = future.result()
+            except Exception as e:
+                print(f"ERROR: {filename}: {e}")
+                continue
+
+            AddTrackGeometry(db, activityId, DecodeGeometry(blob), chunkSize)
+            added += 1
+
+            if added % 100 == 0:
+                db.commit()
+
+    db.commit()
+    return added
+
+def GetTrackGeometry(db : sqlite3.Connection, activityId : int) -> list[tuple[float, float]]:
+    """ Returns the simplified track of an activity.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        activityId (int): The ID of the activity.
+
+    Returns:
+        list[tuple[float, float]]: The track points as latitude, longitude in degrees, empty if not indexed.
+    """
+    row = db.execute("SELECT points FROM track_geometry WHERE activity_id = ?", (activityId,)).fetchone()
+    return DecodeGeometry(row[0]) if row is not None else []
+
+def __ActivityFilter(year : str | None, sport : str | None) -> tuple[str, list[str]]:
+    """ Returns the SQL condition selecting the activities of a year and sport, the activities table is "a".
+
+    Args:
+        year (str | None): Only activities of this year, e.g. 2025. None for all years.
+        sport (str | None): Only activities of this sport, e.g. hiking. None for all activities.
+
+    Returns:
+        tuple[str, list[str]]: The SQL condition and its parameters.
+    """
+    condition = ""
+    parameters : list[str] = []
+
+    if year is not None:
+        condition += " AND strftime('%Y', a.start_time) = ?"
+        parameters.append(str(year))
+    if sport is not None:
+        condition += " AND a.sport = ?"
+        parameters.append(sport)
+
+    return condition, parameters
+
+def IterTrackGeometries(db : sqlite3.Connection, year : str | None = None, sport : str | None = None) -> Iterator[tuple[int, list[tuple[float, float]]]]:
+    """ Iterates over the simplified tracks of the indexed activities.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        year (str | None, optional): Only activities of this year, e.g. 2025. Defaults to all years.
+        sport (str | None, optional): Only activities of this sport, e.g. hiking. Defaults to all activities.
+
+    Yields:
+        tuple[int, list[tuple[float, float]]]: The activity ID and the track points as latitude, longitude in degrees.
+    """
+    condition, parameters = __ActivityFilter(year, sport)
+    query = "SELECT g.activity_id, g.points FROM track_geometry g JOIN activities a ON a.id = g.activity_id WHERE 1" + condition
+
+    for activityId, blob in db.execute(query + " ORDER BY g.activity_id", parameters):
+        yield activityId, DecodeGeometry(blob)
+
+def GetTrackExtent(db : sqlite3.Connection, year : str | None = None, sport : str | None = None) -> tuple[float, float, float, float] | None:
+    """ Returns the bounding box of the indexed activities, read from the R-tree without decoding the tracks.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        year (str | None, optional): Only activities of this year, e.g. 2025. Defaults to all years.
+        sport (str | None, optional): Only activities of this sport, e.g. hiking. Defaults to all activities.
+
+    Returns:
+        tuple[float, float, float, float] | None: The minimum longitude, minimum latitude, maximum longitude and maximum latitude
+            in degrees, None if no activity is indexed.
+    """
+    condition, parameters = __ActivityFilter(year, sport)
+    row = db.execute("""SELECT MIN(r.min_longitude), MIN(r.min_latitude), MAX(r.max_longitude), MAX(r.max_latitude)
+                        FROM track_rtree r JOIN activities a ON a.id = r.activity_id WHERE 1""" + condition, parameters).fetchone()
+
+    return None if row is None or row[0] is None else (row[0], row[1], row[2], row[3])
+
+def __QueryCandidates(db : sqlite3.Connection, minLatitude : float, minLongitude : float,
+                      maxLatitude : float, maxLongitude : float) -> dict[int, list[tuple[int, int]]]:
+    """ Looks up the track chunks whose bounding box intersects the query box.
+
+    Returns:
+        dict[int, list[tuple[int, int]]]: Per activity ID the first and last point of the candidate chunks.
+    """
+    candidates : dict[int, list[tuple[int, int]]] = {}
+
+    rows = db.execute("""SELECT activity_id, first_point, last_point FROM track_rtree
+                         WHERE max_latitude >= ? AND min_latitude <= ? AND max_longitude >= ? AND min_longitude <= ?""",
+                      (minLatitude, maxLatitude, minLongitude, maxLongitude))
+
+    for activityId, first, last in rows:
+        candidates.setdefault(activityId, []).append((first, last))
+
+    return candidates
+
+def __SegmentIntersectsBox(a : tuple[float, float], b : tuple[float, float],
+                           minLatitude : float, minLongitude : float, maxLatitude : float, maxLongitude : float) -> bool:
+    """ Checks if a track segment intersects a bounding box (Liang-Barsky clipping).
+
+    Returns:
+        bool: True if the segment intersects the box.
+    """
+    t0, t1 = 0.0, 1.0
+    dLat = b[0] - a[0]
+    dLon = b[1] - a[1]
+
+    for p, q in ((-dLat, a[0] - minLatitude), (dLat, maxLatitude - a[0]), (-dLon, a[1] - minLongitude), (dLon, maxLongitude - a[1])):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                return False
+
+    return True
+
+def QueryBoundingBox(db : sqlite3.Connection, minLatitude : float, minLongitude : float,
+                     maxLatitude : float, maxLongitude : float) -> list[int]:
+    """ Returns all activities whose track passes through a bounding box.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        minLatitude (float): The southern border in degrees.
+        minLongitude (float): The western border in degrees.
+        maxLatitude (float): The northern border in degrees.
+        maxLongitude (float): The eastern border in degrees.
+
+    Returns:
+        list[int]: The activity IDs.
+    """
+    result : list[int] = []
+
+    for activityId, chunks in __QueryCandidates(db, minLatitude, minLongitude, maxLatitude, maxLongitude).items():
+        points = GetTrackGeometry(db, activityId)
+
+        if any(__SegmentIntersectsBox(points[idx], points[min(idx + 1, last)], minLatitude, minLongitude, maxLatitude, maxLongitude)
+               for first, last in chunks for idx in range(first, max(last, first + 1))):
+            result.append(activityId)
+
+    return sorted(result)
+
+def QueryNearPoint(db : sqlite3.Connection, latitude : float, longitude : float, radius : float) -> list[int]:
+    """ Returns all activities whose track passes within a distance of a position.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        latitude (float): The latitude in degrees.
+        longitude (float): The longitude in degrees.
+        radius (float): The maximum distance in meters.
+
+    Returns:
+        list[int]: The activity IDs.
+    """
+    dLat = math.degrees(radius / EARTH_RADIUS)
+    dLon = math.degrees(radius / (EARTH_RADIUS * max(math.cos(math.radians(latitude)), 1e-6)))
+
+    result : list[int] = []
+
+    for activityId, chunks in __QueryCandidates(db, latitude - dLat, longitude - dLon, latitude + dLat, longitude + dLon).items():
+        points = GetTrackGeometry(db, activityId)
+
+        for first, last in chunks:
+            xy = [ __ToMeters(lat, lon, latitude, longitude) for lat, lon in points[first : last + 1] ]
+            if len(xy) == 1:
+                xy.append(xy[0])
+
+            if any(__SegmentDistance(0.0, 0.0, xy[idx][0], xy[idx][1], xy[idx + 1][0], xy[idx + 1][1]) <= radius
+                   for idx in range(len(xy) - 1)):
+                result.append(activityId)
+                break
+
+    return sorted(result)
+
+def __PrintActivities(db : sqlite3.Connection, activityIds : list[int]) -> None:
+    """ Prints the start time and the name of activities.
+
+    Args:
+        db (sqlite3.Connection): The archive database.
+        activityIds (list[int]): The activity IDs.
+    """
+    for activityId in activityIds:
+        startTime, name, filename = db.execute("SELECT start_time, name, filename FROM activities WHERE id = ?", (activityId,)).fetchone()
+        print(f"{startTime}  {name}  ({filename})")
+
+    print(f"{len(activityIds)} activities")
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("track_index", description="Finds the archived activities passing through an area.")
+    argParser.add_argument("archive", help='archive filename "abc.sqlite" (see activity_archive)')
+    argParser.add_argument("-b", "--build", help="add the archived activities to the spatial index", action="store_true")
+    argParser.add_argument("-bb", "--bbox", help="find activities passing through a bounding box", nargs=4, metavar=("MIN_LAT", "MIN_LON", "MAX_LAT", "MAX_LON"), required=False)
+    argParser.add_argument("-n", "--near", help="find activities passing within a distance of a position", nargs=3, metavar=("LAT", "LON", "METERS"), required=False)
+    argParser.add_argument("-w", "--workers", help="number of worker processes", required=False)
+    args = argParser.parse_args()
+
+    archive = OpenTrackIndex(args.archive)
+
+    if args.build:
+        added = BuildTrackIndex(archive, int(args.workers) if args.workers is not None else None)
+        print(f"{added} activities added to the spatial index")
+
+    if args.bbox is not None:
+        minLat, minLon, maxLat, maxLon = (float(v) for v in args.bbox)
+        __PrintActivities(archive, QueryBoundingBox(archive, minLat, minLon, maxLat, maxLon))
+
+    if args.near is not None:
+        lat, lon, meters = (float(v) for v in args.near)
+        __PrintActivities(archive, QueryNearPoint(archive, lat, lon, meters))
+
+    archive.close()
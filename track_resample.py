@@ -0,0 +1,104 @@
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import numpy as np
+
+####################################################################################
+### This module resamples a track onto a uniform time grid or a uniform distance
+### grid. Position, altitude and time are interpolated linearly with NumPy.
+###
+### Devices record every second, with "smart recording" or with gaps, so the
+### number of points of the same hike differs a lot. After resampling the later
+### stages (smoothing, statistic, altitude profile) get a predictable number of
+### points and give comparable results for all devices.
+###
+### The functions work on columns of values, see convert_fit_to_gpx for
+### resampling lists of track points.
+####################################################################################
+
+RESAMPLE_MODES = [ "time", "distance" ]
+
+DEFAULT_RESAMPLE_STEPS = {
+    "time" : 5.0,
+    "distance" : 10.0
+}
+
+EARTH_RADIUS = 6371000.0
+
+def CumulativeDistance(latitude : np.ndarray, longitude : np.ndarray) -> np.ndarray:
+    """ Calculates the distance along a track (haversine formula).
+
+    Args:
+        latitude (np.ndarray): The latitudes in degrees.
+        longitude (np.ndarray): The longitudes in degrees.
+
+    Returns:
+        np.ndarray: The distance from the first point to each point in meters.
+    """
+    lat = np.radians(latitude)
+    lon = np.radians(longitude)
+
+    a = np.sin(np.diff(lat) / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    distance = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    return np.concatenate(([ 0.0 ], np.cumsum(distance)))
+
+def ResampleColumns(time : np.ndarray, latitude : np.ndarray, longitude : np.ndarray, altitude : np.ndarray,
+                    mode : str, step : float | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Resamples a track segment onto a uniform time or distance grid.
+    The first and the last point are kept.
+
+    Args:
+        time (np.ndarray): The time of the points in seconds, increasing.
+        latitude (np.ndarray): The latitudes in degrees.
+        longitude (np.ndarray): The longitudes in degrees.
+        altitude (np.ndarray): The altitudes in meters.
+        mode (str): The grid: time or distance, see RESAMPLE_MODES.
+        step (float | None, optional): The grid step in seconds or meters. Defaults to 5 s or 10 m.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The resampled time, latitude, longitude and altitude.
+    """
+    if mode not in DEFAULT_RESAMPLE_STEPS:
+        raise Exception(f"unknown resample mode: {mode}")
+
+    if step is None:
+        step = DEFAULT_RESAMPLE_STEPS[mode]
+    if step <= 0:
+        raise Exception(f"invalid resample step: {step}")
+
+    position = time if mode == "time" else CumulativeDistance(latitude, longitude)
+
+    # np.interp needs increasing positions: points with the same time, or without movement, are dropped
+    keep = np.diff(position, prepend=-np.inf) > 0
+    position, time, latitude, longitude, altitude = position[keep], time[keep], latitude[keep], longitude[keep], altitude[keep]
+
+    if len(position) < 2:
+        return time, latitude, longitude, altitude
+
+    grid = np.append(np.arange(position[0], position[-1], step), position[-1])
+
+    return (np.interp(grid, position, time), np.interp(grid, position, latitude),
+            np.interp(grid, position, longitude), np.interp(grid, position, altitude))
@@ -0,0 +1,324 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+from datetime import datetime
+from typing import Any
+import gpxpy
+import gpxpy.gpx
+import numpy as np
+from convert_fit_to_gpx import ReadFitFile, CreateGpxTrackFromFitActivity
+from gpx_statistic import TimespanToHoursMinutesSeconds
+
+####################################################################################
+### This module calculates splits of a track, e.g. one per kilometer, and the
+### statistic of the laps recorded in the FIT file.
+###
+### The cumulative distance, time, ascent and descent of the track are calculated
+### once. The values at the split boundaries are found by binary search and linear
+### interpolation, so each split costs O(log n) instead of a scan over its points.
+### Gaps between the track segments add neither distance nor time.
+####################################################################################
+
+EARTH_RADIUS = 6371000.0
+
+DEFAULT_SPLIT_DISTANCE = 1000.0
+
+class TrackProfile:
+    """ The cumulative values of a track, one entry per track point. """
+
+    Time : np.ndarray
+    """ The timestamp in seconds since 1970-01-01 UTC. """
+
+    Distance : np.ndarray
+    """ The distance from the start in meters. """
+
+    Duration : np.ndarray
+    """ The time since the start in seconds, without the gaps between the segments. """
+
+    Ascent : np.ndarray
+    """ The ascent since the start in meters. """
+
+    Descent : np.ndarray
+    """ The descent since the start in meters. """
+
+class TrackSplit:
+    """ The statistic of a part of a track. """
+
+    Name : str
+    """ The name of the split, e.g. the kilometer or lap number. """
+
+    Distance : float
+    """ The distance in meters. """
+
+    Time : float
+    """ The time in seconds. """
+
+    Ascent : float
+    """ The ascent in meters. """
+
+    Descent : float
+    """ The descent in meters. """
+
+    def Pace(self) -> float:
+        """ Returns the pace.
+
+        Returns:
+            float: The pace in seconds per kilometer.
+        """
+        return self.Time / self.Distance * 1000 if self.Distance > 0 else 0.0
+
+def CreateTrackProfile(gpx : gpxpy.gpx.GPX) -> TrackProfile:
+    """ Calculates the cumulative distance, time, ascent and descent of a track.
+
+    Args:
+        gpx (gpxpy.gpx.GPX): The track, all points need time and elevation.
+
+    Returns:
+        TrackProfile: The cumulative values.
+    """
+    points = [ (p.latitude, p.longitude, p.elevation, p.time.timestamp(), segmentIdx)
+               for track in gpx.tracks for segmentIdx, segment in enumerate(track.segments) for p in segment.points
+               if p.time is not None and p.elevation is not None ]
+
+    values = np.array(points, dtype=np.float64).reshape(-1, 5)
+    latitude = np.radians(values[:, 0])
+    longitude = np.radians(values[:, 1])
+    elevation = values[:, 2]
+    time = values[:, 3]
+
+    # no distance and time between the last point of a segment and the first point of the next segment
+    sameSegment = np.diff(values[:, 4]) == 0
+
+    climb = np.diff(elevation) * sameSegment
+
+    # haversine distance between neighbouring points, including the elevation difference like the track statistic
+    a = (np.sin(np.diff(latitude) / 2) ** 2
+         + np.cos(latitude[:-1]) * np.cos(latitude[1:]) * np.sin(np.diff(longitude) / 2) ** 2)
+    distance = np.hypot(2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1))), climb) * sameSegment
+
+    profile = TrackProfile()
+    profile.Time = time
+    profile.Distance = np.concatenate(([ 0.0 ], np.cumsum(distance)))
+    profile.Duration = np.concatenate(([ 0.0 ], np.cumsum(np.diff(time) * sameSegment)))
+    profile.Ascent = np.concatenate(([ 0.0 ], np.cumsum(np.maximum(climb, 0))))
+    profile.Descent = np.concatenate(([ 0.0 ], np.cumsum(np.maximum(-climb, 0))))
+
+    return profile
+
+def __Interpolate(position : np.ndarray, positions : np.ndarray, values : np.ndarray) -> np.ndarray:
+    """ Interpolates cumulative values at many positions with binary search.
+
+    Args:
+        position (np.ndarray): The positions to look up, e.g. distances.
+        positions (np.ndarray): The non-decreasing positions of the track points.
+        values (np.ndarray): The values of the track points.
+
+    Returns:
+        np.ndarray: The interpolated values.
+    """
+    idx = np.clip(np.searchsorted(positions, position, side="left"), 1, len(positions) - 1)
+
+    start = positions[idx - 1]
+    length = positions[idx] - start
+    fraction = np.divide(position - start, length, out=np.zeros(len(idx)), where=length > 0)
+    fraction = np.clip(fraction, 0, 1)
+
+    return values[idx - 1] + (values[idx] - values[idx - 1]) * fraction
+
+def __CreateSplits(names : list[str], startIdx : np.ndarray, endIdx : np.ndarray,
+                   positions : np.ndarray, profile : TrackProfile) -> list[TrackSplit]:
+    """ Creates the splits between start and end positions.
+
+    Args:
+        names (list[str]): The split names.
+        startIdx (np.ndarray): The start positions.
+        endIdx (np.ndarray): The end positions.
+        positions (np.ndarray): The profile column the positions refer to.
+        profile (TrackProfile): The track profile.
+
+    Returns:
+        list[TrackSplit]: The splits.
+    """
+    columns = [ profile.Distance, profile.Duration, profile.Ascent, profile.Descent ]
+    bounds = np.concatenate((startIdx, endIdx))
+
+    interpolated = [ __Interpolate(bounds, positions, column) for column in columns ]
+    count = len(names)
+
+    splits : list[TrackSplit] = []
+    for idx, name in enumerate(names):
+        split = TrackSplit()
+        split.Name = name
+        split.Distance, split.Time, split.Ascent, split.Descent = [ float(values[count + idx] - values[idx]) for values in interpolated ]
+        splits.append(split)
+
+    return splits
+
+def CalculateDistanceSplits(profile : TrackProfile, splitDistance : float = DEFAULT_SPLIT_DISTANCE) -> list[TrackSplit]:
+    """ Splits the track into parts of the same distance, the last part is shorter.
+
+    Args:
+        profile (TrackProfile): The track profile.
+        splitDistance (float, optional): The distance of a split in meters. Defaults to 1000.
+
+    Returns:
+        list[TrackSplit]: The splits.
+    """
+    if len(profile.Distance) < 2 or splitDistance <= 0:
+        return []
+
+    totalDistance = float(profile.Distance[-1])
+    marks = np.arange(0.0, totalDistance, splitDistance)
+    marks = np.append(marks, totalDistance)
+
+    # skip a last split shorter than 1 m
+    if len(marks) > 2 and marks[-1] - marks[-2] < 1.0:
+        marks = np.delete(marks, -2)
+
+    names = [ f"{end / 1000:.1f}" if end % 1000 else f"{int(end // 1000)}" for end in marks[1:] ]
+
+    return __CreateSplits(names, marks[:-1], marks[1:], profile.Distance, profile)
+
+def GetLapTimes(messages : dict[str, list[Any]]) -> list[tuple[datetime, datetime]]:
+    """ Returns the start and end time of the laps recorded in the FIT file.
+
+    Args:
+        messages (dict[str, list[Any]]): The FIT file messages.
+
+    Returns:
+        list[tuple[datetime, datetime]]: The start and end time of each lap.
+    """
+    laps : list[tuple[datetime, datetime]] = []
+
+    for msg in messages.get("lap_mesgs", []):
+        if "start_time" in msg and "timestamp" in msg:
+            laps.append((msg["start_time"], msg["timestamp"]))
+
+    return laps
+
+def CalculateLapSplits(profile : TrackProfile, laps : list[tuple[datetime, datetime]]) -> list[TrackSplit]:
+    """ Calculates the statistic of the laps.
+
+    Args:
+        profile (TrackProfile): The track profile.
+        laps (list[tuple[datetime, datetime]]): The start and end time of each lap.
+
+    Returns:
+        list[TrackSplit]: The splits, one per lap.
+    """
+    if len(profile.Time) < 2 or not laps:
+        return []
+
+    start = np.array([ lap[0].timestamp() for lap in laps ])
+    end = np.array([ lap[1].timestamp() for lap in laps ])
+
+    # laps outside of the track, e.g. removed points
+    inside = (end > profile.Time[0]) & (start < profile.Time[-1])
+    names = [ str(idx + 1) for idx in np.flatnonzero(inside) ]
+
+    return __CreateSplits(names, start[inside], end[inside], profile.Time, profile)
+
+def FormatPace(secondsPerKilometer : float) -> str:
+    """ Formats a pace as minutes and seconds.
+
+    Args:
+        secondsPerKilometer (float): The pace in seconds per kilometer.
+
+    Returns:
+        str: The pace, e.g. "12:05".
+    """
+    seconds = int(round(secondsPerKilometer))
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+def FormatSplitsAsHtml(splits : list[TrackSplit], title : str) -> str:
+    """ Creates a HTML table with the splits.
+
+    Args:
+        splits (list[TrackSplit]): The splits.
+        title (str): The title of the first column, e.g. "km".
+
+    Returns:
+        str: The HTML table, empty if there are no splits.
+    """
+    if not splits:
+        return ""
+
+    rows : list[str] = []
+    for split in splits:
+        hours, minutes, seconds = TimespanToHoursMinutesSeconds(split.Time)
+        rows.append(f"""            <tr>
+                <td>{split.Name}</td><td>{split.Distance / 1000:.2f} km</td><td>{hours}:{minutes:02d}:{seconds:02d}</td>
+                <td>{FormatPace(split.Pace())} min/km</td><td>{split.Ascent:.0f} m</td><td>{split.Descent:.0f} m</td>
+            </tr>""")
+
+    newline = "\n"
+    return f"""<figure class="wp-block-table">
+    <table class="has-fixed-layout">
+        <thead>
+            <tr>
+                <th>{title}</th><th>Länge</th><th>Zeit</th><th>Pace</th><th>Bergauf</th><th>Bergab</th>
+            </tr>
+        </thead>
+        <tbody>
+{newline.join(rows)}
+        </tbody>
+    </table>
+</figure>
+"""
+
+def __PrintSplits(splits : list[TrackSplit], title : str) -> None:
+    """ Prints the splits as table.
+
+    Args:
+        splits (list[TrackSplit]): The splits.
+        title (str): The title of the first column.
+    """
+    print(f"{title:>8} {'Length':>10} {'Time':>10} {'Pace':>10} {'Uphill':>8} {'Downhill':>8}")
+    for split in splits:
+        hours, minutes, seconds = TimespanToHoursMinutesSeconds(split.Time)
+        print(f"{split.Name:>8} {split.Distance / 1000:>7.2f} km {hours:>4}:{minutes:02d}:{seconds:02d} {FormatPace(split.Pace()):>10} {split.Ascent:>6.0f} m {split.Descent:>6.0f} m")
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("track_splits", description="Prints the per kilometer splits and the laps of a FIT activity.")
+    argParser.add_argument("filename", help='input filename "abc.FIT"')
+    argParser.add_argument("-d", "--split_distance", help="distance of a split in meters", type=float, default=DEFAULT_SPLIT_DISTANCE)
+    argParser.add_argument("-l", "--laps", help="also print the laps", action="store_true")
+    args = argParser.parse_args()
+
+    profile = CreateTrackProfile(CreateGpxTrackFromFitActivity(args.filename, splitSegments=True))
+
+    __PrintSplits(CalculateDistanceSplits(profile, args.split_distance), "km")
+
+    if args.laps:
+        print()
+        __PrintSplits(CalculateLapSplits(profile, GetLapTimes(ReadFitFile(args.filename))), "lap")
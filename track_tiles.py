@@ -0,0 +1,403 @@
+#!/usr/bin/python3
+
+"""
+
+Copyright (C) 2026  Torsten Brischalle
+email: torsten@brischalle.de
+web: http://www.aaabbb.de
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to
+deal in the Software without restriction, including without limitation the
+rights to use, copy, modify, merge, publish, distribute, sublicense, and/or
+sell copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+IN THE SOFTWARE.
+"""
+
+import argparse
+import sqlite3
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image, ImageDraw
+from convert_fit_to_gpx import ReadFitFile, GetTrackPointsFromMessages
+from activity_archive import HashFile
+from track_index import SimplifyTrack, EncodeGeometry, DecodeGeometry
+from map_tiles import LonLatToTile, TILE_SIZE
+
+####################################################################################
+### This module renders the tracks of many activities into a pyramid of
+### transparent XYZ map tiles ({z}/{x}/{y}.png) which can be shown as overlay on
+### a slippy map.
+###
+### The tracks and the tiles each track touches are stored in the database
+### "tracks.sqlite" in the tile directory. When activities are added only the
+### tiles touched by the new tracks are rendered again. The zoom range of the
+### pyramid is stored as well, every track is indexed on all of its zoom levels.
+####################################################################################
+
+__SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    points BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tile_tracks (
+    z INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    y INTEGER NOT NULL,
+    track_id INTEGER NOT NULL REFERENCES tracks (id),
+    PRIMARY KEY (z, x, y, track_id)
+);
+CREATE TABLE IF NOT EXISTS pyramid (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    min_zoom INTEGER NOT NULL,
+    max_zoom INTEGER NOT NULL
+);
+"""
+
+# the tracks are simplified with this tolerance in meters before they are stored
+TRACK_TOLERANCE = 1.0
+
+# the tiles are drawn with this factor larger and scaled down to get smooth lines
+SUPERSAMPLING = 2
+
+class TileStyle:
+    """ The look of the tracks on the tiles. """
+
+    def __init__(self, color : str = "#E00000", width : int = 3, opacity : int = 200) -> None:
+        """ Creates the tile style.
+
+        Args:
+            color (str, optional): The track color (suitable for PIL/Pillow, e.g. red, #E00000). Defaults to "#E00000".
+            width (int, optional): The track width in pixels. Defaults to 3.
+            opacity (int, optional): The track opacity 0 ... 255. Defaults to 200.
+        """
+        self.Color = color
+        self.Width = width
+        self.Opacity = opacity
+
+def OpenTilePyramid(tileDir : str) -> sqlite3.Connection:
+    """ Opens the track database of a tile pyramid and creates it if needed.
+
+    Args:
+        tileDir (str): The tile directory.
+
+    Returns:
+        sqlite3.Connection: The database connection.
+    """
+    Path(tileDir).mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(Path(tileDir).joinpath("tracks.sqlite")))
+    db.executescript(__SCHEMA)
+    return db
+
+def GetZoomRange(db : sqlite3.Connection) -> tuple[int, int] | None:
+    """ Returns the zoom range of the tile pyramid.
+
+    Args:
+        db (sqlite3.Connection): The track database of the tile pyramid.
+
+    Returns:
+        tuple[int, int] | None: The minimum and maximum zoom level, None for an empty pyramid.
+    """
+    row = db.execute("SELECT min_zoom, max_zoom FROM pyramid WHERE id = 1").fetchone()
+    if row is None:
+        # a pyramid created before the zoom range was stored
+        row = db.execute("SELECT MIN(z), MAX(z) FROM tile_tracks").fetchone()
+        if row is None or row[0] is None:
+            return None
+
+    return row[0], row[1]
+
+def GetTouchedTiles(points : list[tuple[float, float]], minZoom : int, maxZoom : int, style : TileStyle) -> set[tuple[int, int, int]]:
+    """ Returns all tiles a track is drawn on.
+
+    Args:
+        points (list[tuple[float, float]]): The track points as latitude, longitude in degrees.
+        minZoom (int): The minimum zoom level.
+        maxZoom (int): The maximum zoom level.
+        style (TileStyle): The look of the track.
+
+    Returns:
+        set[tuple[int, int, int]]: The tiles as z, x, y.
+    """
+    tiles : set[tuple[int, int, int]] = set()
+    if not points:
+        return tiles
+
+    coords = np.array(points, dtype=np.float64)
+
+    # a track close to the tile border is also drawn on the neighbour tile
+    padding = (style.Width / 2 + 1) / TILE_SIZE
+
+    for zoom in range(minZoom, maxZoom + 1):
+        x, y = LonLatToTile(coords[:, 1], coords[:, 0], zoom)
+        if len(x) == 1:
+            x, y = np.repeat(x, 2), np.repeat(y, 2)
+
+        # the tile columns each segment passes through, the segment widened by the padding
+        x0, y0, x1, y1 = x[:-1], y[:-1], x[1:], y[1:]
+        minX, maxX = np.minimum(x0, x1), np.maximum(x0, x1)
+        firstColumn = np.floor(minX - padding).astype(np.int64)
+        columnCount = np.floor(maxX + padding).astype(np.int64) - firstColumn + 1
+
+        segment = np.repeat(np.arange(len(x0)), columnCount)
+        column = firstColumn[segment] + np.arange(len(segment)) - np.repeat(np.cumsum(columnCount) - columnCount, columnCount)
+
+        # the part of the segment whose widened points reach into the column
+        left = np.maximum(column - padding, minX[segment])
+        right = np.minimum(column + 1 + padding, maxX[segment])
+
+        dx = (x1 - x0)[segment]
+        dy = (y1 - y0)[segment]
+        vertical = dx == 0
+        slope = np.divide(dy, dx, out=np.zeros_like(dy), where=~vertical)
+        yLeft = np.where(vertical, y0[segment], y0[segment] + (left - x0[segment]) * slope)
+        yRight = np.where(vertical, y1[segment], y0[segment] + (right - x0[segment]) * slope)
+
+        # the tile rows this part passes through
+        firstRow = np.floor(np.minimum(yLeft, yRight) - padding).astype(np.int64)
+        rowCount = np.floor(np.maximum(yLeft, yRight) + padding).astype(np.int64) - firstRow + 1
+
+        part = np.repeat(np.arange(len(column)), rowCount)
+        row = firstRow[part] + np.arange(len(part)) - np.repeat(np.cumsum(rowCount) - rowCount, rowCount)
+        column = column[part]
+
+        maxTile = 2 ** zoom - 1
+        inside = (column >= 0) & (column <= maxTile) & (row >= 0) & (row <= maxTile)
+        for tileX, tileY in set(zip(column[inside].tolist(), row[inside].tolist())):
+            tiles.add((zoom, tileX, tileY))
+
+    return tiles
+
+def __DrawTrack(draw : ImageDraw.ImageDraw, points : np.ndarray, tileX : int, tileY : int, zoom : int, style : TileStyle) -> None:
+    """ Draws the parts of a track which are visible on a tile.
+
+    Args:
+        draw (ImageDraw.ImageDraw): The drawing context of the supersampled tile image.
+        points (np.ndarray): The track points as latitude, longitude in degrees.
+        tileX (int): The x tile number.
+        tileY (int): The y tile number.
+        zoom (int): The zoom level.
+        style (TileStyle): The look of the track.
+    """
+    x, y = LonLatToTile(points[:, 1], points[:, 0], zoom)
+    px = (x - tileX) * TILE_SIZE * SUPERSAMPLING
+    py = (y - tileY) * TILE_SIZE * SUPERSAMPLING
+
+    size = TILE_SIZE * SUPERSAMPLING
+    padding = style.Width * SUPERSAMPLING
+
+    # segments whose bounding box intersects the tile
+    visible = ((np.maximum(px[:-1], px[1:]) >= -padding) & (np.minimum(px[:-1], px[1:]) <= size + padding) &
+               (np.maximum(py[:-1], py[1:]) >= -padding) & (np.minimum(py[:-1], py[1:]) <= size + padding))
+
+    # draw each run of consecutive visible segments as one line
+    indices = np.flatnonzero(visible)
+    if len(indices) == 0:
+        return
+
+    runStarts = np.flatnonzero(np.diff(indices) > 1) + 1
+    for run in np.split(indices, runStarts):
+        first, last = int(run[0]), int(run[-1]) + 1
+        line = list(zip(px[first : last + 1].tolist(), py[first : last + 1].tolist()))
+        draw.line(line, fill=style.Color, width=style.Width * SUPERSAMPLING, joint="curve")
+
+def __RenderTiles(tileDir : str, tiles : list[tuple[int, int, int]], style : TileStyle) -> int:
+    """ Renders tiles with all tracks touching them. Runs in a worker process.
+
+    Args:
+        tileDir (str): The tile directory.
+        tiles (list[tuple[int, int, int]]): The tiles as z, x, y.
+        style (TileStyle): The look of the tracks.
+
+    Returns:
+        int: The number of rendered tiles.
+    """
+    db = sqlite3.connect(f"file:{Path(tileDir).joinpath('tracks.sqlite')}?mode=ro", uri=True)
+    trackCache : dict[int, np.ndarray] = {}
+
+    size = TILE_SIZE * SUPERSAMPLING
+
+    for zoom, tileX, tileY in tiles:
+        image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+
+        for (trackId,) in db.execute("SELECT track_id FROM tile_tracks WHERE z = ? AND x = ? AND y = ?", (zoom, tileX, tileY)):
+            if trackId not in trackCache:
+                blob = db.execute("SELECT points FROM tracks WHERE id = ?", (trackId,)).fetchone()[0]
+                trackCache[trackId] = np.array(DecodeGeometry(blob), dtype=np.float64)
+
+            __DrawTrack(draw, trackCache[trackId], tileX, tileY, zoom, style)
+
+        image = image.resize((TILE_SIZE, TILE_SIZE), Image.LANCZOS)
+
+        # apply the opacity to the whole track, so overlapping lines do not get darker
+        alpha = image.getchannel("A").point(lambda a: a * style.Opacity // 255)
+        image.putalpha(alpha)
+
+        tilePath = Path(tileDir).joinpath(str(zoom), str(tileX), f"{tileY}.png")
+        tilePath.parent.mkdir(parents=True, exist_ok=True)
+        image.save(tilePath, optimize=True)
+
+    db.close()
+    return len(tiles)
+
+def AddActivities(tileDir : str, fitFilenames : list[str], minZoom : int = 5, maxZoom : int = 16,
+                  style : TileStyle | None = None, maxWorkers : int | None = None) -> int:
+    """ Adds the tracks of FIT activity files to the tile pyramid and renders the touched tiles again.
+    Files already in the tile pyramid are skipped. The zoom range of the pyramid is extended to the given
+    range, the tracks already stored are drawn on the new zoom levels as well.
+
+    Args:
+        tileDir (str): The tile directory.
+        fitFilenames (list[str]): The names of the FIT files.
+        minZoom (int, optional): The minimum zoom level. Defaults to 5.
+        maxZoom (int, optional): The maximum zoom level. Defaults to 16.
+        style (TileStyle | None, optional): The look of the tracks. Defaults to TileStyle().
+        maxWorkers (int | None, optional): The number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        int: The number of rendered tiles.
+    """
+    if style is None:
+        style = TileStyle()
+
+    if minZoom > maxZoom:
+        raise Exception(f"invalid zoom range {minZoom} - {maxZoom}")
+
+    db = OpenTilePyramid(tileDir)
+    knownHashes = { row[0] for row in db.execute("SELECT content_hash FROM tracks") }
+
+    dirtyTiles : set[tuple[int, int, int]] = set()
+
+    zoomRange = GetZoomRange(db)
+    if zoomRange is not None:
+        # index the stored tracks on the zoom levels added to the pyramid
+        newLevels = [ zoom for zoom in range(minZoom, maxZoom + 1) if not zoomRange[0] <= zoom <= zoomRange[1] ]
+        if newLevels:
+            print(f"add zoom levels {', '.join(str(zoom) for zoom in newLevels)} to the stored tracks ...")
+
+            for trackId, blob in db.execute("SELECT id, points FROM tracks").fetchall():
+                points = DecodeGeometry(blob)
+                tiles = set().union(*(GetTouchedTiles(points, zoom, zoom, style) for zoom in newLevels))
+                db.executemany("INSERT OR IGNORE INTO tile_tracks (z, x, y, track_id) VALUES (?, ?, ?, ?)",
+                               [ (z, x, y, trackId) for z, x, y in tiles ])
+                dirtyTiles.update(tiles)
+
+        minZoom, maxZoom = min(minZoom, zoomRange[0]), max(maxZoom, zoomRange[1])
+
+    db.execute("INSERT OR REPLACE INTO pyramid (id, min_zoom, max_zoom) VALUES (1, ?, ?)", (minZoom, maxZoom))
+
+    for fitFilename in fitFilenames:
+        contentHash = HashFile(fitFilename)
+        if contentHash in knownHashes:
+            continue
+        knownHashes.add(contentHash)
+
+        pointList = GetTrackPointsFromMessages(ReadFitFile(fitFilename))
+        points = SimplifyTrack([ (p.Latitude, p.Longitude) for p in pointList ], TRACK_TOLERANCE)
+        if not points:
+            continue
+
+        cursor = db.execute("INSERT INTO tracks (content_hash, filename, points) VALUES (?, ?, ?)",
+                            (contentHash, str(Path(fitFilename).resolve()), EncodeGeometry(points)))
+        trackId = cursor.lastrowid
+
+        tiles = GetTouchedTiles(points, minZoom, maxZoom, style)
+        db.executemany("INSERT OR IGNORE INTO tile_tracks (z, x, y, track_id) VALUES (?, ?, ?, ?)",
+                       [ (z, x, y, trackId) for z, x, y in tiles ])
+        dirtyTiles.update(tiles)
+
+    db.commit()
+    db.close()
+
+    print(f"render {len(dirtyTiles)} tiles ...")
+    return RenderTiles(tileDir, sorted(dirtyTiles), style, maxWorkers)
+
+def RenderTiles(tileDir : str, tiles : list[tuple[int, int, int]], style : TileStyle | None = None,
+                maxWorkers : int | None = None, batchSize : int = 64) -> int:
+    """ Renders tiles of the tile pyramid in parallel.
+
+    Args:
+        tileDir (str): The tile directory.
+        tiles (list[tuple[int, int, int]]): The tiles as z, x, y.
+        style (TileStyle | None, optional): The look of the tracks. Defaults to TileStyle().
+        maxWorkers (int | None, optional): The number of worker processes. Defaults to the number of CPUs.
+        batchSize (int, optional): The number of tiles rendered by a worker at once. Defaults to 64.
+
+    Returns:
+        int: The number of rendered tiles.
+    """
+    if style is None:
+        style = TileStyle()
+
+    if not tiles:
+        return 0
+
+    batches = [ tiles[idx : idx + batchSize] for idx in range(0, len(tiles), batchSize) ]
+
+    with ProcessPoolExecutor(maxWorkers) as pool:
+        return sum(pool.map(__RenderTiles, [ tileDir ] * len(batches), batches, [ style ] * len(batches)))
+
+def RenderAllTiles(tileDir : str, style : TileStyle | None = None, maxWorkers : int | None = None) -> int:
+    """ Renders all tiles of the tile pyramid again, e.g. after changing the style.
+
+    Args:
+        tileDir (str): The tile directory.
+        style (TileStyle | None, optional): The look of the tracks. Defaults to TileStyle().
+        maxWorkers (int | None, optional): The number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        int: The number of rendered tiles.
+    """
+    db = OpenTilePyramid(tileDir)
+    tiles = [ (z, x, y) for z, x, y in db.execute("SELECT DISTINCT z, x, y FROM tile_tracks ORDER BY z, x, y") ]
+    db.close()
+
+    return RenderTiles(tileDir, tiles, style, maxWorkers)
+
+###################################################################################################
+# The standalone application starts here.
+###################################################################################################
+
+if __name__ == "__main__":
+
+    argParser = argparse.ArgumentParser("track_tiles", description="Renders the tracks of activities into transparent XYZ map tiles.")
+    argParser.add_argument("tile_dir", help="the tile directory")
+    argParser.add_argument("filenames", help='FIT files to add "abc.FIT"', nargs="*")
+    argParser.add_argument("-a", "--archive", help='add all activities of the archive "abc.sqlite" (see activity_archive)', required=False)
+    argParser.add_argument("-zmin", "--min_zoom", help="minimum zoom level, an existing pyramid is only extended", type=int, default=5)
+    argParser.add_argument("-zmax", "--max_zoom", help="maximum zoom level, an existing pyramid is only extended", type=int, default=16)
+    argParser.add_argument("-c", "--color", help="track color", default="#E00000")
+    argParser.add_argument("-pw", "--path_width", help="track width in pixels", type=int, default=3)
+    argParser.add_argument("-r", "--rerender", help="render all tiles again", action="store_true")
+    argParser.add_argument("-w", "--workers", help="number of worker processes", type=int, required=False)
+    args = argParser.parse_args()
+
+    tileStyle = TileStyle(args.color, args.path_width)
+
+    filenames = list(args.filenames)
+    if args.archive is not None:
+        archive = sqlite3.connect(args.archive)
+        filenames += [ row[0] for row in archive.execute("SELECT filename FROM activities WHERE point_count > 0 ORDER BY start_time") ]
+        archive.close()
+
+    if args.rerender:
+        rendered = RenderAllTiles(args.tile_dir, tileStyle, args.workers)
+    else:
+        rendered = AddActivities(args.tile_dir, filenames, args.min_zoom, args.max_zoom, tileStyle, args.workers)
+
+    print(f"{rendered} tiles rendered")